@@ -12,6 +12,7 @@ import numpy as np
 import ptflops
 from plato.config import Config
 from plato.algorithms import fedavg
+from plato.utils import width_slicing
 
 
 class Algorithm(fedavg.Algorithm):
@@ -21,6 +22,9 @@ class Algorithm(fedavg.Algorithm):
         super().__init__(trainer)
         self.current_rate = 1
         self.model_class = None
+        self.slicer = width_slicing.WidthSlicer(width_slicing.is_weight_or_bias)
+        # The size and the MACs of the submodel of each rate
+        self.complexities = {}
         self.rates = [1.0, 0.5, 0.25, 0.125, 0.0625]
 
     def extract_weights(self, model=None):
@@ -46,23 +50,26 @@ class Algorithm(fedavg.Algorithm):
                 rate = (smallest + biggest) / 2
                 if (abs(last - rate)) < 0.01:
                     break
-                pre_model = model_class(
-                    model_rate=rate, **Config().parameters.client_model._asdict()
-                )
-                payload = pre_model.state_dict()
-                size = sys.getsizeof(pickle.dumps(payload)) / 1024**2
-                if hasattr(Config().parameters.client_model, "channels"):
-                    in_channel = 1
-                else:
-                    in_channel = 3
-                macs, _ = ptflops.get_model_complexity_info(
-                    pre_model,
-                    (in_channel, 32, 32),
-                    as_strings=False,
-                    print_per_layer_stat=False,
-                    verbose=False,
-                )
-                macs /= 1024**2
+                if rate not in self.complexities:
+                    pre_model = model_class(
+                        model_rate=rate, **Config().parameters.client_model._asdict()
+                    )
+                    payload = pre_model.state_dict()
+                    size = sys.getsizeof(pickle.dumps(payload)) / 1024**2
+                    if hasattr(Config().parameters.client_model, "channels"):
+                        in_channel = 1
+                    else:
+                        in_channel = 3
+                    macs, _ = ptflops.get_model_complexity_info(
+                        pre_model,
+                        (in_channel, 32, 32),
+                        as_strings=False,
+                        print_per_layer_stat=False,
+                        verbose=False,
+                    )
+                    macs /= 1024**2
+                    self.complexities[rate] = (size, macs)
+                size, macs = self.complexities[rate]
                 if macs <= limitation[1] and size <= limitation[0]:
                     smallest = rate
                 else:
@@ -80,89 +87,28 @@ class Algorithm(fedavg.Algorithm):
         Get the parameters of local models from the global model.
         """
         current_rate = self.current_rate
-        pre_model = self.model_class(
-            model_rate=current_rate, **Config().parameters.client_model._asdict()
+        return self.slicer.extract(
+            current_rate,
+            self.model.state_dict(),
+            lambda: self.model_class(
+                model_rate=current_rate, **Config().parameters.client_model._asdict()
+            ),
         )
-        local_parameters = pre_model.state_dict()
-        for key, value in self.model.state_dict().items():
-            if "weight" in key or "bias" in key:
-                if value.dim() == 4 or value.dim() == 2:
-                    local_parameters[key] = copy.deepcopy(
-                        value[
-                            : local_parameters[key].shape[0],
-                            : local_parameters[key].shape[1],
-                            ...,
-                        ]
-                    )
-                elif value.dim() == 3:
-                    local_parameters[key] = copy.deepcopy(
-                        value[
-                            : local_parameters[key].shape[0],
-                            : local_parameters[key].shape[1],
-                            : local_parameters[key].shape[2],
-                            ...,
-                        ]
-                    )
-                else:
-                    local_parameters[key] = copy.deepcopy(
-                        value[: local_parameters[key].shape[0]]
-                    )
-        return local_parameters
 
     def aggregation(self, weights_received):
         """
         Aggregate weights of different complexities.
         """
-        global_parameters = copy.deepcopy(self.model.state_dict())
-        for key, value in self.model.state_dict().items():
-            if "weight" in key or "bias" in key:
-                count = torch.zeros(value.shape)
-                for _, local_weights in enumerate(weights_received):
-                    if value.dim() == 4:
-                        global_parameters[key][
-                            : local_weights[key].shape[0],
-                            : local_weights[key].shape[1],
-                            ...,
-                        ] += copy.deepcopy(local_weights[key])
-                        count[
-                            : local_weights[key].shape[0],
-                            : local_weights[key].shape[1],
-                            ...,
-                        ] += torch.ones(local_weights[key].shape)
-                    if value.dim() == 3:
-                        global_parameters[key][
-                            : local_weights[key].shape[0],
-                            : local_weights[key].shape[1],
-                            : local_weights[key].shape[2],
-                            ...,
-                        ] += copy.deepcopy(local_weights[key])
-                        count[
-                            : local_weights[key].shape[0],
-                            : local_weights[key].shape[1],
-                            : local_weights[key].shape[2],
-                            ...,
-                        ] += torch.ones(local_weights[key].shape)
-                    elif value.dim() == 2:
-                        global_parameters[key][
-                            : local_weights[key].shape[0],
-                            : local_weights[key].shape[1],
-                        ] += copy.deepcopy(local_weights[key])
-                        count[
-                            : local_weights[key].shape[0],
-                            : local_weights[key].shape[1],
-                        ] += torch.ones(local_weights[key].shape)
-                    elif value.dim() == 1:
-                        global_parameters[key][
-                            : local_weights[key].shape[0]
-                        ] += copy.deepcopy(local_weights[key])
-                        count[: local_weights[key].shape[0]] += torch.ones(
-                            local_weights[key].shape
-                        )
-                count = torch.where(count == 0, torch.ones(count.shape), count)
-                global_parameters[key] = torch.div(
-                    global_parameters[key] - value, count
-                )
-        return global_parameters
+        global_parameters = self.model.state_dict()
+        return width_slicing.aggregate(
+            global_parameters,
+            weights_received,
+            [
+                key
+                for key, value in global_parameters.items()
+                if width_slicing.is_weight_or_bias(key, value)
+            ],
+        )
 
     # pylint:disable=too-many-branches
     def sort_channels(self):
@@ -22,7 +22,9 @@ import logging
 import math
 import os
 import shutil
+import threading
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
 
 import matplotlib.gridspec as gridspec
@@ -43,6 +45,9 @@ from utils.utils import total_variation as TV
 cross_entropy = torch.nn.CrossEntropyLoss()
 tt = transforms.ToPILImage()
 
+# Serializes plotting by the attack trials running in parallel threads
+_plot_lock = threading.Lock()
+
 partition_size = Config().data.partition_size
 epochs = Config().trainer.epochs
 batch_size = Config().trainer.batch_size
@@ -209,33 +214,66 @@ class Server(fedavg.Server):
             total_local_steps = epochs * math.ceil(partition_size / batch_size)
             target_grad = [x / total_local_steps for x in target_grad]
 
-        # Generate dummy items and initialize optimizer
+        # Generate the dummy items of all trials in advance, so that each trial
+        # starts from the same initialization whether the trials run in parallel or not
         torch.manual_seed(Config().algorithm.random_seed)
-
-        for trial_number in range(trials):
-            self.run_trial(
-                trial_number,
-                num_images,
-                data_size,
-                target_weights,
-                target_grad,
-                gt_data,
-                gt_labels,
+        initializations = [
+            (
+                torch.randn(data_size),
+                torch.randn((num_images, Config().trainer.num_classes)),
             )
+            for __ in range(trials)
+        ]
+        attack_args = (num_images, target_weights, target_grad, gt_data, gt_labels)
+
+        parallel_trials = 1
+        if hasattr(Config().algorithm, "parallel_trials"):
+            parallel_trials = min(Config().algorithm.parallel_trials, trials)
+
+        if parallel_trials > 1 and Config().device() == "cpu":
+            # The trials run in threads, which share the model and the attack
+            # arguments, and run in parallel as PyTorch operations release the GIL
+            with ThreadPoolExecutor(max_workers=parallel_trials) as executor:
+                final_mses = list(
+                    executor.map(
+                        lambda trial: self.run_trial(*trial, *attack_args),
+                        [
+                            (trial_number, dummy_data, dummy_labels)
+                            for trial_number, (dummy_data, dummy_labels) in enumerate(
+                                initializations
+                            )
+                        ],
+                    )
+                )
+        else:
+            final_mses = [
+                self.run_trial(trial_number, dummy_data, dummy_labels, *attack_args)
+                for trial_number, (dummy_data, dummy_labels) in enumerate(
+                    initializations
+                )
+            ]
+
+        for trial_number, final_mse in enumerate(final_mses):
+            if self.best_mse > final_mse:
+                self.best_mse = final_mse
+                # the +1 is because we index from 1 and not 0
+                self.best_trial = trial_number + 1
 
         self._save_best()
 
     def run_trial(
         self,
         trial_number,
+        dummy_data,
+        dummy_labels,
         num_images,
-        data_size,
         target_weights,
         target_grad,
         gt_data,
         gt_labels,
     ):
-        """Run the attack for one trial."""
+        """Run the attack for one trial, and return the average MSE of the last
+        evaluated reconstruction."""
         logging.info("Starting Attack Number %d", (trial_number + 1))
 
         trial_result_path = f"{dlg_result_path}/t{trial_number + 1}"
@@ -246,27 +284,21 @@ class Server(fedavg.Server):
             trial_csv_file, dlg_result_headers, trial_result_path
         )
 
-        dummy_data = torch.randn(data_size).to(Config().device()).requires_grad_(True)
-
-        dummy_labels = (
-            torch.randn((num_images, Config().trainer.num_classes))
-            .to(Config().device())
-            .requires_grad_(True)
-        )
+        dummy_data = dummy_data.to(Config().device()).requires_grad_(True)
+        dummy_labels = dummy_labels.to(Config().device()).requires_grad_(True)
 
         if self.attack_method == "DLG":
             match_optimizer = torch.optim.LBFGS(
                 [dummy_data, dummy_labels], lr=Config().algorithm.lr
             )
             labels_ = dummy_labels
-            for i in range(num_images):
-                logging.info(
-                    "[%s Gradient Leakage Attack %d with %s defense...] Dummy label is %d.",
-                    self.attack_method,
-                    trial_number,
-                    self.defense_method,
-                    torch.argmax(dummy_labels[i], dim=-1).item(),
-                )
+            logging.info(
+                "[%s Gradient Leakage Attack %d with %s defense...] Dummy labels are %s.",
+                self.attack_method,
+                trial_number,
+                self.defense_method,
+                torch.argmax(dummy_labels, dim=-1).tolist(),
+            )
 
         elif self.attack_method == "iDLG":
             match_optimizer = torch.optim.LBFGS(
@@ -283,14 +315,13 @@ class Server(fedavg.Server):
                 .requires_grad_(False)
             )
             labels_ = est_labels
-            for i in range(num_images):
-                logging.info(
-                    "[%s Gradient Leakage Attack %d with %s defense...] Estimated label is %d.",
-                    self.attack_method,
-                    trial_number,
-                    self.defense_method,
-                    est_labels.item(),
-                )
+            logging.info(
+                "[%s Gradient Leakage Attack %d with %s defense...] Estimated labels are %s.",
+                self.attack_method,
+                trial_number,
+                self.defense_method,
+                est_labels.tolist(),
+            )
         elif self.attack_method == "csDLG":
             match_optimizer = torch.optim.LBFGS(
                 [
@@ -299,25 +330,21 @@ class Server(fedavg.Server):
                 lr=Config().algorithm.lr,
             )
             labels_ = gt_labels
-            for i in range(num_images):
-                logging.info(
-                    "[%s Gradient Leakage Attack %d with %s defense...] Known label is %d.",
-                    self.attack_method,
-                    trial_number,
-                    self.defense_method,
-                    torch.argmax(gt_labels[i], dim=-1).item(),
-                )
+            logging.info(
+                "[%s Gradient Leakage Attack %d with %s defense...] Known labels are %s.",
+                self.attack_method,
+                trial_number,
+                self.defense_method,
+                torch.argmax(gt_labels, dim=-1).tolist(),
+            )
 
-        history, losses, mses, lpipss, psnrs, ssims, library_ssims = (
-            [],
-            [],
-            [],
-            [],
-            [],
-            [],
-            [],
-        )
-        avg_mses, avg_lpips, avg_psnr, avg_ssim, avg_library_ssim = [], [], [], [], []
+        # Snapshots of the reconstructed images and labels, taken every
+        # history_interval iterations
+        history = []
+        history_interval = log_interval
+        if hasattr(Config().algorithm, "history_interval"):
+            history_interval = Config().algorithm.history_interval
+        avg_mses = []
 
         # Conduct gradients/weights/updates matching
         if not self.share_gradients and self.match_weights:
@@ -333,51 +360,21 @@ class Server(fedavg.Server):
         for iters in range(num_iters):
             match_optimizer.step(closure)
             current_loss = closure().item()
-            losses.append(current_loss)
 
             if math.isnan(current_loss):
                 logging.info("Not a number, ending attack")
-                # should make these lines into a function to prevent repetition, but not sure how to
-                # without having too many parameters
-                eval_dict = get_evaluation_dict(dummy_data, gt_data, num_images)
-                mses.append(eval_dict["mses"])
-                lpipss.append(eval_dict["lpipss"])
-                psnrs.append(eval_dict["psnrs"])
-                ssims.append(eval_dict["ssims"])
-                library_ssims.append(eval_dict["library_ssims"])
+                eval_dict = self._evaluate_trial(
+                    iters, current_loss, dummy_data, gt_data, num_images, trial_csv_file
+                )
                 avg_mses.append(eval_dict["avg_mses"])
-                avg_lpips.append(eval_dict["avg_lpips"])
-                avg_psnr.append(eval_dict["avg_psnr"])
-                avg_ssim.append(eval_dict["avg_ssim"])
-                avg_library_ssim.append(eval_dict["avg_library_ssim"])
-
-                new_row = [
-                    iters,
-                    round(losses[-1], 8),
-                    round(avg_mses[-1], 8),
-                    round(avg_lpips[-1], 8),
-                    round(avg_psnr[-1], 4),
-                    round(avg_ssim[-1], 3),
-                    round(avg_library_ssim[-1], 3),
-                ]
-                csv_processor.write_csv(trial_csv_file, new_row)
                 break
 
             if iters % log_interval == 0:
                 # Finding evaluation metrics
-                # should make these lines into a function to prevent repetition, but not sure how to
-                # without having too many parameters
-                eval_dict = get_evaluation_dict(dummy_data, gt_data, num_images)
-                mses.append(eval_dict["mses"])
-                lpipss.append(eval_dict["lpipss"])
-                psnrs.append(eval_dict["psnrs"])
-                ssims.append(eval_dict["ssims"])
-                library_ssims.append(eval_dict["library_ssims"])
+                eval_dict = self._evaluate_trial(
+                    iters, current_loss, dummy_data, gt_data, num_images, trial_csv_file
+                )
                 avg_mses.append(eval_dict["avg_mses"])
-                avg_lpips.append(eval_dict["avg_lpips"])
-                avg_psnr.append(eval_dict["avg_psnr"])
-                avg_ssim.append(eval_dict["avg_ssim"])
-                avg_library_ssim.append(eval_dict["avg_library_ssim"])
 
                 logging.info(
                     "[%s Gradient Leakage Attack %d with %s defense...] Iter %d: Loss = %.10f, avg MSE = %.8f, avg LPIPS = %.8f, avg PSNR = %.4f dB, avg SSIM = %.3f, avg library SSIM = %.3f",
@@ -385,81 +382,65 @@ class Server(fedavg.Server):
                     (trial_number + 1),
                     self.defense_method,
                     iters,
-                    losses[-1],
-                    avg_mses[-1],
-                    avg_lpips[-1],
-                    avg_psnr[-1],
-                    avg_ssim[-1],
-                    avg_library_ssim[-1],
+                    current_loss,
+                    eval_dict["avg_mses"],
+                    eval_dict["avg_lpips"],
+                    eval_dict["avg_psnr"],
+                    eval_dict["avg_ssim"],
+                    eval_dict["avg_library_ssim"],
                 )
 
+            if iters % history_interval == 0:
                 if self.attack_method == "DLG":
-                    history.append(
-                        [
-                            [
-                                dummy_data[i].cpu().permute(1, 2, 0).detach().clone(),
-                                torch.argmax(dummy_labels[i], dim=-1).item(),
-                                dummy_data[i],
-                            ]
-                            for i in range(num_images)
-                        ]
-                    )
+                    labels = torch.argmax(dummy_labels, dim=-1)
                 elif self.attack_method == "iDLG":
-                    history.append(
-                        [
-                            [
-                                dummy_data[i].cpu().permute(1, 2, 0).detach().clone(),
-                                est_labels[i].item(),
-                                dummy_data[i],
-                            ]
-                            for i in range(num_images)
-                        ]
-                    )
+                    labels = est_labels
                 elif self.attack_method == "csDLG":
-                    history.append(
-                        [
-                            [
-                                dummy_data[i].cpu().permute(1, 2, 0).detach().clone(),
-                                torch.argmax(gt_labels[i], dim=-1),
-                                dummy_data[i],
-                            ]
-                            for i in range(num_images)
-                        ]
+                    labels = torch.argmax(gt_labels, dim=-1)
+
+                history.append(
+                    (
+                        iters,
+                        dummy_data.detach().permute(0, 2, 3, 1).cpu().clone(),
+                        labels.detach().cpu(),
                     )
+                )
 
-                new_row = [
-                    iters,
-                    round(losses[-1], 8),
-                    round(avg_mses[-1], 8),
-                    round(avg_lpips[-1], 8),
-                    round(avg_psnr[-1], 4),
-                    round(avg_ssim[-1], 3),
-                    round(avg_library_ssim[-1], 3),
-                ]
-                csv_processor.write_csv(trial_csv_file, new_row)
-
-        if self.best_mse > avg_mses[-1]:
-            self.best_mse = avg_mses[-1]
-            self.best_trial = (
-                trial_number + 1
-            )  # the +1 is because we index from 1 and not 0
-
-        reconstructed_path = f"{trial_result_path}/reconstruction_iterations.png"
-        self._plot_reconstructed(num_images, history, reconstructed_path)
-        final_tensor = torch.stack([history[-1][i][0] for i in range(num_images)])
-        final_result_path = f"{trial_result_path}/final_attack_result.pdf"
-        self._make_plot(num_images, final_tensor, None, final_result_path)
+        # Pyplot keeps global state, so that trials running in parallel threads
+        # plot one at a time
+        with _plot_lock:
+            reconstructed_path = f"{trial_result_path}/reconstruction_iterations.png"
+            self._plot_reconstructed(num_images, history, reconstructed_path)
+            final_result_path = f"{trial_result_path}/final_attack_result.pdf"
+            self._make_plot(num_images, history[-1][1], None, final_result_path)
 
         # Save the tensors into a .pt file
         tensor_file_path = f"{trial_result_path}/tensors.pt"
-        result = {
-            i * log_interval: {j: history[i][j][0] for j in range(num_images)}
-            for i in range(len(history))
-        }
+        result = {iteration: images for iteration, images, __ in history}
         torch.save(result, tensor_file_path)
 
         logging.info("Attack %d complete", (trial_number + 1))
 
+        return avg_mses[-1]
+
+    @staticmethod
+    def _evaluate_trial(iters, loss, dummy_data, gt_data, num_images, trial_csv_file):
+        """Evaluate the reconstructed data, and record the metrics in the csv file."""
+        eval_dict = get_evaluation_dict(dummy_data, gt_data, num_images)
+
+        new_row = [
+            iters,
+            round(loss, 8),
+            round(eval_dict["avg_mses"], 8),
+            round(eval_dict["avg_lpips"], 8),
+            round(eval_dict["avg_psnr"], 4),
+            round(eval_dict["avg_ssim"], 3),
+            round(eval_dict["avg_library_ssim"], 3),
+        ]
+        csv_processor.write_csv(trial_csv_file, new_row)
+
+        return eval_dict
+
     def _gradient_closure(self, match_optimizer, dummy_data, labels, target_grad):
         """Take a step to match the gradients."""
 
@@ -574,35 +555,58 @@ class Server(fedavg.Server):
 
     @staticmethod
     def _reconstruction_costs(dummy, target):
-        indices = torch.arange(len(target))
+        """Compute the average cost between the dummy and the target
+        gradients/weights over the trials, over all layers at once."""
         cost_fn = Config().algorithm.cost_fn
 
-        total_costs = 0
-        for trial in dummy:
-            pnorm = [0, 0]
-            costs = 0
-            for i in indices:
-                if cost_fn == "l2":
-                    costs += ((trial[i] - target[i]).pow(2)).sum()
-                elif cost_fn == "l1":
-                    costs += ((trial[i] - target[i]).abs()).sum()
-                elif cost_fn == "max":
-                    costs += ((trial[i] - target[i]).abs()).max()
-                elif cost_fn == "sim":
-                    costs -= (trial[i] * target[i]).sum()
-                    pnorm[0] += trial[i].pow(2).sum()
-                    pnorm[1] += target[i].pow(2).sum()
-                elif cost_fn == "simlocal":
-                    costs += 1 - torch.nn.functional.cosine_similarity(
-                        trial[i].flatten(), target[i].flatten(), 0, 1e-10
-                    )
-            if cost_fn == "sim":
-                costs = 1 + costs / pnorm[0].sqrt() / pnorm[1].sqrt()
+        # The layer that each flattened element belongs to
+        num_layers = len(target)
+        layer_index = torch.repeat_interleave(
+            torch.arange(num_layers),
+            torch.tensor([layer.numel() for layer in target]),
+        ).to(target[0].device)
+
+        # One row of flattened layers per trial
+        target = torch.cat([layer.flatten() for layer in target])
+        dummy = torch.stack(
+            [torch.cat([layer.flatten() for layer in trial]) for trial in dummy]
+        )
+        layer_index = layer_index.expand_as(dummy)
+        layer_costs = torch.zeros(
+            (dummy.shape[0], num_layers),
+            dtype=dummy.dtype,
+            device=dummy.device,
+        )
 
-            # Accumulate final costs
-            total_costs += costs
+        if cost_fn == "l2":
+            costs = (dummy - target).pow(2).sum(dim=1)
+        elif cost_fn == "l1":
+            costs = (dummy - target).abs().sum(dim=1)
+        elif cost_fn == "max":
+            costs = layer_costs.scatter_reduce(
+                1, layer_index, (dummy - target).abs(), "amax", include_self=False
+            ).sum(dim=1)
+        elif cost_fn == "sim":
+            costs = 1 - (dummy @ target) / dummy.pow(2).sum(dim=1).sqrt() / (
+                target.pow(2).sum().sqrt()
+            )
+        elif cost_fn == "simlocal":
+            # The cosine similarity of each layer, with the same epsilon as
+            # torch.nn.functional.cosine_similarity()
+            dot_products = layer_costs.scatter_add(1, layer_index, dummy * target)
+            dummy_norms = layer_costs.scatter_add(1, layer_index, dummy.pow(2)).sqrt()
+            target_norms = layer_costs.scatter_add(
+                1, layer_index, target.pow(2).expand_as(dummy)
+            ).sqrt()
+            costs = (
+                1
+                - dot_products
+                / (dummy_norms.clamp_min(1e-10) * target_norms.clamp_min(1e-10))
+            ).sum(dim=1)
+        else:
+            raise ValueError(f"Unknown cost function: {cost_fn}")
 
-        return total_costs / len(dummy)
+        return costs.mean()
 
     @staticmethod
     def _make_plot(num_images, image_data, image_labels, path):
@@ -659,25 +663,24 @@ class Server(fedavg.Server):
     @staticmethod
     def _plot_reconstructed(num_images, history, reconstructed_result_path):
         """Plot the reconstructed data."""
-        for i in range(num_images):
-            logging.info("Reconstructed label is %d.", history[-1][i][1])
+        logging.info("Reconstructed labels are %s.", history[-1][2].tolist())
 
         fig = plt.figure(figsize=(12, 8))
         rows = math.ceil(len(history) / 2)
         outer = gridspec.GridSpec(rows, 2, wspace=0.2, hspace=0.2)
 
-        for i, item in enumerate(history):
+        for i, (iteration, images, __) in enumerate(history):
             inner = gridspec.GridSpecFromSubplotSpec(
                 1, num_images, subplot_spec=outer[i]
             )
             outerplot = plt.Subplot(fig, outer[i])
-            outerplot.set_title("Iter=%d" % (i * log_interval))
+            outerplot.set_title("Iter=%d" % iteration)
             outerplot.axis("off")
             fig.add_subplot(outerplot)
 
             for j in range(num_images):
                 innerplot = plt.Subplot(fig, inner[j])
-                innerplot.imshow(history[i][j][0])
+                innerplot.imshow(images[j])
                 innerplot.axis("off")
                 fig.add_subplot(innerplot)
         fig.savefig(reconstructed_result_path)
@@ -38,59 +38,82 @@ def find_ssim_library(dummy_data, ground_truth):
     return ssim(dummy_data, ground_truth).item()
 
 
+def pairwise_ssim(dummy_data, ground_truth):
+    """Computes find_ssim() between every dummy image and every ground truth image,
+    with all pairs at once."""
+    dummy_data = torch.flatten(dummy_data, start_dim=1).double()
+    ground_truth = torch.flatten(ground_truth, start_dim=1).double()
+
+    dummy_data_mean = torch.mean(dummy_data, dim=1)
+    ground_truth_mean = torch.mean(ground_truth, dim=1)
+    cov = (dummy_data - dummy_data_mean[:, None]) @ (
+        ground_truth - ground_truth_mean[:, None]
+    ).T / (dummy_data.shape[1] - 1)
+
+    dummy_data_var = torch.var(dummy_data, dim=1, unbiased=False)
+    ground_truth_var = torch.var(ground_truth, dim=1, unbiased=False)
+
+    c1 = 0.0001
+    c2 = 0.0009
+
+    term1 = (2 * dummy_data_mean[:, None] * ground_truth_mean[None, :]) + c1
+    term2 = (2 * cov) + c2
+    term3 = dummy_data_mean[:, None] ** 2 + ground_truth_mean[None, :] ** 2 + c1
+    term4 = dummy_data_var[:, None] + ground_truth_var[None, :] + c2
+
+    return (term1 * term2) / (term3 * term4)
+
+
 def get_evaluation_dict(dummy_data, ground_truth, num_images):
     eval_dict = {}
-    (
-        eval_dict["mses"],
-        eval_dict["lpipss"],
-        eval_dict["psnrs"],
-        eval_dict["ssims"],
-        eval_dict["library_ssims"],
-    ) = ([], [], [], [], [])
-    for i in range(num_images):
-        # Initialize MSE and LPIPS values to be infinite
-        eval_dict["mses"].append(math.inf)
-        eval_dict["lpipss"].append(math.inf)
-        # Initialize SSIM to be -1 (minimum value possible)
-        eval_dict["ssims"].append(-1.0)
-        eval_dict["library_ssims"].append(-1.0)
-        # Find the closest ground truth data after the misordering
-        for j in range(num_images):
-            # MSEs, LPIPSs, PSNRs and SSIMs are stored in lists
-            # where the ith entry is for the ith dummy data
-            eval_dict["mses"][i] = min(
-                eval_dict["mses"][i],
-                torch.mean((dummy_data[i] - ground_truth[j]) ** 2).item(),
-            )
-            eval_dict["lpipss"][i] = min(
-                eval_dict["lpipss"][i],
-                loss_fn.forward(dummy_data[i], ground_truth[j]).item(),
-            )
-            eval_dict["ssims"][i] = max(
-                eval_dict["ssims"][i], find_ssim(dummy_data[i], ground_truth[j])
-            )
-            eval_dict["library_ssims"][i] = max(
-                eval_dict["library_ssims"][i],
-                find_ssim_library(
-                    torch.unsqueeze(dummy_data[i], dim=0),
-                    torch.unsqueeze(ground_truth[j], dim=0),
-                ),
+    dummy_data = dummy_data.detach()[:num_images]
+    ground_truth = ground_truth.detach()[:num_images].to(dummy_data.device)
+
+    with torch.no_grad():
+        # Find the closest ground truth data after the misordering, where the
+        # entry (i, j) is for the ith dummy data and the jth ground truth data
+        mses = torch.mean(
+            torch.flatten((dummy_data[:, None] - ground_truth[None, :]) ** 2, 2), dim=2
+        )
+        lpipss = torch.stack(
+            [
+                loss_fn.forward(
+                    dummy_data[i].expand_as(ground_truth), ground_truth
+                ).flatten()
+                for i in range(num_images)
+            ]
+        )
+        ssims = pairwise_ssim(dummy_data, ground_truth)
+
+    # MSEs, LPIPSs, PSNRs and SSIMs are stored in lists
+    # where the ith entry is for the ith dummy data
+    eval_dict["mses"] = mses.min(dim=1).values.tolist()
+    eval_dict["lpipss"] = lpipss.min(dim=1).values.tolist()
+    eval_dict["ssims"] = ssims.max(dim=1).values.tolist()
+    # The data range of the library SSIM is inferred from each pair of images
+    eval_dict["library_ssims"] = [
+        max(
+            find_ssim_library(
+                torch.unsqueeze(dummy_data[i], dim=0),
+                torch.unsqueeze(ground_truth[j], dim=0),
             )
-        eval_dict["psnrs"].append(-10 * math.log10(eval_dict["mses"][i]))
-        # Find the mean for the MSE, LPIPS and PSNR
-        eval_dict["avg_mses"] = mean(eval_dict["mses"])
-        eval_dict["avg_lpips"] = mean(eval_dict["lpipss"])
-        eval_dict["avg_psnr"] = mean(eval_dict["psnrs"])
-        eval_dict["avg_ssim"] = mean(eval_dict["ssims"])
-        eval_dict["avg_library_ssim"] = mean(eval_dict["library_ssims"])
+            for j in range(num_images)
+        )
+        for i in range(num_images)
+    ]
+    eval_dict["psnrs"] = [-10 * math.log10(mse) for mse in eval_dict["mses"]]
+
+    # Find the mean for the MSE, LPIPS and PSNR
+    eval_dict["avg_mses"] = mean(eval_dict["mses"])
+    eval_dict["avg_lpips"] = mean(eval_dict["lpipss"])
+    eval_dict["avg_psnr"] = mean(eval_dict["psnrs"])
+    eval_dict["avg_ssim"] = mean(eval_dict["ssims"])
+    eval_dict["avg_library_ssim"] = mean(eval_dict["library_ssims"])
 
     return eval_dict
 
 
 def covar(a, b):
-    a_bar = torch.mean(a).item()
-    b_bar = torch.mean(b).item()
-    cov = 0
-    for i in range(len(a)):
-        cov += (a[i].item() - a_bar) * (b[i].item() - b_bar)
-    return cov / (len(a) - 1)
+    a = a.double()
+    b = b.double()
+    return torch.sum((a - torch.mean(a)) * (b - torch.mean(b))).item() / (len(a) - 1)
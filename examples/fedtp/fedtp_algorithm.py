@@ -9,6 +9,8 @@ arXiv preprint arXiv:2211.01572 (2022).
 
 https://arxiv.org/pdf/2211.01572v1.pdf.
 """
+from collections import OrderedDict
+
 import torch
 
 from plato.algorithms import fedavg
@@ -25,18 +27,42 @@ class ServerAlgorithm(fedavg.Algorithm):
 
     def generate_attention(self, hnet, client_id):
         """Generated the customized attention of each client."""
-        weights = hnet(
-            torch.tensor([client_id - 1], dtype=torch.long).to(Config().device())
-        )
+        weights = self.generate_attentions(hnet, [client_id])[client_id]
         self.current_weights = weights
         return weights
 
-    def calculate_hnet_grads(self, node_weights, delta_theta, hnet):
-        """Manullay calculate the gradients of hypernet."""
+    def generate_attentions(self, hnet, client_ids):
+        """Generate the customized attentions of several clients in one batched
+        forward pass of the hypernet."""
+        weights = hnet.batched_forward(
+            torch.tensor(
+                [client_id - 1 for client_id in client_ids], dtype=torch.long
+            ).to(Config().device())
+        )
+        return {
+            client_id: OrderedDict(
+                (name, value[index]) for name, value in weights.items()
+            )
+            for index, client_id in enumerate(client_ids)
+        }
+
+    def calculate_hnet_grads(self, node_weights, delta_thetas, sample_weights, hnet):
+        """Manullay calculate the gradients of hypernet, as the sum of the
+        vector-Jacobian products of all the clients weighted by their numbers of
+        samples, in a single backward pass."""
+        outputs = []
+        grad_outputs = []
+        for client_weights, delta_theta, sample_weight in zip(
+            node_weights, delta_thetas, sample_weights
+        ):
+            for name, weight in client_weights.items():
+                outputs.append(weight)
+                grad_outputs.append(sample_weight * delta_theta[name])
+
         hnet_grads = torch.autograd.grad(
-            list(node_weights.values()),
+            outputs,
             hnet.parameters(),
-            grad_outputs=list(delta_theta.values()),
+            grad_outputs=grad_outputs,
             retain_graph=True,
         )
         return hnet_grads
@@ -47,14 +47,33 @@ class Server(fedavg.Server):
         self.attentions = {}
         self.current_attention = None
 
+        # The attentions generated for the selected clients, yet to be sent
+        self.pending_attentions = {}
+
     def training_will_start(self) -> None:
         """Assign optimizer particular for hypernetwork."""
         self.hnet_optimizer = self.algorithm.get_hnet_optimizer(self.hnet)
         return super().training_will_start()
 
+    def choose_clients(self, clients_pool, clients_count):
+        """Choose clients, and generate their personalized attentions in a batch."""
+        selected_clients = super().choose_clients(clients_pool, clients_count)
+
+        if len(selected_clients) > 0:
+            self.pending_attentions = self.algorithm.generate_attentions(
+                self.hnet, selected_clients
+            )
+
+        return selected_clients
+
     def customize_server_response(self, server_response: dict, client_id) -> dict:
         """Generate personalized attention for models of each client and have a copy on server."""
-        attentions_customized = self.algorithm.generate_attention(self.hnet, client_id)
+        if client_id in self.pending_attentions:
+            attentions_customized = self.pending_attentions.pop(client_id)
+        else:
+            attentions_customized = self.algorithm.generate_attention(
+                self.hnet, client_id
+            )
 
         self.attentions[client_id] = attentions_customized
         self.current_attention = attentions_customized
@@ -72,37 +91,28 @@ class Server(fedavg.Server):
     async def aggregate_weights(self, updates, baseline_weights, weights_received):
         """Aggregation of weights in FedTP."""
 
-        # pylint:disable=too-many-locals
-
         deltas_recieved = self.algorithm.compute_weight_deltas(
             baseline_weights, weights_received
         )
 
         self.total_samples = sum(update.report.num_samples for update in updates)
 
-        grads_update = OrderedDict()
-        for idx, update in enumerate(updates):
-            node_weights = self.attentions[update.client_id]
-            delta_theta = OrderedDict(
+        node_weights = [self.attentions[update.client_id] for update in updates]
+        delta_thetas = [
+            OrderedDict(
                 {
-                    k: node_weights[k] - weights_received[idx][k]
-                    for k in node_weights.keys()
+                    k: node_weights[idx][k] - weights_received[idx][k]
+                    for k in node_weights[idx].keys()
                 }
             )
-            hnet_grads = self.algorithm.calculate_hnet_grads(
-                node_weights, delta_theta, self.hnet
-            )
-
-            if idx == 0:
-                grads_update = [
-                    update.report.num_samples / self.total_samples * x
-                    for x in hnet_grads
-                ]
-            else:
-                for grad_idx, hnet_grad in enumerate(hnet_grads):
-                    grads_update[grad_idx] += (
-                        update.report.num_samples / self.total_samples * hnet_grad
-                    )
+            for idx in range(len(updates))
+        ]
+        sample_weights = [
+            update.report.num_samples / self.total_samples for update in updates
+        ]
+        grads_update = self.algorithm.calculate_hnet_grads(
+            node_weights, delta_thetas, sample_weights, self.hnet
+        )
 
         self.hnet_optimizer.zero_grad()
 
@@ -67,22 +67,29 @@ class ViTHyper(nn.Module):
 
     def forward(self, idx):
         "The forward pass of hypernetwork."
-        weights = 0
+        return OrderedDict(
+            (name, value[0]) for name, value in self.batched_forward(idx).items()
+        )
+
+    def batched_forward(self, idx):
+        """The forward pass of hypernetwork for a batch of clients, in which the
+        first dimension of each generated weight indexes the clients."""
         emd = self.embeddings(idx)
         features = self.mlp(emd)
+        batch_size = len(idx)
         weights = OrderedDict()
         for dep in range(self.depth):
             layer_d_qkv_value_hyper = self.to_qkv_value_list[dep]
             attention_map = Config().parameters.hypernet.attention.split(",")
             if len(attention_map) == 1:
                 layer_d_qkv_value = layer_d_qkv_value_hyper(features).view(
-                    self.inner_dim * 3, self.dim
+                    batch_size, self.inner_dim * 3, self.dim
                 )
                 name = Config().parameters.hypernet.attention % (dep)
                 weights[name] = layer_d_qkv_value.cpu()
             else:
                 layer_d_qkv_value = [
-                    layer(features).view(self.inner_dim, self.dim)
+                    layer(features).view(batch_size, self.inner_dim, self.dim)
                     for layer in layer_d_qkv_value_hyper
                 ]
                 name = Config().parameters.hypernet.attention % (dep, dep, dep)
@@ -13,10 +13,13 @@ Reference: https://arxiv.org/abs/2203.07320
 """
 import logging
 import os
+import pickle
 
 from plato.config import Config
 from plato.utils.lib_mia import mia_server
 
+import model_history
+
 
 class Server(mia_server.Server):
     """A federated unlearning server that implements the federated unlearning baseline algorithm.
@@ -31,6 +34,12 @@ class Server(mia_server.Server):
     for the first time, and starts retraining phases from there. Otherwise, it will keep training
     but with client #1 deleting a percentage of its data samples, according to `delete_data_ratio`
     in the configuration.
+
+    Instead of a full checkpoint of the model in every round, the server keeps a history of
+    models as periodic keyframes and compressed deltas, from which the model in any round is
+    rebuilt when rolling back. With 'subtract_contributions' enabled in the configuration, the
+    server also records the contribution of each client in each round, and unlearns the clients
+    requesting data deletion by subtracting their contributions from the model instead.
     """
 
     def __init__(
@@ -51,6 +60,21 @@ class Server(mia_server.Server):
         # A dictionary that maps client IDs to their sample indices
         self.sample_indices = {}
 
+        # The history of models in past rounds, used for rolling back
+        self.model_history = model_history.ModelHistory(
+            f"{Config.params['checkpoint_path']}/model_history",
+            keyframe_interval=Config().server.keyframe_interval
+            if hasattr(Config().server, "keyframe_interval")
+            else 10,
+        )
+
+        # Whether the clients requesting data deletion are unlearned by subtracting
+        # their recorded contributions rather than by retraining
+        self.subtract_contributions = (
+            hasattr(Config().server, "subtract_contributions")
+            and Config().server.subtract_contributions
+        )
+
     def clients_selected(self, selected_clients):
         """Remembers the first round that a particular client ID was selected."""
         for client_id in selected_clients:
@@ -73,7 +97,9 @@ class Server(mia_server.Server):
         will be aggregated after data_deletion_round.
         """
         if not self.retraining:
-            return await super().aggregate_deltas(updates, deltas_received)
+            avg_update = await super().aggregate_deltas(updates, deltas_received)
+            self._record_contributions(updates, deltas_received)
+            return avg_update
 
         recent_mask = list(
             map(lambda update: update.staleness <= self.current_round, updates)
@@ -86,12 +112,75 @@ class Server(mia_server.Server):
             delta for delta, fresh in zip(deltas_received, recent_mask) if fresh
         ]
 
-        return await super().aggregate_deltas(recent_updates, recent_deltas_received)
+        avg_update = await super().aggregate_deltas(
+            recent_updates, recent_deltas_received
+        )
+        self._record_contributions(recent_updates, recent_deltas_received)
+        return avg_update
+
+    def _record_contributions(self, updates, deltas_received):
+        """Records the weighted delta of each client aggregated in this round."""
+        if not self.subtract_contributions or len(updates) == 0:
+            return
+
+        contributions = {}
+        for update, delta in zip(updates, deltas_received):
+            weight = update.report.num_samples / self.total_samples
+            contributions[update.client_id] = {
+                name: value * weight for name, value in delta.items()
+            }
+
+        self.model_history.record_contributions(self.current_round, contributions)
+
+    def _record_round(self) -> None:
+        """Records the model after the current round in the history of models, along
+        with the random states, unless they have been recorded already."""
+        if self.current_round in self.model_history.rounds:
+            return
+
+        logging.info(
+            "[%s] Recording the model after round #%s in the model history.",
+            self,
+            self.current_round,
+        )
+        self.model_history.record(self.current_round, self.algorithm.extract_weights())
+        self._save_random_states(self.current_round, Config.params["checkpoint_path"])
+
+    def save_to_checkpoint(self) -> None:
+        """Saves the current round, with the model in the history of models."""
+        checkpoint_path = Config.params["checkpoint_path"]
+
+        self._record_round()
+
+        # Saving the current round in the server for resuming its session later on
+        with open(f"{checkpoint_path}/current_round.pkl", "wb") as checkpoint_file:
+            pickle.dump(self.current_round, checkpoint_file)
+
+    def _resume_from_checkpoint(self):
+        """Resumes a training session from the model history."""
+        logging.info("[%s] Resume a training session from the model history.", self)
+
+        checkpoint_path = Config.params["checkpoint_path"]
+
+        with open(f"{checkpoint_path}/current_round.pkl", "rb") as checkpoint_file:
+            self.current_round = pickle.load(checkpoint_file)
+
+        self._restore_random_states(self.current_round, checkpoint_path)
+        self.resumed_session = True
+
+        self.algorithm.load_weights(self.model_history.load(self.current_round))
+
+        # The rounds recorded after the checkpoint are trained again
+        self.model_history.truncate(self.current_round)
 
     def clients_processed(self):
         """Enters the retraining phase if a specific set of conditions are satisfied."""
         super().clients_processed()
 
+        # The model is recorded after every round, rather than only in the rounds
+        # with checkpoints, so that the server is able to roll back to any round
+        self._record_round()
+
         # MIA evaluation after unlearning
         if (
             hasattr(Config().server, "mia_eval")
@@ -118,7 +207,11 @@ class Server(mia_server.Server):
                     if earliest_round > first_round:
                         earliest_round = first_round
 
-            if self.retraining:
+            if self.retraining and self.subtract_contributions:
+                self.retraining = False
+                self._subtract_contributions(clients_to_delete)
+
+            elif self.retraining:
                 self.current_round = earliest_round - 1
 
                 logging.info(
@@ -127,21 +220,19 @@ class Server(mia_server.Server):
                     self.current_round,
                 )
 
-                # Loading the saved model on the server for starting the retraining phase
+                # Rebuilding the model on the server for starting the retraining phase,
+                # and discarding the history after it
                 checkpoint_path = Config.params["checkpoint_path"]
 
-                model_name = (
-                    Config().trainer.model_name
-                    if hasattr(Config().trainer, "model_name")
-                    else "custom"
+                self.algorithm.load_weights(
+                    self.model_history.load(self.current_round)
                 )
-                filename = f"checkpoint_{model_name}_{self.current_round}.pth"
-                self.trainer.load_model(filename, checkpoint_path)
+                self.model_history.truncate(self.current_round)
 
                 logging.info(
-                    "[Server #%d] Model used for the retraining phase loaded from %s.",
+                    "[Server #%d] Model used for the retraining phase rebuilt from %s.",
                     os.getpid(),
-                    checkpoint_path,
+                    self.model_history.history_path,
                 )
 
                 if (
@@ -156,3 +247,22 @@ class Server(mia_server.Server):
                     )
 
                     self._restore_random_states(self.current_round, checkpoint_path)
+
+    def _subtract_contributions(self, clients_to_delete):
+        """Unlearns the clients requesting data deletion by subtracting all their
+        recorded contributions from the current model."""
+        contributions = self.model_history.contributions(clients_to_delete)
+        weights = self.algorithm.extract_weights()
+
+        for name, contribution in contributions.items():
+            weights[name] = (weights[name] - contribution.to(weights[name].device)).to(
+                weights[name].dtype
+            )
+
+        self.algorithm.load_weights(weights)
+
+        logging.info(
+            "[%s] Data deleted. Contributions of clients %s subtracted from the model.",
+            self,
+            clients_to_delete,
+        )
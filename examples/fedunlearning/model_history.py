@@ -0,0 +1,218 @@
+"""
+A history of the global models in past rounds, for rolling back federated unlearning.
+
+Instead of a full checkpoint of the global model in every round, the history keeps a
+full model, a keyframe, every `keyframe_interval` recorded rounds, and in the other
+rounds a delta from the model recorded in the previous round. A delta is the bitwise
+XOR between the bits of two consecutive models, which recovers the model exactly,
+and leaves most of the high-order bytes at zero so that it compresses well with zstd.
+The model in any recorded round is rebuilt by replaying at most
+`keyframe_interval - 1` deltas on the latest keyframe before it.
+
+The contribution of each client to the global model in each round, which is its
+weighted delta in federated averaging, can also be recorded in its own file, so that
+the contributions of the clients requesting deletion can be subtracted directly.
+"""
+import os
+import pickle
+import re
+
+import torch
+import zstd
+
+# The integer types whose bits are XORed for each size of the elements of a tensor
+INTEGER_VIEWS = {1: torch.uint8, 2: torch.int16, 4: torch.int32, 8: torch.int64}
+
+
+def _to_bits(tensor):
+    """Returns the bits of a tensor as an integer tensor with the same element size."""
+    tensor = tensor.detach().cpu().contiguous()
+
+    if tensor.dtype == torch.bool:
+        return tensor.to(torch.uint8)
+    if tensor.is_floating_point():
+        return tensor.view(INTEGER_VIEWS[tensor.element_size()])
+    return tensor
+
+
+def _from_bits(bits, dtype):
+    """Returns the tensor of the given type whose bits are in an integer tensor."""
+    if dtype == torch.bool:
+        return bits.to(torch.bool)
+    return bits.view(dtype)
+
+
+class ModelHistory:
+    """The models in past rounds as keyframes and deltas, and the client
+    contributions to them."""
+
+    def __init__(self, history_path, keyframe_interval=10, compression_level=1):
+        self.history_path = history_path
+        self.keyframe_interval = keyframe_interval
+        self.compression_level = compression_level
+
+        # Whether the model in each recorded round is a keyframe or a delta
+        self.rounds = {}
+        # The IDs of the clients whose contributions are recorded in each round
+        self.contributing_clients = {}
+
+        # The most recently recorded model, from which the next delta is computed,
+        # and the number of deltas recorded since the latest keyframe
+        self.last_round = None
+        self.last_weights = None
+        self.chain_length = 0
+
+        os.makedirs(self.history_path, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        """Builds the index of the history from the files in its directory, so that
+        a resumed session continues the history recorded before."""
+        self.rounds = {}
+        self.contributing_clients = {}
+
+        for filename in os.listdir(self.history_path):
+            model_match = re.fullmatch(r"(keyframe|delta)_(\d+)\.zst", filename)
+            if model_match:
+                self.rounds[int(model_match.group(2))] = model_match.group(1)
+
+            contribution_match = re.fullmatch(
+                r"contribution_(\d+)_(\d+)\.zst", filename
+            )
+            if contribution_match:
+                self.contributing_clients.setdefault(
+                    int(contribution_match.group(1)), set()
+                ).add(int(contribution_match.group(2)))
+
+        recorded = sorted(self.rounds)
+        self.last_round = recorded[-1] if recorded else None
+        self.last_weights = None
+        self.chain_length = 0
+        for round_number in reversed(recorded):
+            if self.rounds[round_number] == "keyframe":
+                break
+            self.chain_length += 1
+
+    def _path(self, kind, *numbers):
+        """Returns the path of a file in the history."""
+        return os.path.join(
+            self.history_path, "_".join([kind] + [str(n) for n in numbers]) + ".zst"
+        )
+
+    def _write(self, path, data):
+        """Writes compressed data to a file in the history."""
+        with open(path, "wb") as history_file:
+            history_file.write(
+                zstd.compress(pickle.dumps(data), self.compression_level)
+            )
+
+    @staticmethod
+    def _read(path):
+        """Reads compressed data from a file in the history."""
+        with open(path, "rb") as history_file:
+            return pickle.loads(zstd.decompress(history_file.read()))
+
+    def record(self, round_number, weights):
+        """Records the global model after a round, replacing any models recorded in
+        the same or later rounds."""
+        if self.last_round is not None and round_number <= self.last_round:
+            self.truncate(round_number - 1)
+
+        weights = {
+            name: value.detach().cpu().clone() for name, value in weights.items()
+        }
+
+        if self.last_weights is None and self.last_round is not None:
+            self.last_weights = self.load(self.last_round)
+
+        is_keyframe = (
+            self.last_weights is None
+            or self.chain_length + 1 >= self.keyframe_interval
+            or list(weights) != list(self.last_weights)
+            or any(
+                value.shape != self.last_weights[name].shape
+                or value.dtype != self.last_weights[name].dtype
+                for name, value in weights.items()
+            )
+        )
+
+        if is_keyframe:
+            self._write(self._path("keyframe", round_number), weights)
+            self.rounds[round_number] = "keyframe"
+            self.chain_length = 0
+        else:
+            delta = {
+                name: torch.bitwise_xor(
+                    _to_bits(value), _to_bits(self.last_weights[name])
+                )
+                for name, value in weights.items()
+            }
+            self._write(self._path("delta", round_number), delta)
+            self.rounds[round_number] = "delta"
+            self.chain_length += 1
+
+        self.last_round = round_number
+        self.last_weights = weights
+
+    def load(self, round_number):
+        """Rebuilds the global model recorded after a round."""
+        if round_number not in self.rounds:
+            raise ValueError(f"The model after round {round_number} is not recorded.")
+
+        if round_number == self.last_round and self.last_weights is not None:
+            return {name: value.clone() for name, value in self.last_weights.items()}
+
+        recorded = sorted(r for r in self.rounds if r <= round_number)
+        keyframe_round = max(r for r in recorded if self.rounds[r] == "keyframe")
+
+        keyframe = self._read(self._path("keyframe", keyframe_round))
+        bits = {name: _to_bits(value) for name, value in keyframe.items()}
+
+        for delta_round in recorded[recorded.index(keyframe_round) + 1 :]:
+            for name, delta in self._read(self._path("delta", delta_round)).items():
+                bits[name] = torch.bitwise_xor(bits[name], delta)
+
+        return {name: _from_bits(bits[name], keyframe[name].dtype) for name in bits}
+
+    def truncate(self, round_number):
+        """Removes the models and the contributions recorded after a round, such as
+        when the server rolls back to that round."""
+        for recorded_round, kind in list(self.rounds.items()):
+            if recorded_round > round_number:
+                os.remove(self._path(kind, recorded_round))
+
+        for recorded_round, client_ids in list(self.contributing_clients.items()):
+            if recorded_round > round_number:
+                for client_id in client_ids:
+                    os.remove(self._path("contribution", recorded_round, client_id))
+
+        self._scan()
+
+    def record_contributions(self, round_number, contributions):
+        """Records the contribution of each client to the global model in a round,
+        given as a dictionary from client IDs to their weighted deltas."""
+        for client_id, contribution in contributions.items():
+            self._write(
+                self._path("contribution", round_number, client_id),
+                {
+                    name: value.detach().cpu().clone()
+                    for name, value in contribution.items()
+                },
+            )
+            self.contributing_clients.setdefault(round_number, set()).add(client_id)
+
+    def contributions(self, client_ids):
+        """Returns the sum of all the recorded contributions of the given clients."""
+        total = {}
+
+        for round_number, contributing_clients in sorted(
+            self.contributing_clients.items()
+        ):
+            for client_id in sorted(contributing_clients.intersection(client_ids)):
+                contribution = self._read(
+                    self._path("contribution", round_number, client_id)
+                )
+                for name, value in contribution.items():
+                    total[name] = total[name] + value if name in total else value
+
+        return total
@@ -5,13 +5,13 @@ HeteroFL algorithm.
 import sys
 import pickle
 import random
-import copy
 
 import torch
 import ptflops
 import numpy as np
 from plato.config import Config
 from plato.algorithms import fedavg
+from plato.utils import width_slicing
 
 
 class Algorithm(fedavg.Algorithm):
@@ -21,6 +21,7 @@ class Algorithm(fedavg.Algorithm):
         super().__init__(trainer)
         self.current_rate = 1
         self.model_class = None
+        self.slicer = width_slicing.WidthSlicer(width_slicing.is_weight_or_bias)
         self.size_complexities = np.zeros(5)
         self.flops_complexities = np.zeros(5)
         self.rates = np.array([1, 0.5, 0.25, 0.125, 0.0625])
@@ -75,67 +76,28 @@ class Algorithm(fedavg.Algorithm):
         Get the parameters of local models from the global model.
         """
         current_rate = self.current_rate
-        pre_model = self.model_class(
-            model_rate=current_rate, **Config().parameters.client_model._asdict()
+        return self.slicer.extract(
+            current_rate,
+            self.model.state_dict(),
+            lambda: self.model_class(
+                model_rate=current_rate, **Config().parameters.client_model._asdict()
+            ),
         )
-        local_parameters = pre_model.state_dict()
-        for key, value in self.model.state_dict().items():
-            if "weight" in key or "bias" in key:
-                if value.dim() == 4 or value.dim() == 2:
-                    local_parameters[key] = copy.deepcopy(
-                        value[
-                            : local_parameters[key].shape[0],
-                            : local_parameters[key].shape[1],
-                            ...,
-                        ]
-                    )
-                else:
-                    local_parameters[key] = copy.deepcopy(
-                        value[: local_parameters[key].shape[0]]
-                    )
-        return local_parameters
 
     def aggregation(self, weights_received):
         """
         Aggregate weights of different complexities.
         """
-        global_parameters = copy.deepcopy(self.model.state_dict())
-        for key, value in self.model.state_dict().items():
-            if "weight" in key or "bias" in key:
-                count = torch.zeros(value.shape)
-                for local_weights in weights_received:
-                    if value.dim() == 4:
-                        global_parameters[key][
-                            : local_weights[key].shape[0],
-                            : local_weights[key].shape[1],
-                            ...,
-                        ] += copy.deepcopy(local_weights[key])
-                        count[
-                            : local_weights[key].shape[0],
-                            : local_weights[key].shape[1],
-                            ...,
-                        ] += torch.ones(local_weights[key].shape)
-                    elif value.dim() == 2:
-                        global_parameters[key][
-                            : local_weights[key].shape[0],
-                            : local_weights[key].shape[1],
-                        ] += copy.deepcopy(local_weights[key])
-                        count[
-                            : local_weights[key].shape[0],
-                            : local_weights[key].shape[1],
-                        ] += torch.ones(local_weights[key].shape)
-                    elif value.dim() == 1:
-                        global_parameters[key][
-                            : local_weights[key].shape[0]
-                        ] += copy.deepcopy(local_weights[key])
-                        count[: local_weights[key].shape[0]] += torch.ones(
-                            local_weights[key].shape
-                        )
-                count = torch.where(count == 0, torch.ones(count.shape), count)
-                global_parameters[key] = torch.div(
-                    global_parameters[key] - value, count
-                )
-        return global_parameters
+        global_parameters = self.model.state_dict()
+        return width_slicing.aggregate(
+            global_parameters,
+            weights_received,
+            [
+                key
+                for key, value in global_parameters.items()
+                if width_slicing.is_weight_or_bias(key, value)
+            ],
+        )
 
     def stat(self, model_class, trainloader):
         """
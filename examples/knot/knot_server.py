@@ -12,8 +12,6 @@ from collections import deque
 import numpy
 import torch
 import torch.nn.functional as F
-from cvxopt import matrix
-from numpy.linalg import norm
 
 from plato.config import Config
 from plato.utils import fonts
@@ -699,47 +697,29 @@ class Server(fedunlearning_server.Server):
 
     def _convert_to_solver(self, client_training_times):
         """Transform useful dictionaries to solvable matrix."""
-        # Transfer the values of dic to list.
-        training_time_list = list(client_training_times.values())
-        similarity_list = list(self.clients_similarity.values())
+        # Transfer the values of dic to arrays.
+        training_times = numpy.fromiter(client_training_times.values(), dtype=float)
+        similarities = numpy.fromiter(self.clients_similarity.values(), dtype=float)
 
         # Anchor intervals between clusters: (max value - min value) / the number of clusters
         similarity_interval = (
-            max(similarity_list) - min(similarity_list)
+            similarities.max() - similarities.min()
         ) / self.num_clusters
-
         training_time_interval = (
-            max(training_time_list) - min(training_time_list)
+            training_times.max() - training_times.min()
         ) / self.num_clusters
 
-        # Produce matrices containing the distances between input data and cluster anchors
-        training_anchor_distances = []
-        similarity_anchor_distances = []
-
-        for cluster_id in range(self.num_clusters):
-            training_anchor_distances.append(
-                [
-                    abs(
-                        training_time_interval * cluster_id
-                        + min(training_time_list)
-                        - time
-                    )
-                    for time in training_time_list
-                ]
-            )
-            similarity_anchor_distances.append(
-                [
-                    abs(
-                        similarity_interval * cluster_id
-                        + min(similarity_list)
-                        - similarity
-                    )
-                    for similarity in similarity_list
-                ]
-            )
-
-        training_time_np_matrix = numpy.matrix(training_anchor_distances)
-        similarity_np_matrix = numpy.matrix(similarity_anchor_distances)
+        # Produce matrices containing the distances between input data and cluster
+        # anchors, with clusters as rows and clients as columns
+        cluster_ids = numpy.arange(self.num_clusters)[:, None]
+        training_anchor_distances = numpy.abs(
+            training_time_interval * cluster_ids
+            + training_times.min()
+            - training_times
+        )
+        similarity_anchor_distances = numpy.abs(
+            similarity_interval * cluster_ids + similarities.min() - similarities
+        )
 
         # Use scaler to tune the weight of training time and similarity on opt problem.
         # The range of original training time is 0 - 30, similarity is 0 - 1.
@@ -748,33 +728,17 @@ class Server(fedunlearning_server.Server):
         training_time_scaler = 1
         similarity_scaler = 1
 
-        training_time_matrix = training_time_np_matrix * training_time_scaler
-        similarity_matrix = similarity_np_matrix * similarity_scaler
-
-        # Transfer numpy.matrix to cvxopt.matrix for indexing.
-        training_time_matrix = matrix(training_time_matrix)
-        similarity_matrix = matrix(similarity_matrix)
-
-        l2_list = []
-
-        for client_id in self.clusters:
-            for cluster_id in range(self.num_clusters):
-                # The key of self.clusters are client_ids, the index start from 1
-                # Thus, we use (client_id - 1) as the matrix index here.
-                l2_array = numpy.array(
-                    [
-                        training_time_matrix[cluster_id, client_id - 1],
-                        similarity_matrix[cluster_id, client_id - 1],
-                    ]
-                )
+        training_time_matrix = training_anchor_distances * training_time_scaler
+        similarity_matrix = similarity_anchor_distances * similarity_scaler
 
-                # Calculate the norm.
-                l2_norm = norm(l2_array, 2)
-                l2_list.append(l2_norm)
+        # The key of self.clusters are client_ids, the index start from 1
+        # Thus, we use (client_id - 1) as the matrix index here.
+        columns = numpy.fromiter(self.clusters, dtype=int) - 1
 
-        l2_matrix = matrix(l2_list, training_time_np_matrix.shape)
-
-        return l2_matrix
+        # Calculate the norm.
+        return numpy.hypot(
+            training_time_matrix[:, columns], similarity_matrix[:, columns]
+        )
 
     def _optimize_clustering(self, updates):
         """
@@ -4,6 +4,9 @@ A customized trainer for the federated unlearning baseline clustering algorithm.
 """
 
 import asyncio
+import copy
+import logging
+import os
 
 import torch
 
@@ -14,8 +17,18 @@ from plato.trainers import basic
 class Trainer(basic.Trainer):
     """A federated learning trainer using the Knot algorithm."""
 
+    def __init__(self, model=None, callbacks=None):
+        super().__init__(model=model, callbacks=callbacks)
+
+        # The test set on the device, split into batches, for the clustered test,
+        # and the test set and sampler they were loaded from, which are kept so that
+        # their IDs are not reused by other objects
+        self.clustered_test_batches = None
+        self.clustered_testset = None
+        self.clustered_test_sampler = None
+
     def server_clustered_test(self, testset, sampler=None, **kwargs):
-        """Separately perform the model test for all clusters."""
+        """Test the models of all clusters in a single pass over the test set."""
         # The models within each cluster should be provided in the argument,
         # and it should be a dictionary in which the keys are cluster IDs,
         # and the values are the corresponding models
@@ -26,40 +39,113 @@ class Trainer(basic.Trainer):
         assert "updated_cluster_ids" in kwargs
 
         clustered_models = kwargs["clustered_models"]
-        updated_cluster_ids = kwargs["updated_cluster_ids"]
-
-        clustered_test_accuracy = {}
-        config = Config().trainer._asdict()
-
-        # Preparing the test data loader
-        if sampler is None:
-            test_loader = torch.utils.data.DataLoader(
-                testset, batch_size=config["batch_size"], shuffle=False
-            )
-        else:
-            test_loader = torch.utils.data.DataLoader(
-                testset, batch_size=config["batch_size"], shuffle=False, sampler=sampler
-            )
-
-        for cluster_id in updated_cluster_ids:
-            cluster_model = clustered_models[cluster_id]
+        cluster_ids = list(kwargs["updated_cluster_ids"])
+        if len(cluster_ids) == 0:
+            return {}
 
+        models = [clustered_models[cluster_id] for cluster_id in cluster_ids]
+        for cluster_model in models:
             cluster_model.to(self.device)
             cluster_model.eval()
 
-            correct = 0
-            total = 0
-            with torch.no_grad():
-                for examples, labels in test_loader:
-                    examples, labels = examples.to(self.device), labels.to(self.device)
-
+        stacked_forward = self._stacked_forward(models)
+
+        correct = torch.zeros(len(models), dtype=torch.long, device=self.device)
+        total = 0
+        with torch.no_grad():
+            for examples, labels in self._clustered_test_batches(testset, sampler):
+                if stacked_forward is not None:
+                    try:
+                        # The outputs of all the models, stacked in the first dimension
+                        outputs = stacked_forward(examples)
+                        correct += (outputs.argmax(dim=-1) == labels).sum(dim=1)
+                        total += labels.size(0)
+                        continue
+                    except RuntimeError as error:
+                        logging.info(
+                            "[Server #%d] Testing the clusters one after another, as "
+                            "their models cannot be vectorized: %s",
+                            os.getpid(),
+                            error,
+                        )
+                        stacked_forward = None
+
+                for index, cluster_model in enumerate(models):
                     outputs = cluster_model(examples)
+                    correct[index] += (outputs.argmax(dim=1) == labels).sum()
+                total += labels.size(0)
+
+        # The accuracies of all the clusters are copied from the device at once
+        clustered_test_accuracy = (correct / total).tolist()
+        return dict(zip(cluster_ids, clustered_test_accuracy))
+
+    def _clustered_test_batches(self, testset, sampler=None):
+        """Return the batches of the test set on the device, which are loaded only
+        once. If `server:clustered_testset_size` is set, a fixed random subset of the
+        test set with that many samples is used."""
+        if (
+            self.clustered_test_batches is None
+            or self.clustered_testset is not testset
+            or self.clustered_test_sampler is not sampler
+        ):
+            config = Config().trainer._asdict()
+            test_loader = torch.utils.data.DataLoader(
+                testset, batch_size=config["batch_size"], shuffle=False, sampler=sampler
+            )
 
-                    _, predicted = torch.max(outputs.data, 1)
-                    total += labels.size(0)
-                    correct += (predicted == labels).sum().item()
-
-            cluster_acc = correct / total
-            clustered_test_accuracy[cluster_id] = cluster_acc
+            examples, labels = [], []
+            for batch_examples, batch_labels in test_loader:
+                examples.append(batch_examples)
+                labels.append(batch_labels)
+            examples = torch.cat(examples)
+            labels = torch.cat(labels)
+
+            if hasattr(Config().server, "clustered_testset_size"):
+                generator = torch.Generator().manual_seed(
+                    Config().server.random_seed
+                    if hasattr(Config().server, "random_seed")
+                    else 1
+                )
+                indices = torch.randperm(len(labels), generator=generator)
+                indices = indices[: Config().server.clustered_testset_size]
+                indices, __ = torch.sort(indices)
+                examples, labels = examples[indices], labels[indices]
+
+            self.clustered_test_batches = list(
+                zip(
+                    torch.split(examples.to(self.device), config["batch_size"]),
+                    torch.split(labels.to(self.device), config["batch_size"]),
+                )
+            )
+            self.clustered_testset = testset
+            self.clustered_test_sampler = sampler
+
+        return self.clustered_test_batches
+
+    @staticmethod
+    def _stacked_forward(models):
+        """Return a function running all the models on a batch at once, with their
+        parameters stacked, or None if the models do not share an architecture."""
+        if len(models) < 2:
+            return None
+
+        def signature(model):
+            return type(model), [
+                (name, value.shape, value.dtype)
+                for name, value in model.state_dict().items()
+            ]
+
+        first_signature = signature(models[0])
+        if any(signature(model) != first_signature for model in models[1:]):
+            return None
+
+        params, buffers = torch.func.stack_module_state(models)
+        base_model = copy.deepcopy(models[0]).to("meta")
+
+        def forward(params, buffers, examples):
+            return torch.func.functional_call(
+                base_model, (params, buffers), (examples,)
+            )
 
-        return clustered_test_accuracy
+        vectorized_forward = torch.func.vmap(forward, in_dims=(0, 0, None))
+        return lambda examples: vectorized_forward(params, buffers, examples)
@@ -2,102 +2,89 @@
 Solve the optimization problem to obtain an optimal solution
 that maximizes the total similarity score across the board
 
-The similarity matrix is a R * P matrix, where R is the number of reviewers, and P is 
+The similarity matrix is a R * P matrix, where R is the number of reviewers, and P is
 the number of papers
-'''
-
-import sys
-
-import mosek
-from cvxopt import matrix, solvers, sparse, spmatrix, uniform
-
-#from mosek import iparam
-
-# Suppress extensive logging
-# solvers.options['MOSEK'] = {mosek.iparam.log: 0}
-
-
-def solve(workload_max, workload_min, paper_nominal, tpc_count, paper_count,
-          similarity_matrix):
-
-    print("Solving the optimization problem with %d clusters and %d clients." %
-          (tpc_count, paper_count))
-
-    # building matrix c for the optimization objective
-    c = matrix(list(matrix(similarity_matrix).trans() * -1))
 
-    # Use the following for testing with small matrices, using lists to represent them
-    # c = matrix(list(matrix(similarity_matrix) * -1))
-
-    # building matrix G for inequality constraints
-
-    print("Producing matrix G: workload max constraints...")
-    row_indices = []
-    column_indices = []
-    for i in range(tpc_count):
-        for j in range(paper_count):
-            row_indices.append(i)
-            column_indices.append(j + i * paper_count)
-
-    w_max = spmatrix(1.0, row_indices, column_indices)
-
-    print("Producing matrix G: workload min constraints...")
-    row_indices = []
-    column_indices = []
-    for i in range(tpc_count):
-        for j in range(paper_count):
-            row_indices.append(i)
-            column_indices.append(j + i * paper_count)
-
-    w_min = spmatrix(-1.0, row_indices, column_indices)
+The constraint matrices are assembled as sparse matrices with NumPy index arithmetic,
+and the linear program is solved locally with the HiGHS solver in SciPy.
+'''
 
-    print("Producing matrix G: x >= 0 constraints...")
-    greater_than_zero = spmatrix(-1.0, range(tpc_count * paper_count),
-                                 range(tpc_count * paper_count))
+import numpy as np
+from scipy import sparse
+from scipy.optimize import linprog
 
-    print("Producing matrix G: x <= 1 constraints...")
-    less_than_one = spmatrix(1.0, range(tpc_count * paper_count),
-                             range(tpc_count * paper_count))
+# The constraints and the solution of the most recent problem, reused when
+# consecutive rounds solve a problem of the same size
+_last_problem = {}
 
-    G = sparse([[w_max, w_min, greater_than_zero, less_than_one]])
 
-    # Building matrix h for the right hand side of inequality constraints
-    print(
-        "Producing matrix h for the right hand side of inequality constraints..."
-    )
+def _constraints(workload_max, workload_min, paper_nominal, tpc_count, paper_count):
+    """ Build the sparse constraint matrices, or reuse the ones of the last round. """
+    key = (workload_max, workload_min, paper_nominal, tpc_count, paper_count)
+    if _last_problem.get('key') == key:
+        return _last_problem['constraints']
 
-    h_workload_upper = [workload_max for x in range(tpc_count)]
-    h_workload_lower = [-workload_min for x in range(tpc_count)]
+    # Variable x[tpc * paper_count + paper] is whether the paper is assigned to the TPC
+    variables = np.arange(tpc_count * paper_count)
+    ones = np.ones(tpc_count * paper_count)
 
-    h_greater_than_zero = [0. for x in range(tpc_count * paper_count)]
-    h_less_than_one = [1. for x in range(tpc_count * paper_count)]
+    # The workload of each TPC member, bounded from above and below
+    workload = sparse.csr_matrix(
+        (ones, (np.repeat(np.arange(tpc_count), paper_count), variables)),
+        shape=(tpc_count, tpc_count * paper_count))
+    A_ub = sparse.vstack([workload, -workload], format='csr')
+    b_ub = np.concatenate([
+        np.full(tpc_count, float(workload_max)),
+        np.full(tpc_count, -float(workload_min))
+    ])
 
-    h = matrix(
-        list(h_workload_upper + h_workload_lower + h_greater_than_zero +
-             h_less_than_one))
+    # The number of reviews per paper
+    A_eq = sparse.csr_matrix(
+        (ones, (np.tile(np.arange(paper_count), tpc_count), variables)),
+        shape=(paper_count, tpc_count * paper_count))
+    b_eq = np.full(paper_count, float(paper_nominal))
 
-    # building matrix A for the equality constraints
-    print("Producing matrix A: reviews per paper equality constraints...")
-    reviews_per_paper = spmatrix(1.0, range(paper_count), range(paper_count))
-    reviews_per_paper_list = [[reviews_per_paper] for x in range(tpc_count)]
-    reviews = sparse(reviews_per_paper_list)
+    _last_problem['key'] = key
+    _last_problem['constraints'] = (A_ub, b_ub, A_eq, b_eq)
+    _last_problem.pop('solution', None)
 
-    print("Producing matrix A: Conflicts of Interest equality constraints...")
+    return A_ub, b_ub, A_eq, b_eq
 
-    A = sparse([[reviews]])
 
-    # building matrix b for the right hand side of equality constraints
-    print(
-        "Producing matrix b for the right hand side of equality constraints..."
-    )
-    b_reviews_per_paper = [paper_nominal * 1. for x in range(paper_count)]
+def solve(workload_max, workload_min, paper_nominal, tpc_count, paper_count,
+          similarity_matrix):
 
-    b = matrix(list(b_reviews_per_paper))
+    print("Solving the optimization problem with %d clusters and %d clients." %
+          (tpc_count, paper_count))
 
-    # Run the LP solver.
-    print("Starting the LP solver.")
-    sol = solvers.lp(c, G, h, A, b, solver='mosek')
-    #sol = solvers.lp(c, G, h, A, b)
+    similarity_matrix = np.asarray(similarity_matrix, dtype=float)
+
+    # building vector c for the optimization objective
+    c = -similarity_matrix.ravel()
+
+    A_ub, b_ub, A_eq, b_eq = _constraints(workload_max, workload_min,
+                                          paper_nominal, tpc_count, paper_count)
+
+    last_solution = _last_problem.get('solution')
+    if last_solution is not None and np.array_equal(last_solution[0], c):
+        # The objective has not changed since the last round
+        x = last_solution[1]
+    else:
+        # Run the LP solver, with the bounds 0 <= x <= 1 on every variable
+        print("Starting the LP solver.")
+        sol = linprog(c,
+                      A_ub=A_ub,
+                      b_ub=b_ub,
+                      A_eq=A_eq,
+                      b_eq=b_eq,
+                      bounds=(0, 1),
+                      method='highs')
+        if sol.x is None:
+            raise ValueError("The optimization problem cannot be solved: " +
+                             sol.message)
+
+        x = sol.x
+        _last_problem['solution'] = (c, x)
 
     # Convert the solutions to a two-dimensional array,
     # with TPC members as rows, and papers as columns.
@@ -106,28 +93,22 @@ def solve(workload_max, workload_min, paper_nominal, tpc_count, paper_count,
     # An assignment array of [[0, 0, 1, 0, 0], [0, 1, 0, 1, 0], [1, 0, 0, 0, 1]]
     # implies that TPC 0 is assigned paper 2, TPC 1 is assigned paper 1 and 3,
     # and TPC 2 is assigned paper 0 and 4.
+    x = x.reshape(tpc_count, paper_count)
+    assignment = np.rint(x).astype(int)
+
+    is_half = np.abs(x - 0.5) < 0.01
+    assignment[is_half] = 1
+    is_fractional = (np.abs(x - assignment) >= 0.01) & ~is_half
+
+    for tpc, paper in np.argwhere(is_half):
+        print("Alert: The result for cluster '%d' and client '%d' is 0.5. "
+              " Its value is forcefully set to: %f" %
+              (tpc, paper + 1, assignment[tpc, paper]))
+
+    for tpc, paper in np.argwhere(is_fractional):
+        print(
+            "Alert: The result for cluster '%d' and client '%d' is not an integer. "
+            " Its value is forcefully set to: %f" %
+            (tpc, paper + 1, assignment[tpc, paper]))
 
-    assignment = [[0 for x in range(paper_count)] for x in range(tpc_count)]
-
-    for tpc in range(tpc_count):
-        for paper in range(paper_count):
-            if abs(sol['x'][tpc * paper_count + paper] - 1.0) < 0.01:
-                assignment[tpc][paper] = 1
-            elif abs(sol['x'][tpc * paper_count + paper] - 0.0) < 0.01:
-                assignment[tpc][paper] = 0
-            elif abs(sol['x'][tpc * paper_count + paper] - 0.5) < 0.01:
-                assignment[tpc][paper] = 1
-
-                print(
-                    "Alert: The result for cluster '%d' and client '%d' is 0.5. "
-                    " Its value is forcefully set to: %f" %
-                    (tpc, paper + 1, assignment[tpc][paper]))
-            else:
-                assignment[tpc][paper] = round(sol['x'][tpc * paper_count +
-                                                        paper])
-                print(
-                    "Alert: The result for cluster '%d' and client '%d' is not an integer. "
-                    " Its value is forcefully set to: %f" %
-                    (tpc, paper + 1, assignment[tpc][paper]))
-
-    return assignment
+    return assignment.tolist()
@@ -1,13 +1,13 @@
 """
 A MaskCrypt client with selective homomorphic encryption support.
 """
-import random
+import pickle
 import time
 import torch
-import pickle
 
 from plato.clients import simple
 from plato.config import Config
+from plato.utils import homo_enc
 import maskcrypt_utils
 
 
@@ -27,6 +27,11 @@ class Client(simple.Client):
 
         self.encrypt_ratio = Config().clients.encrypt_ratio
         self.random_mask = Config().clients.random_mask
+        # Whether the plain model weights are stored for attack evaluation
+        self.save_plain_weights = (
+            not hasattr(Config().clients, "save_plain_weights")
+            or Config().clients.save_plain_weights
+        )
         self.final_mask = None
 
         self.attack_prep_dir = f"{Config().data.datasource}_{Config().trainer.model_name}_{self.encrypt_ratio}"
@@ -52,7 +57,7 @@ class Client(simple.Client):
             return report, mask_proposal
         else:
             # Set final encryption mask and send model updates to server
-            self.final_mask = processed_inbound_payload
+            self.final_mask = homo_enc.bitmap_to_indices(processed_inbound_payload)
             report, weights = self.model_buffer.pop(self.client_id)
             # Set training_time to a non-zero value to avoid heapq.heappush error in base.Server Line 886
             report.training_time = 0.001
@@ -69,7 +74,7 @@ class Client(simple.Client):
         return maskcrypt_utils.get_est(est_filename)
 
     def _compute_mask(self, latest_weights, gradients):
-        """Compute the encryption mask for current client."""
+        """Compute the encryption mask for current client, as a bitmap."""
         exposed_flat = self._get_exposed_weights()
         exposed_flat = torch.tensor(exposed_flat)
         device = exposed_flat.device
@@ -80,30 +85,30 @@ class Client(simple.Client):
                 for _, name in enumerate(latest_weights)
             ]
         )
-        # Store the plain model weights
-        plain_filename = (
-            f"{self.checkpoint_path}/{self.attack_prep_dir}/"
-            + f"{Config().trainer.model_name}_plain_{self.client_id}.pth"
-        )
-        with open(plain_filename, "wb") as plain_file:
-            pickle.dump(latest_flat, plain_file)
+        if self.save_plain_weights:
+            # Store the plain model weights
+            plain_filename = (
+                f"{self.checkpoint_path}/{self.attack_prep_dir}/"
+                + f"{Config().trainer.model_name}_plain_{self.client_id}.pth"
+            )
+            with open(plain_filename, "wb") as plain_file:
+                pickle.dump(latest_flat, plain_file)
+
+        mask_len = int(self.encrypt_ratio * len(exposed_flat))
 
         if self.random_mask:
             # Return a random mask when enabled in config file
-            rand_mask = random.sample(
-                range(len(exposed_flat)), int(self.encrypt_ratio * len(exposed_flat))
-            )
-            return torch.tensor(rand_mask)
-
-        gradient_list = [
-            torch.flatten(gradients[name]).to(device)
-            for _, name in enumerate(gradients)
-        ]
-        grad_flat = torch.cat(gradient_list)
-        delta = exposed_flat - latest_flat
-        product = delta * grad_flat
+            indices = torch.randperm(len(exposed_flat))[:mask_len]
+        else:
+            gradient_list = [
+                torch.flatten(gradients[name]).to(device)
+                for _, name in enumerate(gradients)
+            ]
+            grad_flat = torch.cat(gradient_list)
+            delta = exposed_flat - latest_flat
+            product = delta * grad_flat
 
-        _, indices = torch.sort(product, descending=True)
-        mask_len = int(self.encrypt_ratio * len(indices))
+            # Only the largest products are needed, not a full sort
+            _, indices = torch.topk(product, mask_len, sorted=False)
 
-        return indices[:mask_len].clone().detach()
+        return homo_enc.indices_to_bitmap(indices.numpy(), size=len(exposed_flat))
@@ -1,10 +1,8 @@
 """
 A MaskCrypt server with selective homomorphic encryption support.
 """
-import torch
-import numpy as np
-
 from plato.servers import fedavg_he
+from plato.utils import homo_enc
 
 
 class Server(fedavg_he.Server):
@@ -44,19 +42,9 @@ class Server(fedavg_he.Server):
             return aggregated_weights
 
     def _mask_consensus(self, updates):
-        """Conduct mask consensus on the reported mask proposals."""
-        proposals = [update.payload for update in updates]
-        mask_size = len(proposals[0])
-        if mask_size == 0:
-            self.final_mask = torch.tensor([])
-        else:
-            interleaved_indices = torch.zeros(
-                (sum([len(x) for x in proposals])), dtype=int
-            )
-            for i in range(len(proposals)):
-                interleaved_indices[i :: len(proposals)] = proposals[i]
+        """Conduct mask consensus on the reported mask proposals.
 
-            _, indices = np.unique(interleaved_indices, return_index=True)
-            indices.sort()
-            self.final_mask = interleaved_indices[indices]
-            self.final_mask = self.final_mask.int().tolist()
+        The final mask is the union of all the proposals, merged as bitmaps.
+        """
+        proposals = [update.payload for update in updates]
+        self.final_mask = homo_enc.bitmaps_union(proposals)
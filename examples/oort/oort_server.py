@@ -15,6 +15,7 @@ import numpy as np
 
 from plato.servers import fedavg
 from plato.config import Config
+from plato.utils import client_selection
 
 
 class Server(fedavg.Server):
@@ -31,26 +32,29 @@ class Server(fedavg.Server):
             callbacks=callbacks,
         )
 
+        # The per-client statistics below are kept in arrays indexed by client ID,
+        # once the server is configured
+
         # Clients that will no longer be selected for future rounds.
-        self.blacklist = []
+        self.blacklisted = None
 
         # All clients' utilities
-        self.client_utilities = {}
+        self.client_utilities = None
 
         # All clients‘ training times
-        self.client_durations = {}
+        self.client_durations = None
 
         # Keep track of each client's last participated round.
-        self.client_last_rounds = {}
+        self.client_last_rounds = None
 
         # Number of times that each client has been selected
-        self.client_selected_times = {}
+        self.client_selected_times = None
 
         # The desired duration for each communication round
         self.desired_duration = Config().server.desired_duration
 
-        self.explored_clients = []
-        self.unexplored_clients = []
+        # Clients that have been selected at least once
+        self.explored = None
 
         self.exploration_factor = Config().server.exploration_factor
         self.step_window = Config().server.step_window
@@ -77,20 +81,15 @@ class Server(fedavg.Server):
         """Initialize necessary variables."""
         super().configure()
 
-        self.client_utilities = {
-            client_id: 0 for client_id in range(1, self.total_clients + 1)
-        }
-        self.client_durations = {
-            client_id: 0 for client_id in range(1, self.total_clients + 1)
-        }
-        self.client_last_rounds = {
-            client_id: 0 for client_id in range(1, self.total_clients + 1)
-        }
-        self.client_selected_times = {
-            client_id: 0 for client_id in range(1, self.total_clients + 1)
-        }
-
-        self.unexplored_clients = list(range(1, self.total_clients + 1))
+        self.blacklisted = np.zeros(self.total_clients + 1, dtype=bool)
+        self.client_utilities = np.zeros(self.total_clients + 1)
+        self.client_durations = np.zeros(self.total_clients + 1)
+        self.client_last_rounds = np.zeros(self.total_clients + 1, dtype=int)
+        self.client_selected_times = np.zeros(self.total_clients + 1, dtype=int)
+
+        # Entry 0 is not a client, and is never explored
+        self.explored = np.zeros(self.total_clients + 1, dtype=bool)
+        self.explored[0] = True
 
     def weights_aggregated(self, updates):
         """Method called at the end of aggregating received weights."""
@@ -119,95 +118,70 @@ class Server(fedavg.Server):
                 self.desired_duration += self.pacer_step
 
         # Blacklist clients who have been selected self.blacklist_num times
-        for update in updates:
-            if self.client_selected_times[update.client_id] > self.blacklist_num:
-                self.blacklist.append(update.client_id)
+        client_ids = [update.client_id for update in updates]
+        self.blacklisted[client_ids] |= (
+            self.client_selected_times[client_ids] > self.blacklist_num
+        )
 
     def choose_clients(self, clients_pool, clients_count):
         """Choose a subset of the clients to participate in each round."""
         selected_clients = []
+        unexplored_clients = np.flatnonzero(~self.explored)
 
         if self.current_round > 1:
             # Exploitation
             exploited_clients_count = max(
                 math.ceil((1.0 - self.exploration_factor) * clients_count),
-                clients_count - len(self.unexplored_clients),
+                clients_count - len(unexplored_clients),
             )
 
-            sorted_by_utility = sorted(
-                self.client_utilities, key=self.client_utilities.get, reverse=True
-            )
-            sorted_by_utility = [
-                client for client in sorted_by_utility if client in clients_pool
-            ]
-
-            # Calculate cut-off utility
-            cut_off_util = (
-                self.client_utilities[sorted_by_utility[exploited_clients_count - 1]]
-                * self.cut_off
+            available = client_selection.availability_mask(
+                self.total_clients, clients_pool
             )
-
-            # Include clients with utilities higher than the cut-off
-            exploited_clients = []
-            for client_id in sorted_by_utility:
-                if (
-                    self.client_utilities[client_id] > cut_off_util
-                    and client_id not in self.blacklist
-                ):
-                    exploited_clients.append(client_id)
-
-            # Sample clients with their utilities
-            total_utility = float(
-                sum(self.client_utilities[client_id] for client_id in exploited_clients)
+            top_clients = client_selection.sorted_by_value(
+                self.client_utilities, available, exploited_clients_count
             )
 
-            probabilities = [
-                self.client_utilities[client_id] / total_utility
-                for client_id in exploited_clients
-            ]
+            if len(top_clients) > 0:
+                # Calculate cut-off utility
+                cut_off_util = self.client_utilities[top_clients[-1]] * self.cut_off
 
-            if len(probabilities) > 0 and exploited_clients_count > 0:
-                selected_clients = np.random.choice(
-                    exploited_clients,
-                    min(len(exploited_clients), exploited_clients_count),
-                    p=probabilities,
-                    replace=False,
+                # Include clients with utilities higher than the cut-off
+                above_cut_off = self.client_utilities > cut_off_util
+                exploited_clients = np.flatnonzero(
+                    available & above_cut_off & ~self.blacklisted
                 )
-                selected_clients = selected_clients.tolist()
-
-            last_index = (
-                sorted_by_utility.index(exploited_clients[-1])
-                if exploited_clients
-                else 0
-            )
 
-            # If the result of exploitation wasn't enough to meet the required length
-            if len(selected_clients) < exploited_clients_count:
-                for index in range(last_index + 1, len(sorted_by_utility)):
-                    if (
-                        not sorted_by_utility[index] in self.blacklist
-                        and len(selected_clients) < exploited_clients_count
-                    ):
-                        selected_clients.append(sorted_by_utility[index])
+                # Sample clients with their utilities
+                selected_clients = client_selection.weighted_sample(
+                    exploited_clients,
+                    self.client_utilities[exploited_clients],
+                    exploited_clients_count,
+                ).tolist()
+
+                # If the result of exploitation wasn't enough to meet the required
+                # length, include the clients with the next highest utilities
+                if len(selected_clients) < exploited_clients_count:
+                    selected_clients += client_selection.sorted_by_value(
+                        self.client_utilities,
+                        available & ~above_cut_off & ~self.blacklisted,
+                        exploited_clients_count - len(selected_clients),
+                    ).tolist()
 
         # Exploration
         random.setstate(self.prng_state)
 
         # Select unexplored clients randomly
         selected_unexplore_clients = random.sample(
-            self.unexplored_clients, clients_count - len(selected_clients)
+            unexplored_clients.tolist(), clients_count - len(selected_clients)
         )
 
         self.prng_state = random.getstate()
-        self.explored_clients += selected_unexplore_clients
-
-        for client_id in selected_unexplore_clients:
-            self.unexplored_clients.remove(client_id)
+        self.explored[selected_unexplore_clients] = True
 
         selected_clients += selected_unexplore_clients
 
-        for client in selected_clients:
-            self.client_selected_times[client] += 1
+        self.client_selected_times[selected_clients] += 1
 
         logging.info("[%s] Selected clients: %s", self, selected_clients)
 
@@ -0,0 +1,149 @@
+"""
+Detecting outliers among the loss norms reported by clients in a window of recent
+model versions, with the same results as DBSCAN on one-dimensional data.
+
+In one dimension, the neighbours of a loss norm within a distance of `eps` are
+contiguous in the sorted loss norms. A loss norm is a core point if it has at
+least `min_samples` neighbours, itself included, and it is an outlier, labelled
+as noise by DBSCAN, if it is neither a core point nor a neighbour of a core point.
+
+The loss norms in the window are kept sorted as records arrive, so that adding
+a record to the newest model version in the window costs a binary search, and
+detecting the outliers takes a few vectorized binary searches over the window
+instead of fitting DBSCAN again.
+"""
+import bisect
+
+import numpy as np
+
+
+def neighbourhood_bounds(values, eps):
+    """Returns, for each of the sorted values, the start and the end of the range
+    of values within a distance of `eps` from it, including itself."""
+    total = len(values)
+    starts = np.searchsorted(values, values - eps, side="left")
+    ends = np.searchsorted(values, values + eps, side="right")
+
+    # Rounding `values +/- eps` may shift a bound by one, so the bounds are
+    # corrected to the exact distances that DBSCAN compares with `eps`
+    while True:
+        extend = ends < total
+        extend[extend] = values[ends[extend]] - values[extend] <= eps
+        shrink = ends > 0
+        shrink[shrink] = values[ends[shrink] - 1] - values[shrink] > eps
+        if not extend.any() and not shrink.any():
+            break
+        ends += extend.astype(int) - shrink.astype(int)
+
+    while True:
+        extend = starts > 0
+        extend[extend] = values[extend] - values[starts[extend] - 1] <= eps
+        shrink = starts < total
+        shrink[shrink] = values[shrink] - values[starts[shrink]] > eps
+        if not extend.any() and not shrink.any():
+            break
+        starts += shrink.astype(int) - extend.astype(int)
+
+    return starts, ends
+
+
+def noise_mask(values, eps, min_samples):
+    """Returns whether each of the sorted values is labelled as noise by DBSCAN."""
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        return np.zeros(0, dtype=bool)
+
+    starts, ends = neighbourhood_bounds(values, eps)
+    is_core = ends - starts >= min_samples
+
+    # A value is reachable if a core value lies in its neighbourhood, which holds
+    # if the number of core values before its end exceeds the number before its start
+    core_before = np.concatenate(([0], np.cumsum(is_core)))
+    is_reachable = core_before[ends] > core_before[starts]
+
+    return ~is_reachable
+
+
+class OutlierDetector:
+    """Detects outliers among the loss norms reported in recent model versions."""
+
+    def __init__(self, window_size, eps, min_samples):
+        """
+        :param window_size: The number of model versions in the window, ending with
+            the version that the most recent record was trained from.
+        :param eps: The maximum distance between two neighbouring loss norms.
+        :param min_samples: The number of neighbours of a core loss norm.
+        """
+        self.window_size = window_size
+        self.eps = eps
+        self.min_samples = min_samples
+
+        # The loss norm of each client in each model version, in the order received
+        self.versions = {}
+
+        # The newest model version in the window, the version and loss norm of each
+        # client in the window, and the sorted (loss norm, client ID) pairs
+        self.window_end = None
+        self.window_records = {}
+        self.sorted_records = []
+
+    def __len__(self):
+        return len(self.sorted_records)
+
+    def add(self, version, client_id, loss_norm):
+        """Records the loss norm of a client update trained from the given model
+        version, and moves the window to end with that version."""
+        records = self.versions.setdefault(version, {})
+
+        # Only the first record of a client in a model version is used
+        if client_id in records:
+            if version != self.window_end:
+                self._rebuild(version)
+            return
+
+        records[client_id] = loss_norm
+
+        if version != self.window_end:
+            self._rebuild(version)
+            return
+
+        # The newest record of a client within the window is used, to avoid
+        # Sybil attacks where outliers repeat their updates deliberately
+        if client_id in self.window_records:
+            __, old_loss_norm = self.window_records[client_id]
+            del self.sorted_records[
+                bisect.bisect_left(self.sorted_records, (old_loss_norm, client_id))
+            ]
+
+        self.window_records[client_id] = (version, loss_norm)
+        bisect.insort(self.sorted_records, (loss_norm, client_id))
+
+    def _rebuild(self, version):
+        """Collects the records of the window ending with the given model version."""
+        self.window_end = version
+        self.window_records = {}
+
+        for i in range(self.window_size):
+            if version - i <= 0:
+                break
+
+            for client_id, loss_norm in self.versions.get(version - i, {}).items():
+                if client_id not in self.window_records:
+                    self.window_records[client_id] = (version - i, loss_norm)
+
+        self.sorted_records = sorted(
+            (loss_norm, client_id)
+            for client_id, (__, loss_norm) in self.window_records.items()
+        )
+
+    def outliers(self) -> list:
+        """Returns the IDs of the clients whose loss norms in the window are labelled
+        as noise by DBSCAN, in increasing order."""
+        loss_norms = [loss_norm for loss_norm, __ in self.sorted_records]
+        is_noise = noise_mask(loss_norms, self.eps, self.min_samples)
+
+        return sorted(
+            client_id
+            for (__, client_id), noise in zip(self.sorted_records, is_noise)
+            if noise
+        )
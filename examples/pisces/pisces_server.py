@@ -14,10 +14,12 @@ import logging
 import random
 
 import numpy as np
-from sklearn.cluster import DBSCAN
 
 from plato.config import Config
 from plato.servers import fedavg
+from plato.utils import client_selection
+
+import outlier_detection
 
 
 class Server(fedavg.Server):
@@ -35,24 +37,32 @@ class Server(fedavg.Server):
         )
 
         self.staleness_factor = Config().server.staleness_factor
-        self.client_utilities = {}
-        self.client_staleness = {}
         self.total_samples = 0
 
+        # Client utilities and the most recent staleness of each client, in arrays
+        # indexed by client ID once the server is configured
+        self.client_utilities = None
+        self.staleness_window = 5
+        self.client_staleness = None
+        self.client_staleness_count = None
+
         # Exploration vs exploitation
         self.exploration_factor = Config().server.exploration_factor
         self.exploration_decaying_factor = Config().server.exploration_decaying_factor
         self.min_explore_factor = Config().server.min_explore_factor
-        self.explored_clients = []
-        self.unexplored_clients = []
+        self.explored = None
         self.prng_state = random.getstate()
 
         # Below are for robustness
         self.robustness = False
         self.augmented_factor = 5
         self.threshold_factor = 1
-        self.model_versions_clients_dict = {}
         self.per_round = Config().clients.per_round
+        self.outlier_detector = outlier_detection.OutlierDetector(
+            window_size=self.augmented_factor,
+            eps=0.5,
+            min_samples=self.per_round // 2,
+        )
         self.reliability_credit_record = {
             client_id: 5 for client_id in range(1, self.total_clients + 1)
         }
@@ -62,13 +72,15 @@ class Server(fedavg.Server):
         """Initialize necessary variables."""
         super().configure()
 
-        self.client_utilities = {
-            client_id: 0 for client_id in range(1, self.total_clients + 1)
-        }
-        self.client_staleness = {
-            client_id: [] for client_id in range(1, self.total_clients + 1)
-        }
-        self.unexplored_clients = list(range(1, self.total_clients + 1))
+        self.client_utilities = np.zeros(self.total_clients + 1)
+        self.client_staleness = np.zeros(
+            (self.total_clients + 1, self.staleness_window)
+        )
+        self.client_staleness_count = np.zeros(self.total_clients + 1, dtype=int)
+
+        # Entry 0 is not a client, and is never explored
+        self.explored = np.zeros(self.total_clients + 1, dtype=bool)
+        self.explored[0] = True
 
     async def aggregate_deltas(self, updates, deltas_received):
         """Aggregate weight updates from the clients using federated averaging with calcuated staleness factor."""
@@ -84,7 +96,7 @@ class Server(fedavg.Server):
         for i, update in enumerate(deltas_received):
             report = updates[i].report
             num_samples = report.num_samples
-            self.client_staleness[updates[i].client_id].append(updates[i].staleness)
+            self._record_staleness(updates[i].client_id, updates[i].staleness)
 
             staleness_factor = self._calculate_staleness_factor(updates[i].client_id)
 
@@ -98,9 +110,16 @@ class Server(fedavg.Server):
             await asyncio.sleep(0)
         return avg_update
 
+    def _record_staleness(self, client_id, staleness):
+        """Record the staleness of a client update in a ring of its most recent ones."""
+        position = self.client_staleness_count[client_id] % self.staleness_window
+        self.client_staleness[client_id, position] = staleness
+        self.client_staleness_count[client_id] += 1
+
     def _calculate_staleness_factor(self, client_id):
         """Calculate the client staleness factor."""
-        stalenss = np.mean(self.client_staleness[client_id][-5:])
+        recorded = min(self.client_staleness_count[client_id], self.staleness_window)
+        stalenss = np.mean(self.client_staleness[client_id, :recorded])
         return 1.0 / pow(stalenss + 1, self.staleness_factor)
 
     def weights_aggregated(self, updates):
@@ -114,57 +133,27 @@ class Server(fedavg.Server):
 
             if self.robustness:
                 # Start to do pooling
-                start_version = update.report.start_round
-                if start_version not in self.model_versions_clients_dict:
-                    self.model_versions_clients_dict[start_version] = [
-                        (update.client_id, update.report.statistical_utility)
-                    ]
-                else:
-                    self.model_versions_clients_dict[start_version].append(
-                        (update.client_id, update.report.statistical_utility)
-                    )
+                self.outlier_detector.add(
+                    update.report.start_round,
+                    update.client_id,
+                    update.report.statistical_utility,
+                )
 
-                tuples = []
-                already_existing_clients = set()
-                for i in range(self.augmented_factor):
-                    if start_version - i <= 0:
-                        break
-
-                    # avoid cybil attacks, i.e., outliers repeat deliberately
-                    tmp = []
-                    for client_id, loss_norm in self.model_versions_clients_dict[
-                        start_version - i
-                    ]:
-                        if client_id in already_existing_clients:
-                            continue
-                        already_existing_clients.add(client_id)
-                        tmp.append((client_id, loss_norm))
-                    tuples += tmp
-
-                if len(tuples) >= self.threshold_factor * self.per_round:
+                if len(self.outlier_detector) >= self.threshold_factor * self.per_round:
                     logging.info(
                         "Starting anomaly detection with %s recent records.",
-                        len(tuples),
+                        len(self.outlier_detector),
                     )
-                    self._detect_outliers(tuples)
+                    self._detect_outliers()
                 else:
                     logging.info(
                         "Records collected for anomaly detection are not enough: %s.",
-                        len(tuples),
+                        len(self.outlier_detector),
                     )
 
-    def _detect_outliers(self, tuples):
-        """Detect outliers from client updates by DBSCAN."""
-
-        client_id_list = [tu[0] for tu in tuples]
-        loss_list = [tu[1] for tu in tuples]
-        loss_list = np.array(loss_list).reshape(-1, 1)
-        min_samples = self.per_round // 2
-        eps = 0.5
-
-        clustering = DBSCAN(eps=eps, min_samples=min_samples).fit(loss_list)
-        result = clustering.labels_.tolist()
-        outliers = [client_id_list[idx] for idx, e in enumerate(result) if e == -1]
+    def _detect_outliers(self):
+        """Detect outliers from client updates, as DBSCAN would."""
+        outliers = self.outlier_detector.outliers()
 
         newly_detected_outliers = []
         for client_id in outliers:
@@ -183,27 +172,30 @@ class Server(fedavg.Server):
     def choose_clients(self, clients_pool, clients_count):
         """Choose a subset of the clients to participate in each round."""
         selected_clients = []
+        unexplored_clients = np.flatnonzero(~self.explored)
 
         if self.robustness:
+            available = client_selection.availability_mask(
+                self.total_clients, clients_pool, self.detected_corrupted_clients
+            )
             outliers = [
                 client_id
-                for client_id in available_clients
-                if client_id in self.detected_corrupted_clients
-            ]
-            available_clients = [
-                client_id
-                for client_id in available_clients
-                if client_id not in self.detected_corrupted_clients
+                for client_id in self.detected_corrupted_clients
+                if client_id in clients_pool
             ]
             logging.info(
                 "These clients are detected as outliers and precluded from selection: %s",
-                {outliers},
+                outliers,
+            )
+        else:
+            available = client_selection.availability_mask(
+                self.total_clients, clients_pool
             )
 
         if self.current_round > 1:
             # Exploitation
             explored_clients_count = min(
-                len(self.unexplored_clients),
+                len(unexplored_clients),
                 np.random.binomial(clients_count, self.exploration_factor, 1)[0],
             )
 
@@ -213,31 +205,24 @@ class Server(fedavg.Server):
             )
 
             exploited_clients_count = min(
-                len(self.explored_clients), clients_count - explored_clients_count
+                self.total_clients - len(unexplored_clients),
+                clients_count - explored_clients_count,
             )
 
-            sorted_by_utility = sorted(
-                self.client_utilities, key=self.client_utilities.get, reverse=True
-            )
-            sorted_by_utility = [
-                client for client in sorted_by_utility if client in clients_pool
-            ]
-
-            selected_clients = sorted_by_utility[:exploited_clients_count]
+            selected_clients = client_selection.sorted_by_value(
+                self.client_utilities, available, exploited_clients_count
+            ).tolist()
 
         # Exploration
         random.setstate(self.prng_state)
 
         # Select unexplored clients randomly
         selected_unexplored_clients = random.sample(
-            self.unexplored_clients, clients_count - len(selected_clients)
+            unexplored_clients.tolist(), clients_count - len(selected_clients)
         )
 
         self.prng_state = random.getstate()
-        self.explored_clients += selected_unexplored_clients
-
-        for client_id in selected_unexplored_clients:
-            self.unexplored_clients.remove(client_id)
+        self.explored[selected_unexplored_clients] = True
 
         selected_clients += selected_unexplored_clients
 
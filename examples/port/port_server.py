@@ -8,9 +8,9 @@ Reference:
 """
 
 import asyncio
-import copy
 import os
 import logging
+from collections import OrderedDict
 
 import torch
 import torch.nn.functional as F
@@ -21,35 +21,73 @@ from plato.servers import fedavg
 class Server(fedavg.Server):
     """A federated learning server using the FedAsync algorithm."""
 
-    async def cosine_similarity(self, update, staleness):
-        """Compute the cosine similarity of the received updates and the difference
-        between the current and a previous model according to client staleness."""
-        # Loading the global model from a previous round according to staleness
-        filename = f"model_{self.current_round - 2}.pth"
-        model_path = Config().params["model_path"]
-        model_path = f"{model_path}/{filename}"
+    def __init__(
+        self, model=None, datasource=None, algorithm=None, trainer=None, callbacks=None
+    ):
+        super().__init__(
+            model=model,
+            datasource=datasource,
+            algorithm=algorithm,
+            trainer=trainer,
+            callbacks=callbacks,
+        )
 
-        similarity = 1.0
+        # The flattened global models after the most recent rounds, keyed by round,
+        # as only the model after round `current_round - 2` is compared with
+        self.flattened_models = OrderedDict()
+        self.history_size = 2
 
-        if staleness > 1 and os.path.exists(model_path):
-            previous_model = copy.deepcopy(self.trainer.model)
-            previous_model.load_state_dict(torch.load(model_path))
+        # The difference between the current and the previous model, and the round
+        # that it is computed in
+        self.model_difference = None
+        self.model_difference_round = None
 
-            previous = torch.zeros(0)
-            for __, weight in previous_model.cpu().state_dict().items():
-                previous = torch.cat((previous, weight.view(-1)))
+    @staticmethod
+    def flatten(weights):
+        """Flattens model weights into a single vector."""
+        return torch.cat(
+            [weight.detach().cpu().reshape(-1) for weight in weights.values()]
+        )
 
-            current = torch.zeros(0)
-            for __, weight in self.trainer.model.cpu().state_dict().items():
-                current = torch.cat((current, weight.view(-1)))
+    def model_difference_of_round(self):
+        """Returns the difference between the current and the previous model, computed
+        once per round, or None if the previous model is not available."""
+        if self.model_difference_round != self.current_round:
+            previous = self.flattened_models.get(self.current_round - 2)
+            self.model_difference = (
+                None
+                if previous is None
+                else self.flatten(self.trainer.model.state_dict()) - previous
+            )
+            self.model_difference_round = self.current_round
+
+        return self.model_difference
 
-            deltas = torch.zeros(0)
-            for __, delta in update.items():
-                deltas = torch.cat((deltas, delta.view(-1)))
+    async def cosine_similarities(self, deltas_received, stalenesses):
+        """Compute the cosine similarity of the received updates and the difference
+        between the current and a previous model according to client staleness."""
+        similarities = [1.0] * len(deltas_received)
 
-            similarity = F.cosine_similarity(current - previous, deltas, dim=0)
+        stale_indices = [i for i, staleness in enumerate(stalenesses) if staleness > 1]
+        if len(stale_indices) == 0:
+            return similarities
 
-        return similarity
+        model_difference = self.model_difference_of_round()
+        if model_difference is None:
+            return similarities
+
+        # The similarities of all the stale updates, in one batched operation
+        deltas = torch.stack(
+            [self.flatten(deltas_received[i]) for i in stale_indices]
+        )
+        stale_similarities = F.cosine_similarity(
+            deltas, model_difference.unsqueeze(0), dim=1
+        ).tolist()
+
+        for i, similarity in zip(stale_indices, stale_similarities):
+            similarities[i] = similarity
+
+        return similarities
 
     async def aggregate_deltas(self, updates, deltas_received):
         """Aggregate weight updates from the clients using federated averaging."""
@@ -59,12 +97,15 @@ class Server(fedavg.Server):
         # Constructing the aggregation weights to be used
         aggregation_weights = []
 
-        for i, update in enumerate(deltas_received):
+        similarities = await self.cosine_similarities(
+            deltas_received, [update.staleness for update in updates]
+        )
+
+        for i, similarity in enumerate(similarities):
             report = updates[i].report
             staleness = updates[i].staleness
             num_samples = report.num_samples
 
-            similarity = await self.cosine_similarity(update, staleness)
             staleness_factor = Server.staleness_function(staleness)
 
             similarity_weight = (
@@ -127,9 +168,12 @@ class Server(fedavg.Server):
         """
         Method called at the end of aggregating received weights.
         """
-        # Save the current model for later retrieval when cosine similarity needs to be computed
-        filename = f"model_{self.current_round}.pth"
-        self.trainer.save_model(filename)
+        # Keep the current model, flattened, for computing cosine similarities later
+        self.flattened_models[self.current_round] = self.flatten(
+            self.trainer.model.state_dict()
+        )
+        while len(self.flattened_models) > self.history_size:
+            self.flattened_models.popitem(last=False)
 
     @staticmethod
     def staleness_function(staleness):
@@ -2,8 +2,6 @@
 Customize the list of inbound and outbound processors for scaffold clients through callbacks.
 """
 import logging
-import os
-import pickle
 from typing import Any, List
 
 from plato.callbacks.client import ClientCallback
@@ -46,11 +44,15 @@ class SendControlVariateProcessor(base.Processor):
         self.trainer = trainer
 
     def process(self, data: Any) -> List:
-        client_control_variate_filename = self.trainer.client_control_variate_path
-        if os.path.exists(client_control_variate_filename):
-            with open(client_control_variate_filename, "rb") as payload_file:
-                client_control_variate = pickle.load(payload_file)
-                data = [data, client_control_variate]
+        # The control variate is updated where the model was trained, which may be
+        # a separate process with `max_concurrency`, so it is loaded from the file
+        # saved after training rather than from the state of this trainer
+        self.trainer.load_client_control_variate(
+            self.trainer.client_control_variate_path
+        )
+
+        if self.trainer.client_control_variate is not None:
+            data = [data, self.trainer.client_control_variate]
 
             logging.info(
                 "[Client #%d] Control variates were attached to the payload.",
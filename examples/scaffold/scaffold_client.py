@@ -12,8 +12,6 @@ https://arxiv.org/pdf/1910.06378.pdf
 import logging
 import os
 
-import pickle
-
 from plato.clients import simple
 from plato.config import Config
 
@@ -56,8 +54,6 @@ class Client(simple.Client):
                 self.client_id,
                 client_control_variate_path,
             )
-            with open(client_control_variate_path, "rb") as path:
-                self.client_control_variate = pickle.load(path)
-            self.trainer.client_control_variate = self.client_control_variate
 
-        self.trainer.client_control_variate_path = client_control_variate_path
+        self.trainer.load_client_control_variate(client_control_variate_path)
+        self.client_control_variate = self.trainer.client_control_variate
@@ -0,0 +1,64 @@
+"""
+Applying the SCAFFOLD correction of control variates within the steps of an optimizer.
+
+Reference:
+
+Karimireddy et al., "SCAFFOLD: Stochastic Controlled Averaging for Federated Learning,"
+in Proceedings of the 37th International Conference on Machine Learning (ICML), 2020.
+
+https://arxiv.org/pdf/1910.06378.pdf
+"""
+import torch
+
+
+class ControlVariateCorrection:
+    """Corrects the parameters after each step of an optimizer by the difference
+    between the server and the client control variates, scaled by the learning rate.
+
+    As both control variates stay unchanged during local training, their difference
+    is computed once, on the device, as a list aligned with the parameters of each
+    parameter group, so that each step applies the correction with a single fused
+    `torch._foreach_add_` call per parameter group.
+    """
+
+    def __init__(
+        self, optimizer, model, server_control_variate, client_control_variate
+    ):
+        self.params = []
+        self.corrections = []
+
+        names = {id(param): name for name, param in model.named_parameters()}
+
+        for group in optimizer.param_groups:
+            params = []
+            corrections = []
+            for param in group["params"]:
+                name = names.get(id(param))
+                if name is None or name not in server_control_variate:
+                    continue
+
+                params.append(param)
+                corrections.append(
+                    torch.sub(
+                        server_control_variate[name].to(param.device),
+                        client_control_variate[name].to(param.device),
+                    ).to(param.dtype)
+                )
+
+            self.params.append(params)
+            self.corrections.append(corrections)
+
+        self.hook = optimizer.register_step_post_hook(self.step)
+
+    @torch.no_grad()
+    def step(self, optimizer, *__):
+        """Applies the correction to the parameters after a step of the optimizer."""
+        for group, params, corrections in zip(
+            optimizer.param_groups, self.params, self.corrections
+        ):
+            if len(params) > 0:
+                torch._foreach_add_(params, corrections, alpha=-group["lr"])
+
+    def remove(self):
+        """Stops correcting the parameters after the steps of the optimizer."""
+        self.hook.remove()
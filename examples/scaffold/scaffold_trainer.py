@@ -8,16 +8,19 @@ in Proceedings of the 37th International Conference on Machine Learning (ICML),
 
 https://arxiv.org/pdf/1910.06378.pdf
 """
-from collections import OrderedDict
-
 import copy
 import logging
-import pickle
+import os
+from collections import OrderedDict
+
+import numpy as np
 import torch
 
 from plato.config import Config
 from plato.trainers import basic
 
+import scaffold_optimizer
+
 
 class Trainer(basic.Trainer):
     """The federated learning trainer for the SCAFFOLD client."""
@@ -37,84 +40,64 @@ class Trainer(basic.Trainer):
         self.client_control_variate_path = None
 
         self.additional_data = None
-        self.param_groups = None
+
+        # The correction of control variates applied within each optimizer step
+        self.correction = None
 
     def get_optimizer(self, model):
-        """Gets the parameter groups from the optimizer"""
+        """Gets the optimizer, which corrects the parameters with the server and
+        client control variates after each step."""
         optimizer = super().get_optimizer(model)
-        self.param_groups = optimizer.param_groups
+
+        if self.server_control_variate is not None:
+            self.correction = scaffold_optimizer.ControlVariateCorrection(
+                optimizer,
+                model,
+                self.server_control_variate,
+                self.client_control_variate,
+            )
+
         return optimizer
 
     def train_run_start(self, config):
         """Initializes the client control variate to 0 if the client
-        is participating for the first time.
+        is participating for the first time, and keeps both control variates
+        on the device during training.
         """
-        self.server_control_variate = self.additional_data
+        self.server_control_variate = OrderedDict(
+            (name, variate.to(self.device))
+            for name, variate in self.additional_data.items()
+        )
         if self.client_control_variate is None:
-            self.client_control_variate = {}
-            for variate in self.server_control_variate:
-                self.client_control_variate[variate] = torch.zeros(
-                    self.server_control_variate[variate].shape
-                )
+            self.client_control_variate = OrderedDict(
+                (name, torch.zeros(variate.shape, device=self.device))
+                for name, variate in self.server_control_variate.items()
+            )
+        else:
+            self.client_control_variate = OrderedDict(
+                (name, variate.to(self.device))
+                for name, variate in self.client_control_variate.items()
+            )
         self.global_model_weights = copy.deepcopy(self.model.state_dict())
 
-    def train_step_end(self, config, batch=None, loss=None):
-        """Modifies the weights based on the server and client control variates."""
-        for group in self.param_groups:
-            learning_rate = -group["lr"]
-            counter = 0
-            for name in self.server_control_variate:
-                if "weight" in name or "bias" in name:
-                    server_control_variate = self.server_control_variate[name].to(
-                        self.device
-                    )
-                    param = group["params"][counter]
-                    if self.client_control_variate is not None:
-                        param.data.add_(
-                            torch.sub(
-                                server_control_variate,
-                                self.client_control_variate[name].to(self.device),
-                            ),
-                            alpha=learning_rate,
-                        )
-                    else:
-                        param.data.add_(server_control_variate, alpha=learning_rate)
-                    counter += 1
-
     def train_run_end(self, config):
-        """Compute deltas of this client's control variate and deltas of the model"""
+        """Compute this client's new control variate."""
+        if self.correction is not None:
+            self.correction.remove()
+            self.correction = None
 
-        # Compute deltas of control variate to be used for the next time that
+        # Compute the control variate to be used for the next time that
         # the client is selected
+        model_weights = self.model.state_dict()
         new_client_control_variate = OrderedDict()
-        control_variate_deltas = OrderedDict()
-        if self.client_control_variate is not None:
-            for name, previous_weight in self.global_model_weights.items():
-                new_client_control_variate[name] = torch.sub(
-                    self.client_control_variate[name].to(device=self.device),
-                    self.server_control_variate[name].to(device=self.device),
-                ).to(device=self.device)
-                new_client_control_variate[name].add_(
-                    torch.sub(
-                        previous_weight.to(device=self.device),
-                        self.model.state_dict()[name],
-                    ),
-                    alpha=1 / Config().trainer.epochs,
-                )
-
-                control_variate_deltas[name] = torch.sub(
-                    new_client_control_variate[name],
-                    self.client_control_variate[name].to(self.device),
-                )
-        else:
-            for name, previous_weight in self.global_model_weights.items():
-                new_client_control_variate[name] = -self.server_control_variate[name]
-                new_client_control_variate[name].add_(
-                    torch.sub(previous_weight, self.model.state_dict()[name]),
-                    alpha=1 / Config().trainer.epochs,
-                )
-
-                control_variate_deltas[name] = new_client_control_variate[name]
+        for name, previous_weight in self.global_model_weights.items():
+            new_client_control_variate[name] = torch.sub(
+                self.client_control_variate[name], self.server_control_variate[name]
+            )
+            new_client_control_variate[name].add_(
+                torch.sub(previous_weight, model_weights[name]),
+                alpha=1 / Config().trainer.epochs,
+            )
 
         # Update client control variate
         self.client_control_variate = new_client_control_variate
@@ -125,11 +108,41 @@ class Trainer(basic.Trainer):
             self.client_id,
             self.client_control_variate_path,
         )
-        with open(self.client_control_variate_path, "wb") as path:
-            pickle.dump(self.client_control_variate, path)
+        self.save_client_control_variate()
 
         logging.info(
             "[Client #%d] Control variate saved to %s.",
             self.client_id,
             self.client_control_variate_path,
         )
+
+    def save_client_control_variate(self):
+        """Saves the client control variate as a flat array of 32-bit floats, in
+        the order of the entries in the state dict of the model."""
+        flattened = torch.cat(
+            [
+                variate.detach().reshape(-1).to(device="cpu", dtype=torch.float32)
+                for variate in self.client_control_variate.values()
+            ]
+        )
+        flattened.numpy().tofile(self.client_control_variate_path)
+
+    def load_client_control_variate(self, client_control_variate_path):
+        """Loads the client control variate saved by the client before, if any."""
+        self.client_control_variate_path = client_control_variate_path
+
+        if not os.path.exists(client_control_variate_path):
+            self.client_control_variate = None
+            return
+
+        flattened = torch.from_numpy(
+            np.fromfile(client_control_variate_path, dtype=np.float32)
+        )
+
+        self.client_control_variate = OrderedDict()
+        offset = 0
+        for name, weight in self.model.state_dict().items():
+            self.client_control_variate[name] = flattened[
+                offset : offset + weight.numel()
+            ].view(weight.shape)
+            offset += weight.numel()
@@ -43,6 +43,9 @@ class Client(simple.Client):
         )
         assert not Config().clients.do_test
 
+        # In pipelined mode, several clients train concurrently with the server
+        self.pipelined = Config().clients.per_round > 1
+
         self.model_received = False
         self.gradient_received = False
         self.contexts = {}
@@ -65,7 +68,12 @@ class Client(simple.Client):
 
         if info == "prompt":
             # Server prompts a new client to conduct split learning
-            self._load_context(self.client_id)
+            if self.pipelined:
+                # Start from the aggregated weights sent by the server
+                self.algorithm.load_weights(server_payload)
+                self.static_sampler = self.sampler.get()
+            else:
+                self._load_context(self.client_id)
             report, payload = self._extract_features()
         elif info == "gradients":
             # server sends the gradients of the features, i.e., complete training
@@ -95,7 +103,8 @@ class Client(simple.Client):
                 report.training_time += training_time
 
             # Save the state of current client
-            self._save_context(self.client_id)
+            if not self.pipelined:
+                self._save_context(self.client_id)
         return report, payload
 
     def _save_context(self, client_id):
@@ -14,7 +14,11 @@ Deep Learning." arXiv preprint arXiv:2112.01637 (2021).
 https://arxiv.org/pdf/2112.01637.pdf
 """
 
+import asyncio
 import logging
+from collections import deque
+
+import torch
 
 from plato.config import Config
 from plato.datasources import feature
@@ -31,16 +35,41 @@ class Server(fedavg.Server):
         self, model=None, datasource=None, algorithm=None, trainer=None, callbacks=None
     ):
         super().__init__(model, datasource, algorithm, trainer, callbacks)
-        # Split learning clients interact with server sequentially
-        assert Config().clients.per_round == 1
+        # Split learning clients interact with the server sequentially, unless
+        # several clients are selected per round to pipeline their training
+        self.pipelined = Config().clients.per_round > 1
         self.phase = "prompt"
         self.clients_list = []
         self.client_last = None
         self.next_client = True
         self.test_accuracy = 0.0
 
+        # The feature batches received from the clients, and the gradients to be
+        # sent back to each client in pipelined mode
+        self.feature_queue = deque()
+        self.gradients = {}
+        self.training_features = False
+
     def choose_clients(self, clients_pool, clients_count):
         """Shuffle the clients and sequentially select them when the previous one is done."""
+        if self.pipelined:
+            # Select the next clients in the shuffled order, reshuffling once the
+            # remaining clients are not enough
+            if len(self.clients_list) < clients_count:
+                self.clients_list += super().choose_clients(
+                    clients_pool, len(clients_pool)
+                )
+                logging.warning(f"Client order: {self.clients_list}")
+
+            selected_clients = []
+            for client_id in list(self.clients_list):
+                if client_id not in selected_clients:
+                    selected_clients.append(client_id)
+                    self.clients_list.remove(client_id)
+                if len(selected_clients) == clients_count:
+                    break
+            return selected_clients
+
         if len(self.clients_list) == 0 and self.next_client:
             # Shuffle the client list
             self.clients_list = super().choose_clients(clients_pool, len(clients_pool))
@@ -54,6 +83,13 @@ class Server(fedavg.Server):
 
     def customize_server_payload(self, payload):
         """Wrap up generating the server payload with any additional information."""
+        if self.pipelined:
+            if self.selected_client_id in self.gradients:
+                return (self.gradients.pop(self.selected_client_id), "gradients")
+
+            # Clients start from the aggregated weights before the cut layer
+            return (payload, "prompt")
+
         if self.phase == "prompt":
             # Split learning server doesn't send weights to client
             return (None, "prompt")
@@ -61,6 +97,93 @@ class Server(fedavg.Server):
             # Send gradients back to client to complete the training
             return (self.trainer.get_gradients(), "gradients")
 
+    async def _process_clients(self, client_info):
+        """In pipelined mode, queue the features as soon as they arrive, so that the
+        server trains with them while the other clients are still computing."""
+        client = client_info[2]
+        if not self.pipelined or client["report"].type != "features":
+            await super()._process_clients(client_info)
+            return
+
+        self.feature_queue.append(client)
+
+        # Only one training loop drains the queue at any time
+        if not self.training_features:
+            self.training_features = True
+            try:
+                await self._train_queued_features()
+            finally:
+                self.training_features = False
+
+    async def _train_queued_features(self):
+        """Train the model after the cut layer with the queued feature batches in
+        micro-batches, and send the gradients back to each client as soon as all
+        its micro-batches have been trained."""
+        loop = asyncio.get_running_loop()
+        micro_batch_size = (
+            Config().trainer.micro_batch_size
+            if hasattr(Config().trainer, "micro_batch_size")
+            else None
+        )
+
+        while self.feature_queue:
+            client = self.feature_queue.popleft()
+            gradients = []
+
+            for features, labels, weight, first, last in self._micro_batches(
+                client, micro_batch_size
+            ):
+                # Training runs in a worker thread, so that the features and weights
+                # from other clients keep arriving in the meantime
+                gradient = await loop.run_in_executor(
+                    None,
+                    self.trainer.train_micro_batch,
+                    features,
+                    labels,
+                    weight,
+                    first,
+                    last,
+                )
+                gradients.append(gradient)
+
+            logging.warning(
+                "[%s] Gradients computed for client #%d.", self, client["client_id"]
+            )
+            self.gradients[client["client_id"]] = [torch.cat(gradients)]
+            await self._dispatch_client(
+                client["client_id"], client_process_id=self._process_id(client["sid"])
+            )
+
+    @staticmethod
+    def _micro_batches(client, micro_batch_size):
+        """Split the feature batches of a client into micro-batches, each weighted
+        by its share of the batch, and marked as the first or the last micro-batch
+        of the batch. The gradients of the micro-batches of a batch are accumulated
+        before a single optimizer step, so that the client receives the gradients
+        of the loss over its whole batch."""
+        payload = client["payload"]
+        batches = payload if isinstance(payload, list) else [payload]
+
+        for features, labels in batches:
+            batch_size = len(labels)
+            step = micro_batch_size or batch_size
+            for start in range(0, batch_size, step):
+                micro_labels = labels[start : start + step]
+                yield (
+                    features[start : start + step],
+                    micro_labels,
+                    len(micro_labels) / batch_size,
+                    start == 0,
+                    start + step >= batch_size,
+                )
+
+    def _process_id(self, sid):
+        """Returns the client process with the given socket ID."""
+        for process_id, client in self.clients.items():
+            if client["sid"] == sid:
+                return process_id
+        return None
+
     # pylint: disable=unused-argument
     async def aggregate_weights(self, updates, baseline_weights, weights_received):
         """Aggregate weight updates from the clients or train the model."""
@@ -79,6 +202,10 @@ class Server(fedavg.Server):
             logging.warning("[%s] Weights received, start testing accuracy.", self)
             weights = update.payload
 
+            if len(updates) > 1:
+                # In pipelined mode, the weights before the cut layer are averaged
+                weights = self._average_weights(updates)
+
             # The weights after cut layer are not trained by clients
             self.algorithm.update_weights_before_cut(weights)
 
@@ -104,6 +231,19 @@ class Server(fedavg.Server):
         updated_weights = self.algorithm.extract_weights()
         return updated_weights
 
+    @staticmethod
+    def _average_weights(updates):
+        """Average the weights from the clients, weighted by their number of samples."""
+        total_samples = sum(update.report.num_samples for update in updates)
+
+        return {
+            name: sum(
+                update.payload[name] * (update.report.num_samples / total_samples)
+                for update in updates
+            )
+            for name in updates[0].payload
+        }
+
     def clients_processed(self):
         # Replace the default accuracy by manually tested accuracy
         self.accuracy = self.test_accuracy
\ No newline at end of file
@@ -139,6 +139,48 @@ class Trainer(basic.Trainer):
 
         return loss
 
+    def train_micro_batch(self, features, labels, weight=1.0, first=True, last=True):
+        """Train the model after the cut layer with one micro-batch of features on
+        the server, and return the gradients of these features.
+
+        The loss over the micro-batch is scaled by its share `weight` of the client
+        batch, and its gradients are accumulated from the `first` to the `last`
+        micro-batch of the batch, so that the optimizer takes a single step with
+        the gradients of the loss over the whole batch.
+        """
+        if self._loss_criterion is None:
+            self._loss_criterion = self.get_loss_criterion()
+        self.optimizer = self.get_optimizer(self.model)
+        config = Config().trainer._asdict()
+
+        self.model.to(self.device)
+        self.model.train()
+
+        if first:
+            self.optimizer.zero_grad()
+
+        examples = features.to(self.device).detach().requires_grad_(True)
+        labels = labels.to(self.device)
+
+        with self.autocast(config):
+            outputs = self.model(examples)
+            loss = self._loss_criterion(outputs, labels)
+        self._loss_tracker.update(loss, labels.size(0))
+
+        scaled_loss = loss * weight
+        if self.grad_scaler is not None:
+            scaled_loss = self.grad_scaler.scale(scaled_loss)
+        scaled_loss.backward()
+
+        if last:
+            if self.grad_scaler is None:
+                self.optimizer.step()
+            else:
+                self.grad_scaler.step(self.optimizer)
+                self.grad_scaler.update()
+
+        return examples.grad.detach().cpu()
+
     def save_gradients(self, config):
         """Server saves recorded gradients to a file."""
         model_name = config["model_name"]
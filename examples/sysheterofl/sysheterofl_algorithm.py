@@ -5,12 +5,12 @@ The algorithm for paper system-heterogenous federated learning through architect
 import sys
 import pickle
 import random
-import copy
 
 import torch
 import ptflops
 from plato.config import Config
 from plato.algorithms import fedavg
+from plato.utils import width_slicing
 
 
 # pylint:disable=too-many-instance-attributes
@@ -21,6 +21,7 @@ class Algorithm(fedavg.Algorithm):
         super().__init__(trainer)
         self.current_config = None
         self.model_class = None
+        self.slicer = width_slicing.WidthSlicer()
         self.epsilon = Config().parameters.limitation.epsilon  # 0.8
         self.max_loop = Config().parameters.limitation.max_loop  # 50
         self.configs = []
@@ -97,88 +98,30 @@ class Algorithm(fedavg.Algorithm):
         Get the parameters of local models from the global model.
         """
         current_config = self.current_config
-        pre_model = self.model_class(
-            configs=current_config, **Config().parameters.client_model._asdict()
-        )
-        local_parameters = pre_model.state_dict()
-
-        for key, value in self.model.state_dict().items():
-            if key in local_parameters:
-                if value.dim() == 4:
-                    local_parameters[key].data = copy.deepcopy(
-                        value.data[
-                            : local_parameters[key].shape[0],
-                            : local_parameters[key].shape[1],
-                            : local_parameters[key].shape[2],
-                            : local_parameters[key].shape[3],
-                        ]
-                    )
-                elif value.dim() == 2:
-                    local_parameters[key].data = copy.deepcopy(
-                        value.data[
-                            : local_parameters[key].shape[0],
-                            : local_parameters[key].shape[1],
-                        ]
-                    )
-                elif value.dim() == 1:
-                    local_parameters[key].data = copy.deepcopy(
-                        value.data[: local_parameters[key].shape[0],]
-                    )
-        pre_model = self.model_class(
-            configs=current_config, **Config().parameters.client_model._asdict()
+        # Configurations are lists, so their plans are cached under their strings
+        return self.slicer.extract(
+            str(current_config),
+            self.model.state_dict(),
+            lambda: self.model_class(
+                configs=current_config, **Config().parameters.client_model._asdict()
+            ),
         )
-        pre_model.load_state_dict(local_parameters)
-        local_parameters = pre_model.state_dict()
-        return local_parameters
 
     def aggregation(self, weights_received, update_track=True):
         """
         Aggregate weights of different complexities.
         """
-        global_parameters = copy.deepcopy(self.model.state_dict())
-        for key, value in self.model.state_dict().items():
-            value_org = copy.deepcopy(value)
-            count = torch.zeros(value.shape)
-            for local_weights in weights_received:
-                if key in local_weights:
-                    if value.dim() == 4:
-                        global_parameters[key][
-                            : local_weights[key].shape[0],
-                            : local_weights[key].shape[1],
-                            : local_weights[key].shape[2],
-                            : local_weights[key].shape[3],
-                        ] += copy.deepcopy(local_weights[key])
-                        count[
-                            : local_weights[key].shape[0],
-                            : local_weights[key].shape[1],
-                            : local_weights[key].shape[2],
-                            : local_weights[key].shape[3],
-                        ] += torch.ones(local_weights[key].shape)
-                    elif value.dim() == 2:
-                        global_parameters[key][
-                            : local_weights[key].shape[0],
-                            : local_weights[key].shape[1],
-                        ] += copy.deepcopy(local_weights[key])
-                        count[
-                            : local_weights[key].shape[0],
-                            : local_weights[key].shape[1],
-                        ] += torch.ones(local_weights[key].shape)
-                    elif value.dim() == 1:
-                        if update_track or (
-                            not update_track
-                            and not ("running" in key or "tracked" in key)
-                        ):
-                            global_parameters[key][
-                                : local_weights[key].shape[0]
-                            ] += copy.deepcopy(local_weights[key])
-                            count[: local_weights[key].shape[0]] += torch.ones(
-                                local_weights[key].shape
-                            )
-            count = torch.where(count == 0, torch.ones(count.shape), count)
-            global_parameters[key] = torch.div(
-                global_parameters[key] - value_org, count
-            )
-        return global_parameters
+        global_parameters = self.model.state_dict()
+        return width_slicing.aggregate(
+            global_parameters,
+            weights_received,
+            [
+                key
+                for key, value in global_parameters.items()
+                if value.dim() > 0
+                and (update_track or not ("running" in key or "tracked" in key))
+            ],
+        )
 
     # pylint:disable=too-many-locals
     def choose_config(self, limitation):
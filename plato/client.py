@@ -8,11 +8,24 @@ import os
 
 from plato.clients import registry as client_registry
 from plato.config import Config
+from plato.utils import cpu_budget
 
 
-def run(client_id, port, client=None, edge_server=None, edge_client=None, trainer=None):
+def run(
+    client_id,
+    port,
+    client=None,
+    edge_server=None,
+    edge_client=None,
+    trainer=None,
+    cores=None,
+):
     """Starting a client to connect to the server."""
     Config().args.id = client_id
+
+    # Limit this client process to its share of the CPU cores on the host
+    if cores is not None:
+        cpu_budget.apply(cores)
     if port is not None:
         Config().args.port = port
 
@@ -317,8 +317,10 @@ class Client:
             else:
                 payload_size = sys.getsizeof(pickle.dumps(self.server_payload))
         else:
-            self.server_payload = self.s3_client.receive_from_s3(s3_key)
-            payload_size = sys.getsizeof(pickle.dumps(self.server_payload))
+            (
+                self.server_payload,
+                payload_size,
+            ) = await self.s3_client.receive_from_s3_async(s3_key, return_size=True)
 
         assert client_id == self.client_id
 
@@ -385,8 +387,7 @@ class Client:
             if self.s3_client is not None:
                 unique_key = uuid.uuid4().hex[:6].upper()
                 s3_key = f"client_payload_{self.client_id}_{unique_key}"
-                self.s3_client.send_to_s3(s3_key, payload)
-                data_size = sys.getsizeof(pickle.dumps(payload))
+                data_size = await self.s3_client.send_to_s3_async(s3_key, payload)
                 metadata["s3_key"] = s3_key
             else:
                 if isinstance(payload, list):
@@ -46,7 +46,7 @@ class Client(simple.Client):
 
     def _load_payload(self, server_payload) -> None:
         """The edge client loads the model from the central server."""
-        self.server.algorithm.load_weights(server_payload)
+        self.server.load_global_weights(server_payload)
 
     def process_server_response(self, server_response):
         """Additional client-specific processing on the server response."""
@@ -66,6 +66,13 @@ class Client(simple.Client):
         # Extract model weights and biases
         weights = self.server.algorithm.extract_weights()
 
+        if self.server.edge_deltas:
+            # Send the deltas relative to the last global model instead, which
+            # compress far better than the model weights
+            weights = self.server.algorithm.compute_weight_deltas(
+                self.server.global_weights, [weights]
+            )[0]
+
         average_accuracy = self.server.average_accuracy
         accuracy = self.server.accuracy
 
@@ -13,7 +13,7 @@ from plato.datasources import registry as datasources_registry
 from plato.processors import registry as processor_registry
 from plato.samplers import registry as samplers_registry
 from plato.trainers import registry as trainers_registry
-from plato.utils import fonts
+from plato.utils import cpu_budget, fonts
 
 
 class Client(base.Client):
@@ -144,6 +144,9 @@ class Client(base.Client):
             )
         )
 
+        cpu_time_start = cpu_budget.cpu_time()
+        wall_time_start = time.perf_counter()
+
         # Perform model training
         try:
             if hasattr(self.trainer, "current_round"):
@@ -155,6 +158,18 @@ class Client(base.Client):
             )
             await self.sio.disconnect()
 
+        if cpu_budget.enabled():
+            # Report how well this client used its share of the CPU cores
+            cpu_utilization = (cpu_budget.cpu_time() - cpu_time_start) / (
+                (time.perf_counter() - wall_time_start) * cpu_budget.budgeted_threads()
+            )
+            logging.info(
+                "[%s] CPU utilization during training: %.2f%% of %d thread(s).",
+                self,
+                100 * cpu_utilization,
+                cpu_budget.budgeted_threads(),
+            )
+
         # Extract model weights and biases
         weights = self.algorithm.extract_weights()
 
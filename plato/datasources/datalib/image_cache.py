@@ -0,0 +1,250 @@
+"""
+A sharded cache of decoded images for the multimodal datasources.
+
+Without the cache, every image is read and decoded from its JPEG file each time
+it is sampled, in every epoch and on every client. When `data:image_cache` is
+enabled, the images of each phase are decoded (and optionally resized to
+`data:image_cache_size`) once by a pool of worker processes, and their uint8
+pixels are stored in shard files. An index maps each image to its shard, byte
+offset and shape, so that an image is read back with `np.memmap` without any
+decoding.
+
+The cache of a phase is built when the phase dataset is first created, by only
+one of the processes creating it, and is rebuilt if `data:image_cache_size` has
+changed since. It can also be built ahead of training with:
+
+    python -m plato.datasources.datalib.image_cache -c <configuration file>
+"""
+import json
+import logging
+import os
+from multiprocessing import Pool
+
+import cv2
+import numpy as np
+import skimage.io as io
+from filelock import FileLock
+
+from plato.config import Config
+
+INDEX_FILE = "index.json"
+
+
+def enabled() -> bool:
+    """Returns whether the decoded images should be cached."""
+    return hasattr(Config().data, "image_cache") and Config().data.image_cache
+
+
+def image_size():
+    """Returns the (width, height) the cached images are resized to, or None if
+    the images are cached at their original size."""
+    if hasattr(Config().data, "image_cache_size"):
+        return tuple(Config().data.image_cache_size)
+
+    return None
+
+
+def decode_image(image_path):
+    """Reads and decodes one image, in the same way as the datasources."""
+    image_data = io.imread(image_path)
+    return cv2.cvtColor(image_data, cv2.COLOR_BGR2RGB)
+
+
+def _build_shard(shard_args):
+    """Decodes a group of images into one shard file, and returns the index
+    entries of these images."""
+    shard_path, shard_images, size = shard_args
+
+    entries = {}
+    offset = 0
+    with open(shard_path + ".tmp", "wb") as shard_file:
+        for key, image_path in shard_images:
+            image_data = decode_image(image_path)
+            original_shape = image_data.shape
+
+            if size is not None:
+                image_data = cv2.resize(
+                    image_data, size, interpolation=cv2.INTER_AREA
+                )
+
+            image_data = np.ascontiguousarray(image_data, dtype=np.uint8)
+            shard_file.write(image_data.tobytes())
+
+            entries[key] = {
+                "offset": offset,
+                "shape": list(image_data.shape),
+                "original_shape": list(original_shape),
+            }
+            offset += image_data.nbytes
+
+    os.replace(shard_path + ".tmp", shard_path)
+
+    return entries
+
+
+def build(cache_path, images, size=None, num_workers=None):
+    """Builds the image cache under `cache_path`, unless it already exists with
+    images of the same size.
+
+    The cache is built while holding a lock on its directory, so that processes
+    creating the same phase dataset at the same time build it only once.
+
+    :param images: A dict mapping the key of each image to its file path.
+    :param size: The (width, height) the images are resized to, if any.
+    :param num_workers: The number of processes decoding the images, one shard
+        per process. The default is the number of CPU cores.
+    """
+    with FileLock(f"{cache_path}.lock"):
+        _build(cache_path, images, size, num_workers)
+
+
+def _build(cache_path, images, size, num_workers):
+    """Builds the image cache under `cache_path` if it is missing, or if its
+    images were cached at a different size."""
+    index_path = os.path.join(cache_path, INDEX_FILE)
+    old_shards = []
+
+    if os.path.exists(index_path):
+        with open(index_path, "r", encoding="utf-8") as index_file:
+            index = json.load(index_file)
+
+        if index["size"] == (None if size is None else list(size)):
+            return
+
+        logging.info(
+            "[Process #%d] Rebuilding the image cache in %s, as its images were "
+            "cached at size %s rather than %s.",
+            os.getpid(),
+            cache_path,
+            index["size"],
+            size,
+        )
+        old_shards = index["shards"]
+
+        # The cache is not used again until it has been rebuilt
+        os.remove(index_path)
+
+    if num_workers is None:
+        if hasattr(Config().data, "image_cache_workers"):
+            num_workers = Config().data.image_cache_workers
+        else:
+            num_workers = os.cpu_count()
+    num_workers = max(1, min(num_workers, len(images)))
+
+    logging.info(
+        "[Process #%d] Caching %d decoded images in %s with %d worker(s).",
+        os.getpid(),
+        len(images),
+        cache_path,
+        num_workers,
+    )
+    os.makedirs(cache_path, exist_ok=True)
+
+    keys = sorted(images.keys(), key=str)
+    shards = [
+        (
+            os.path.join(cache_path, f"shard_{shard_id:04d}.bin"),
+            [(str(keys[i]), images[keys[i]]) for i in shard_indices],
+            size,
+        )
+        for shard_id, shard_indices in enumerate(
+            np.array_split(np.arange(len(keys)), num_workers)
+        )
+    ]
+
+    with Pool(num_workers) as pool:
+        shard_entries = pool.map(_build_shard, shards)
+
+    index = {"size": size, "shards": [], "images": {}}
+    for shard_id, ((shard_path, _, _), entries) in enumerate(
+        zip(shards, shard_entries)
+    ):
+        index["shards"].append(os.path.basename(shard_path))
+        for key, entry in entries.items():
+            entry["shard"] = shard_id
+            index["images"][key] = entry
+
+    # The index is written last, so that a partially built cache is never used
+    with open(index_path + ".tmp", "w", encoding="utf-8") as index_file:
+        json.dump(index, index_file)
+    os.replace(index_path + ".tmp", index_path)
+
+    for shard_name in set(old_shards) - set(index["shards"]):
+        shard_path = os.path.join(cache_path, shard_name)
+        if os.path.exists(shard_path):
+            os.remove(shard_path)
+
+
+def scale_boxes(boxes, scale_x, scale_y):
+    """Scales the [xmin, ymin, xmax, ymax] boxes in a (nested) list of boxes."""
+    if boxes and not isinstance(boxes[0], list):
+        xmin, ymin, xmax, ymax = boxes[:4]
+        return [xmin * scale_x, ymin * scale_y, xmax * scale_x, ymax * scale_y]
+
+    return [scale_boxes(box, scale_x, scale_y) for box in boxes]
+
+
+class ImageCache:
+    """Reads the decoded images from a cache built by `build()`."""
+
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+
+        with open(
+            os.path.join(cache_path, INDEX_FILE), "r", encoding="utf-8"
+        ) as index_file:
+            index = json.load(index_file)
+
+        self.shard_names = index["shards"]
+        self.images = index["images"]
+        self.resized = index["size"] is not None
+
+        # The shards are mapped lazily, so that each data loader worker maps
+        # them in its own process
+        self.shards = {}
+
+    def __contains__(self, key):
+        return str(key) in self.images
+
+    def _shard(self, shard_id):
+        if shard_id not in self.shards:
+            # Copy-on-write, so that the returned images are writable while
+            # the shard files are never modified
+            self.shards[shard_id] = np.memmap(
+                os.path.join(self.cache_path, self.shard_names[shard_id]),
+                dtype=np.uint8,
+                mode="c",
+            )
+        return self.shards[shard_id]
+
+    def get(self, key):
+        """Returns the decoded image with the given key."""
+        entry = self.images[str(key)]
+        shape = entry["shape"]
+        offset = entry["offset"]
+
+        return (
+            self._shard(entry["shard"])[offset : offset + int(np.prod(shape))]
+            .reshape(shape)
+        )
+
+    def box_scale(self, key):
+        """Returns the factors (x, y) that map the boxes of the original image
+        with the given key to the cached image."""
+        entry = self.images[str(key)]
+        height, width = entry["shape"][:2]
+        original_height, original_width = entry["original_shape"][:2]
+
+        return width / original_width, height / original_height
+
+
+if __name__ == "__main__":
+    from plato.datasources import registry
+
+    # Creating the phase datasets builds their image caches
+    if not enabled():
+        logging.warning("The image cache is not enabled in the configuration.")
+    else:
+        datasource = registry.get()
+        datasource.get_train_set()
+        datasource.get_test_set()
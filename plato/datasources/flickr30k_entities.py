@@ -72,6 +72,7 @@ from plato.datasources import multimodal_base
 from plato.datasources.multimodal_base import TextData, BoxData, TargetData
 from plato.datasources.datalib import data_utils
 from plato.datasources.datalib import flickr30kE_utils
+from plato.datasources.datalib import image_cache
 
 
 def collate_fn(batch):
@@ -98,7 +99,8 @@ class Flickr30KEDataset(multimodal_base.MultiModalDataset):
                  data_types,
                  modality_sampler=None,
                  transform_image_dec_func=None,
-                 transform_text_func=None):
+                 transform_text_func=None,
+                 cached_images=None):
         super().__init__()
 
         self.phase = phase
@@ -107,6 +109,8 @@ class Flickr30KEDataset(multimodal_base.MultiModalDataset):
         self.data_types = data_types
         self.transform_image_dec_func = transform_image_dec_func
         self.transform_text_func = transform_text_func
+        # The decoded images, if the image cache is enabled
+        self.cached_images = cached_images
 
         self.phase_samples_name = list(
             self.phase_multimodal_data_record.keys())
@@ -124,6 +128,9 @@ class Flickr30KEDataset(multimodal_base.MultiModalDataset):
 
     def get_sample_image_data(self, image_id):
         """ Get one image data as the sample """
+        if self.cached_images is not None:
+            return self.cached_images.get(image_id)
+
         # get the image data
         image_phase_path = self.phase_info[self.data_types[0]]["path"]
         image_phase_format = self.phase_info[self.data_types[0]]["format"]
@@ -163,6 +170,12 @@ class Flickr30KEDataset(multimodal_base.MultiModalDataset):
             sentence_phrases_type, sentence_phrases_id, \
             sentence_phrases_boxes = self.extract_sample_anno_data(image_anno_sent)
 
+        if self.cached_images is not None and self.cached_images.resized:
+            # the boxes are annotated on the images of the original size
+            scale_x, scale_y = self.cached_images.box_scale(image_id)
+            sentence_phrases_boxes = image_cache.scale_boxes(
+                sentence_phrases_boxes, scale_x, scale_y)
+
         caption = sentence if any(isinstance(iter_i, list) for iter_i in sentence) \
                                             else [[sentence]]
         flatten_caption_phrase_bboxs = [
@@ -323,13 +336,36 @@ class DataSource(multimodal_base.MultiModalDataSource):
         """ Obtain the dataset for the specific phase """
         phase_data_info = self.get_phase_data_info(phase)
         phase_split_info = self.splits_info[phase]
+
+        cached_images = None
+        if image_cache.enabled():
+            cached_images = self.get_phase_image_cache(phase, phase_data_info)
+
         dataset = Flickr30KEDataset(dataset_info=phase_data_info,
                                     phase_info=phase_split_info,
                                     data_types=self.data_types,
                                     phase=phase,
-                                    modality_sampler=modality_sampler)
+                                    modality_sampler=modality_sampler,
+                                    cached_images=cached_images)
         return dataset
 
+    def get_phase_image_cache(self, phase, phase_data_info):
+        """ Obtain the decoded images of the phase, building the cache once """
+        image_phase_path = self.splits_info[phase][self.data_types[0]]["path"]
+        image_phase_format = self.splits_info[phase][
+            self.data_types[0]]["format"]
+        cache_path = os.path.join(self.splits_info[phase]["path"],
+                                  phase + "_image_cache")
+
+        images = {}
+        for sample_name in phase_data_info.keys():
+            image_id = os.path.splitext(os.path.basename(sample_name))[0]
+            images[image_id] = os.path.join(image_phase_path,
+                                            image_id + image_phase_format)
+
+        image_cache.build(cache_path, images, size=image_cache.image_size())
+        return image_cache.ImageCache(cache_path)
+
     def get_train_set(self, modality_sampler=None):
         """ Obtains the training dataset. """
         phase = "train"
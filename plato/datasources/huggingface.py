@@ -6,10 +6,15 @@ For more information about the HuggingFace datasets, refer to:
 https://huggingface.co/docs/datasets/quicktour.html
 """
 
+import hashlib
+import json
 import logging
 import os
+import shutil
+from itertools import chain
 
-from datasets import load_dataset, load_from_disk
+from datasets import DatasetDict, load_dataset, load_from_disk
+from filelock import FileLock
 from transformers import AutoConfig, AutoTokenizer, HfArgumentParser
 from transformers import TrainingArguments, testing_utils, utils
 
@@ -31,17 +36,12 @@ class DataSource(base.DataSource):
         else:
             dataset_config = None
 
-        saved_data_path = (
+        self.saved_data_path = (
             f"{Config().params['data_path']}/{dataset_name}_{dataset_config}"
         )
-
-        if os.path.exists(saved_data_path):
-            # If the dataset has already been downloaded and saved
-            self.dataset = load_from_disk(saved_data_path)
-        else:
-            # Download and save the dataset
-            self.dataset = load_dataset(dataset_name, dataset_config)
-            self.dataset.save_to_disk(saved_data_path)
+        self.dataset_name = dataset_name
+        self.dataset_config = dataset_config
+        self.dataset = None
 
         parser = HfArgumentParser(TrainingArguments)
         (self.training_args,) = parser.parse_args_into_dataclasses(
@@ -74,8 +74,61 @@ class DataSource(base.DataSource):
 
         self.column_names = ["text"]
         self.text_column_name = "text"
-        self.trainset = self.preprocess_data(self.dataset["train"])
-        self.testset = self.preprocess_data(self.dataset["validation"])
+
+        # The tokenized and grouped datasets are built only once, by whichever
+        # process gets here first, and are then memory-mapped by all processes
+        lm_data_path = self.lm_data_path(model_name)
+        os.makedirs(Config().params["data_path"], exist_ok=True)
+        with FileLock(f"{lm_data_path}.lock"):
+            if not os.path.exists(lm_data_path):
+                self.load_raw_dataset()
+                lm_datasets = DatasetDict(
+                    {
+                        "train": self.preprocess_data(self.dataset["train"]),
+                        "validation": self.preprocess_data(
+                            self.dataset["validation"]
+                        ),
+                    }
+                )
+                # The datasets are saved to a temporary directory first, so that
+                # an interrupted save is never mistaken for complete datasets
+                temp_path = f"{lm_data_path}.tmp"
+                if os.path.exists(temp_path):
+                    shutil.rmtree(temp_path)
+                lm_datasets.save_to_disk(temp_path)
+                os.replace(temp_path, lm_data_path)
+
+        lm_datasets = load_from_disk(lm_data_path)
+        self.trainset = lm_datasets["train"]
+        self.testset = lm_datasets["validation"]
+
+    def load_raw_dataset(self):
+        """Loads the raw dataset, downloading and saving it if necessary."""
+        if os.path.exists(self.saved_data_path):
+            # If the dataset has already been downloaded and saved
+            self.dataset = load_from_disk(self.saved_data_path)
+        else:
+            # Download and save the dataset
+            self.dataset = load_dataset(self.dataset_name, self.dataset_config)
+            self.dataset.save_to_disk(self.saved_data_path)
+
+    def lm_data_path(self, model_name):
+        """Returns where the tokenized and grouped datasets are saved, addressed
+        by everything that determines their content."""
+        preprocessing = {
+            "dataset_name": self.dataset_name,
+            "dataset_config": self.dataset_config,
+            "model_name": model_name,
+            "tokenizer": type(self.tokenizer).__name__,
+            "vocab_size": len(self.tokenizer),
+            "text_column_name": self.text_column_name,
+            "block_size": self.block_size,
+        }
+        digest = hashlib.sha256(
+            json.dumps(preprocessing, sort_keys=True).encode()
+        ).hexdigest()[:16]
+
+        return f"{self.saved_data_path}_lm_{digest}"
 
     def num_train_examples(self):
         return len(self.trainset)
@@ -109,7 +162,9 @@ class DataSource(base.DataSource):
 
     def group_texts(self, examples):
         """Concatenate all texts."""
-        concatenated_examples = {k: sum(examples[k], []) for k in examples.keys()}
+        concatenated_examples = {
+            k: list(chain.from_iterable(examples[k])) for k in examples.keys()
+        }
 
         total_length = len(concatenated_examples[list(examples.keys())[0]])
 
@@ -7,6 +7,7 @@ import urllib
 import tarfile
 import torch
 import numpy as np
+from filelock import FileLock
 from torch.utils import data
 from plato.config import Config
 from plato.datasources import base
@@ -21,7 +22,8 @@ class DataSource(base.DataSource):
         dataset_path = os.path.join(root_path, "dataset_purchase")
         if not os.path.isdir(root_path):
             os.mkdir(root_path)
-        if not os.path.isfile(dataset_path):
+        cached_path = os.path.join(root_path, "purchase_test_labels.npy")
+        if not os.path.isfile(dataset_path) and not os.path.isfile(cached_path):
             self.download_dataset(root_path, dataset_path)
 
         self.trainset, self.testset = self.extract_data(root_path)
@@ -37,37 +39,72 @@ class DataSource(base.DataSource):
         tar = tarfile.open(os.path.join(root_path, "tmp_purchase.tgz"))
         tar.extractall(path=root_path)
 
-        logging.info("Processing the dataset...")
-        data_set = np.genfromtxt(dataset_path, delimiter=",")
-        logging.info("Finish processing the dataset.")
-
-        X = data_set[:, 1:].astype(np.float64)
-        Y = (data_set[:, 0]).astype(np.int32) - 1
-        np.savez(os.path.join(root_path, "purchase_numpy.npz"), X=X, Y=Y)
-
-    def extract_data(self, root_path):
-        """Extract data."""
-        dataset = np.load(os.path.join(root_path, "purchase_numpy.npz"))
+    def cache_data(self, root_path):
+        """Parse the dataset and cache the shuffled training and test splits
+        as binary arrays."""
+        npz_path = os.path.join(root_path, "purchase_numpy.npz")
+
+        if os.path.isfile(npz_path):
+            dataset = np.load(npz_path)
+            X, Y = dataset["X"], dataset["Y"]
+        else:
+            logging.info("Processing the dataset...")
+            data_set = np.loadtxt(
+                os.path.join(root_path, "dataset_purchase"),
+                delimiter=",",
+                dtype=np.float32,
+            )
+            logging.info("Finish processing the dataset.")
+
+            X = data_set[:, 1:]
+            Y = data_set[:, 0].astype(np.int64) - 1
 
         ## randomly shuffle the data
-        X, Y = dataset["X"], dataset["Y"]
         np.random.seed(0)
         indices = np.arange(len(X))
         np.random.shuffle(indices)
-        X, Y = X[indices], Y[indices]
 
         ## extract 20000 data samplers for training and testing respectively
         num_train = 20000
-        train_data = X[:num_train]
-        test_data = X[num_train : num_train * 2]
-        train_label = Y[:num_train]
-        test_label = Y[num_train : num_train * 2]
+        splits = {
+            "train": indices[:num_train],
+            "test": indices[num_train : num_train * 2],
+        }
+
+        for split, split_indices in splits.items():
+            for name, array, dtype in (
+                ("features", X, np.float32),
+                ("labels", Y, np.int64),
+            ):
+                array_path = os.path.join(root_path, f"purchase_{split}_{name}.npy")
+                with open(f"{array_path}.tmp", "wb") as array_file:
+                    np.save(array_file, array[split_indices].astype(dtype))
+                os.replace(f"{array_path}.tmp", array_path)
 
-        ## create datasets
-        train_dataset = VectorDataset(train_data, train_label)
-        test_dataset = VectorDataset(test_data, test_label)
-
-        return train_dataset, test_dataset
+    def extract_data(self, root_path):
+        """Extract data."""
+        # The arrays are cached by only one of the processes on the same host
+        with FileLock(os.path.join(root_path, "purchase_cache.lock")):
+            if not os.path.isfile(
+                os.path.join(root_path, "purchase_test_labels.npy")
+            ):
+                self.cache_data(root_path)
+
+        ## create datasets, memory-mapping the cached arrays so that they are
+        ## shared among all processes on the same host
+        datasets = []
+        for split in ("train", "test"):
+            features = np.load(
+                os.path.join(root_path, f"purchase_{split}_features.npy"),
+                mmap_mode="c",
+            )
+            labels = np.load(
+                os.path.join(root_path, f"purchase_{split}_labels.npy"),
+                mmap_mode="c",
+            )
+            datasets.append(VectorDataset(features, labels))
+
+        return datasets[0], datasets[1]
 
     def num_train_examples(self):
         return 20000
@@ -82,8 +119,8 @@ class VectorDataset(data.Dataset):
     """
 
     def __init__(self, features, labels):
-        self.data = torch.stack([torch.FloatTensor(i) for i in features])
-        self.targets = torch.stack([torch.LongTensor([i]) for i in labels])[:, 0]
+        self.data = torch.from_numpy(np.asarray(features, dtype=np.float32))
+        self.targets = torch.from_numpy(np.asarray(labels, dtype=np.int64))
         self.classes = [f"Style #{i}" for i in range(100)]
 
     def __getitem__(self, index):
@@ -21,6 +21,7 @@ The output sample structure of this data is consistent with that
 """
 
 import logging
+import os
 
 import collections
 
@@ -30,6 +31,7 @@ import cv2
 from plato.config import Config
 from plato.datasources import multimodal_base
 from plato.datasources.multimodal_base import TextData, BoxData, TargetData
+from plato.datasources.datalib import image_cache
 from plato.datasources.datalib.refer_utils import referitgame_utils
 
 SplitedDatasets = collections.namedtuple('SplitedDatasets', [
@@ -62,7 +64,8 @@ class ReferItGameDataset(multimodal_base.MultiModalDataset):
                  phase_info,
                  modality_sampler=None,
                  transform_image_dec_func=None,
-                 transform_text_func=None):
+                 transform_text_func=None,
+                 cached_images=None):
         super().__init__()
 
         self.phase = phase
@@ -70,6 +73,8 @@ class ReferItGameDataset(multimodal_base.MultiModalDataset):
         self.phase_info = phase_info
         self.transform_image_dec_func = transform_image_dec_func
         self.transform_text_func = transform_text_func
+        # The decoded images, if the image cache is enabled
+        self.cached_images = cached_images
 
         # The phase data record in referitgame is a list,
         #  each item contains information of one image as
@@ -93,12 +98,17 @@ class ReferItGameDataset(multimodal_base.MultiModalDataset):
             caption_phrases_cate, caption_phrases_cate_id
         ] = self.phase_multimodal_data_record[sample_idx]
 
-        _ = image_id
-        image_data = self.phase_info.loadImgsData(image_id)[0]
+        if self.cached_images is not None:
+            image_data = self.cached_images.get(image_id)
 
-        image_data = cv2.cvtColor(image_data, cv2.COLOR_BGR2RGB)
-
-        _ = image_data.copy()
+            if self.cached_images.resized:
+                # the box is annotated on the image of the original size
+                scale_x, scale_y = self.cached_images.box_scale(image_id)
+                caption_phrase_bboxs = image_cache.scale_boxes(
+                    caption_phrase_bboxs, scale_x, scale_y)
+        else:
+            image_data = self.phase_info.loadImgsData(image_id)[0]
+            image_data = cv2.cvtColor(image_data, cv2.COLOR_BGR2RGB)
 
         caption = caption if any(isinstance(boxes_i, list) for boxes_i in caption) \
                                             else [caption]
@@ -266,10 +276,26 @@ class DataSource(multimodal_base.MultiModalDataSource):
         """ Obtain the dataset for the specific phase """
         _, mode_flatten_emelemts = self.get_phase_data(phase)
 
+        cached_images = None
+        if image_cache.enabled():
+            cache_path = os.path.join(
+                self.mm_data_info["data_path"],
+                f"{self.split_config}_{self.split_name}_{phase}_image_cache")
+            # each element starts with the image id and the image file paths
+            images = {
+                element[0]: element[1][0]
+                for element in mode_flatten_emelemts
+            }
+            image_cache.build(cache_path,
+                              images,
+                              size=image_cache.image_size())
+            cached_images = image_cache.ImageCache(cache_path)
+
         dataset = ReferItGameDataset(dataset_info=mode_flatten_emelemts,
                                      phase_info=self._dataset_refer,
                                      phase=phase,
-                                     modality_sampler=modality_sampler)
+                                     modality_sampler=modality_sampler,
+                                     cached_images=cached_images)
         return dataset
 
     def get_train_set(self, modality_sampler=None):
@@ -4,9 +4,11 @@ Implements a Processor for applying local differential privacy using randomized
 import logging
 from typing import Any
 
+import torch
+
 from plato.config import Config
 from plato.processors import feature
-from plato.utils import unary_encoding
+from plato.utils import randomized_response, unary_encoding
 
 
 class Processor(feature.Processor):
@@ -14,23 +16,51 @@ class Processor(feature.Processor):
     Implements a Processor for applying local differential privacy using randomized response.
     """
     def __init__(self, **kwargs) -> None:
-        def func(logits, targets):
-            logits = unary_encoding.encode(logits)
-            
-            if Config().algorithm.epsilon is None:
-                return logits, targets
+        # One random number generator for each device, created when first used
+        self.generators = {}
 
+        def func(logits, targets):
             _randomize = getattr(self.trainer, "randomize", None)
-            epsilon = Config().algorithm.epsilon
 
             if callable(_randomize):
-                logits = self.trainer.randomize(logits, targets, epsilon)
+                # Custom randomized responses in the trainers work on NumPy arrays
+                logits = unary_encoding.encode(logits.detach().cpu().numpy())
+
+                if Config().algorithm.epsilon is not None:
+                    logits = self.trainer.randomize(logits, targets,
+                                                    Config().algorithm.epsilon)
+
+                logits = torch.from_numpy(logits.astype('float32'))
             else:
-                logits = unary_encoding.randomize(logits, epsilon)
+                logits = randomized_response.encode(logits.detach())
+
+                if Config().algorithm.epsilon is not None:
+                    logits = randomized_response.randomize(
+                        logits,
+                        Config().algorithm.epsilon,
+                        generator=self._generator(logits.device))
+
+            if self.trainer.device != 'cpu':
+                logits = logits.half()
 
             return logits, targets
 
-        super().__init__(method=func, **kwargs)
+        super().__init__(method=func, use_numpy=False, **kwargs)
+
+    def _generator(self, device):
+        """ Returns the random number generator for the given device. """
+        if not hasattr(Config().algorithm, "randomized_response_seed"):
+            return None
+
+        if device not in self.generators:
+            # The perturbation differs across clients and rounds
+            seed = randomized_response.derive_seed(
+                Config().algorithm.randomized_response_seed, self.client_id,
+                self.trainer.current_round)
+            self.generators[device] = randomized_response.get_generator(
+                device, seed)
+
+        return self.generators[device]
 
     def process(self, data: Any) -> Any:
         """
@@ -6,17 +6,40 @@ import torch
 
 from plato.config import Config
 from plato.processors import model
-from plato.utils import unary_encoding
+from plato.utils import randomized_response
 
 
 class Processor(model.Processor):
     """
     Implements a Processor for applying local differential privacy using randomized response.
+
+    The randomized response is applied on the device where each layer resides. If
+    `algorithm.randomized_response_seed` is specified, the perturbation is reproducible.
     """
 
     def __init__(self, **kwargs) -> None:
         super().__init__(**kwargs)
 
+        # One random number generator for each device, created when first used
+        self.generators = {}
+
+    def _generator(self, device):
+        """Returns the random number generator for the given device."""
+        if not hasattr(Config().algorithm, "randomized_response_seed"):
+            return None
+
+        if device not in self.generators:
+            # The perturbation differs across clients and rounds
+            current_round = self.trainer.current_round if self.trainer else 0
+            seed = randomized_response.derive_seed(
+                Config().algorithm.randomized_response_seed,
+                self.client_id,
+                current_round,
+            )
+            self.generators[device] = randomized_response.get_generator(device, seed)
+
+        return self.generators[device]
+
     def _process_layer(self, layer: torch.Tensor) -> torch.Tensor:
 
         if Config().algorithm.epsilon is None:
@@ -25,11 +48,9 @@ class Processor(model.Processor):
         epsilon = Config().algorithm.epsilon
 
         # Apply randomized response as the local differential privacy mechanism
-        layer = layer.detach().cpu().numpy()
-
-        layer = unary_encoding.encode(layer)
-        layer = unary_encoding.randomize(layer, epsilon)
-
-        layer = torch.tensor(layer, dtype=torch.float32)
+        layer = randomized_response.encode(layer.detach())
+        layer = randomized_response.randomize(
+            layer, epsilon, generator=self._generator(layer.device)
+        )
 
         return layer
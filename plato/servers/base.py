@@ -22,7 +22,7 @@ from plato.callbacks.handler import CallbackHandler
 from plato.callbacks.server import LogProgressCallback
 from plato.client import run
 from plato.config import Config
-from plato.utils import s3, fonts
+from plato.utils import cpu_budget, fonts, s3
 
 # pylint: disable=unused-argument, protected-access
 class ServerEvents(socketio.AsyncNamespace):
@@ -165,6 +165,17 @@ class Server:
         self.request_update = False
         self.disable_clients = False
 
+        # In buffered asynchronous mode, client updates are folded into a buffer as
+        # they arrive, and the buffer is applied to the global model every
+        # `buffer_size` arrivals
+        self.buffer_size = 0
+        self.buffered_aggregation = False
+
+        # The number of rounds between two consecutive tests of the global model,
+        # and between two consecutive checkpoints
+        self.evaluation_interval = 1
+        self.checkpoint_interval = 1
+
         # With specifying max_concurrency, selected clients run batch by batach
         # The number of clients in a batch on an available device is the same as the max_concurrency
         # This list contains ids of selected clients that has run in the current round
@@ -250,6 +261,31 @@ class Server:
             and Config().server.disable_clients
         )
 
+        # How many client updates should be buffered before they are applied to the
+        # global model in asynchronous mode? This is disabled if not specified
+        self.buffer_size = (
+            Config().server.buffer_size
+            if hasattr(Config().server, "buffer_size")
+            else 0
+        )
+        self.buffered_aggregation = (
+            self.asynchronous_mode
+            and self.buffer_size > 0
+            and not self.simulate_wall_time
+        )
+
+        # How often (in rounds) should the global model be tested and checkpointed?
+        self.evaluation_interval = (
+            Config().server.evaluation_interval
+            if hasattr(Config().server, "evaluation_interval")
+            else 1
+        )
+        self.checkpoint_interval = (
+            Config().server.checkpoint_interval
+            if hasattr(Config().server, "checkpoint_interval")
+            else 1
+        )
+
         # Compute the per-client uplink bandwidth
         if self.asynchronous_mode:
             self.uplink_bandwidth = self.uplink_bandwidth / self.minimum_clients
@@ -391,6 +427,13 @@ class Server:
         if mp.get_start_method(allow_none=True) != "spawn":
             mp.set_start_method("spawn", force=True)
 
+        # Divide the CPU cores on this host among the client processes, if needed
+        cores_plan = (
+            cpu_budget.plan(total_processes)
+            if cpu_budget.enabled() and not as_server
+            else None
+        )
+
         for client_id in range(starting_id, total_processes + starting_id):
             if as_server:
                 port = int(Config().server.port) + client_id
@@ -404,10 +447,20 @@ class Server:
                 proc.start()
             else:
                 logging.info("Starting client #%d's process.", client_id)
-                proc = mp.Process(
-                    target=run, args=(client_id, None, client, None, None, None)
-                )
-                proc.start()
+
+                if cores_plan is None:
+                    proc = mp.Process(
+                        target=run, args=(client_id, None, client, None, None, None)
+                    )
+                    proc.start()
+                else:
+                    cores = cores_plan[client_id - starting_id]
+                    proc = mp.Process(
+                        target=run,
+                        args=(client_id, None, client, None, None, None, cores),
+                    )
+                    with cpu_budget.thread_environment(cores):
+                        proc.start()
 
     async def _close_connections(self):
         """Closes all socket.io connections after training completes."""
@@ -541,120 +594,144 @@ class Server:
             else:
                 selected_clients = self.selected_clients
 
-            for selected_client_id in selected_clients:
-                self.selected_client_id = selected_client_id
+            if self.s3_client is not None:
+                # Payloads are uploaded to S3 in the background, so that they are
+                # sent to all the selected clients at once
+                await asyncio.gather(
+                    *[
+                        self._dispatch_client(selected_client_id)
+                        for selected_client_id in selected_clients
+                    ]
+                )
+            else:
+                for selected_client_id in selected_clients:
+                    await self._dispatch_client(selected_client_id)
 
-                if Config().is_central_server():
-                    client_process_id = selected_client_id
-                else:
-                    client_processes = [client for client in self.clients]
-
-                    # Find a client process that is currently not training
-                    # or selected in this round
-                    for process_id in client_processes:
-                        current_sid = self.clients[process_id]["sid"]
-                        if not (
-                            current_sid in self.training_sids
-                            or current_sid in self.selected_sids
-                        ):
-                            client_process_id = process_id
-                            break
+            self.clients_selected(self.selected_clients)
+            self.callback_handler.call_event(
+                "on_clients_selected", self, self.selected_clients
+            )
 
-                sid = self.clients[client_process_id]["sid"]
+    async def _dispatch_client(
+        self, selected_client_id, client_process_id=None
+    ) -> None:
+        """Assigns a selected client to an idle client process and sends it the
+        current model.
 
-                # Track the selected client process
-                self.training_sids.append(sid)
-                self.selected_sids.append(sid)
+        :param client_process_id: The client process to send the payload to. If not
+            provided, the first client process that is not training is used.
+        """
+        self.selected_client_id = selected_client_id
 
-                # Assign the client id to the client process
-                self.clients[client_process_id]["client_id"] = self.selected_client_id
+        if client_process_id is not None:
+            # The client process is chosen by the caller
+            assert client_process_id in self.clients
+        elif Config().is_central_server():
+            client_process_id = selected_client_id
+        else:
+            client_processes = [client for client in self.clients]
+
+            # Find a client process that is currently not training
+            # or selected in this round
+            for process_id in client_processes:
+                current_sid = self.clients[process_id]["sid"]
+                if not (
+                    current_sid in self.training_sids
+                    or current_sid in self.selected_sids
+                ):
+                    client_process_id = process_id
+                    break
 
-                self.training_clients[self.selected_client_id] = {
-                    "id": self.selected_client_id,
-                    "starting_round": self.current_round,
-                    "start_time": self.round_start_wall_time,
-                    "update_requested": False,
-                }
+        sid = self.clients[client_process_id]["sid"]
 
-                logging.info(
-                    "[%s] Selecting client #%d for training.",
-                    self,
-                    self.selected_client_id,
-                )
+        # Track the selected client process
+        self.training_sids.append(sid)
+        self.selected_sids.append(sid)
 
-                server_response = {
-                    "id": self.selected_client_id,
-                    "current_round": self.current_round,
-                }
-                server_response = self.customize_server_response(
-                    server_response, client_id=self.selected_client_id
-                )
+        # Assign the client id to the client process
+        self.clients[client_process_id]["client_id"] = self.selected_client_id
 
-                payload = self.algorithm.extract_weights()
-                payload = self.customize_server_payload(payload)
+        self.training_clients[self.selected_client_id] = {
+            "id": self.selected_client_id,
+            "starting_round": self.current_round,
+            "start_time": self.round_start_wall_time,
+            "update_requested": False,
+        }
 
-                if self.comm_simulation:
-                    logging.info(
-                        "[%s] Sending the current model to client #%d (simulated).",
-                        self,
-                        self.selected_client_id,
-                    )
+        logging.info(
+            "[%s] Selecting client #%d for training.",
+            self,
+            self.selected_client_id,
+        )
 
-                    # First apply outbound processors, if any
-                    payload = self.outbound_processor.process(payload)
+        server_response = {
+            "id": self.selected_client_id,
+            "current_round": self.current_round,
+        }
+        server_response = self.customize_server_response(
+            server_response, client_id=self.selected_client_id
+        )
 
-                    model_name = (
-                        Config().trainer.model_name
-                        if hasattr(Config().trainer, "model_name")
-                        else "custom"
-                    )
-                    checkpoint_path = Config().params["checkpoint_path"]
+        payload = self.algorithm.extract_weights()
+        payload = self.customize_server_payload(payload)
 
-                    payload_filename = (
-                        f"{checkpoint_path}/{model_name}_{self.selected_client_id}.pth"
-                    )
+        if self.comm_simulation:
+            logging.info(
+                "[%s] Sending the current model to client #%d (simulated).",
+                self,
+                self.selected_client_id,
+            )
 
-                    with open(payload_filename, "wb") as payload_file:
-                        pickle.dump(payload, payload_file)
+            # First apply outbound processors, if any
+            payload = self.outbound_processor.process(payload)
 
-                    server_response["payload_filename"] = payload_filename
+            model_name = (
+                Config().trainer.model_name
+                if hasattr(Config().trainer, "model_name")
+                else "custom"
+            )
+            checkpoint_path = Config().params["checkpoint_path"]
 
-                    payload_size = sys.getsizeof(pickle.dumps(payload)) / 1024**2
+            payload_filename = (
+                f"{checkpoint_path}/{model_name}_{self.selected_client_id}.pth"
+            )
 
-                    logging.info(
-                        "[%s] Sending %.2f MB of payload data to client #%d (simulated).",
-                        self,
-                        payload_size,
-                        self.selected_client_id,
-                    )
+            with open(payload_filename, "wb") as payload_file:
+                pickle.dump(payload, payload_file)
 
-                    self.comm_overhead += payload_size
+            server_response["payload_filename"] = payload_filename
 
-                    # Compute the communication time to transfer the current global model to client
-                    self.downlink_comm_time[self.selected_client_id] = payload_size / (
-                        (self.downlink_bandwidth / 8) / len(self.selected_clients)
-                    )
+            payload_size = sys.getsizeof(pickle.dumps(payload)) / 1024**2
 
-                # Send the server response as metadata to the clients (payload to follow)
-                await self.sio.emit(
-                    "payload_to_arrive", {"response": server_response}, room=sid
-                )
+            logging.info(
+                "[%s] Sending %.2f MB of payload data to client #%d (simulated).",
+                self,
+                payload_size,
+                self.selected_client_id,
+            )
 
-                if not self.comm_simulation:
-                    # Send the server payload to the client
-                    logging.info(
-                        "[%s] Sending the current model to client #%d.",
-                        self,
-                        selected_client_id,
-                    )
+            self.comm_overhead += payload_size
 
-                    await self._send(sid, payload, selected_client_id)
+            # Compute the communication time to transfer the current global model to client
+            self.downlink_comm_time[self.selected_client_id] = payload_size / (
+                (self.downlink_bandwidth / 8) / len(self.selected_clients)
+            )
 
-            self.clients_selected(self.selected_clients)
-            self.callback_handler.call_event(
-                "on_clients_selected", self, self.selected_clients
+        # Send the server response as metadata to the clients (payload to follow)
+        await self.sio.emit(
+            "payload_to_arrive", {"response": server_response}, room=sid
+        )
+
+        if not self.comm_simulation:
+            # Send the server payload to the client
+            logging.info(
+                "[%s] Sending the current model to client #%d.",
+                self,
+                selected_client_id,
             )
 
+            await self._send(sid, payload, selected_client_id)
+
     def choose_clients(self, clients_pool, clients_count):
         """Chooses a subset of the clients to participate in each round."""
         assert clients_count <= len(clients_pool)
@@ -682,7 +759,12 @@ class Server:
         await self.periodic_task()
 
         # If we are operating in asynchronous mode, aggregate the model updates received so far.
-        if self.asynchronous_mode and not self.simulate_wall_time:
+        # With buffered aggregation, the buffer is applied as client updates arrive instead
+        if (
+            self.asynchronous_mode
+            and not self.simulate_wall_time
+            and not self.buffered_aggregation
+        ):
             # Is there any training clients who are currently training on models that are too
             # `stale,` as defined by the staleness threshold?
             for __, client_data in self.training_clients.items():
@@ -738,8 +820,7 @@ class Server:
 
         if self.s3_client is not None:
             s3_key = f"server_payload_{os.getpid()}_{self.current_round}"
-            self.s3_client.send_to_s3(s3_key, payload)
-            data_size = sys.getsizeof(pickle.dumps(payload))
+            data_size = await self.s3_client.send_to_s3_async(s3_key, payload)
             metadata["s3_key"] = s3_key
         else:
             data_size = 0
@@ -834,8 +915,10 @@ class Server:
             else:
                 payload_size = sys.getsizeof(pickle.dumps(self.client_payload[sid]))
         else:
-            self.client_payload[sid] = self.s3_client.receive_from_s3(s3_key)
-            payload_size = sys.getsizeof(pickle.dumps(self.client_payload[sid]))
+            (
+                self.client_payload[sid],
+                payload_size,
+            ) = await self.s3_client.receive_from_s3_async(s3_key, return_size=True)
 
         logging.info(
             "[%s] Received %.2f MB of payload data from client #%d.",
@@ -918,6 +1001,10 @@ class Server:
         When in asynchronous mode, additional processing is needed to simulate
         the wall clock time.
         """
+        if self.buffered_aggregation:
+            await self._process_buffered_client(client_info)
+            return
+
         # In asynchronous mode with simulated wall clock time, we need to extract
         # the minimum number of clients from the list of all reporting clients, and then
         # proceed with report processing and replace these clients with a new set of
@@ -1136,6 +1223,71 @@ class Server:
             ) >= len(self.trained_clients):
                 await self._select_clients(for_next_batch=True)
 
+    async def _process_buffered_client(self, client_info):
+        """Folds the update from a reporting client into the aggregation buffer,
+        applies the buffer to the global model once `buffer_size` updates have
+        arrived, and immediately assigns new work to the idle client process.
+        """
+        client = client_info[2]
+        client_staleness = self.current_round - client["starting_round"]
+        self.wall_time = time.time()
+
+        update = SimpleNamespace(
+            client_id=client["client_id"],
+            report=client["report"],
+            payload=client["payload"],
+            staleness=client_staleness,
+        )
+        buffered = await self._buffer_update(update)
+
+        # The payload has been folded into the buffer and is no longer needed
+        update.payload = None
+        if buffered:
+            self.updates.append(update)
+
+        if len(self.updates) >= self.buffer_size:
+            logging.info(
+                "[%s] %d client update(s) buffered. Aggregating.",
+                self,
+                len(self.updates),
+            )
+            await self._process_reports()
+            await self.wrap_up()
+
+            # A new round starts with the new global model, without waiting for
+            # the clients that are still training
+            self.updates = []
+            self.current_round += 1
+            self.round_start_wall_time = self.wall_time
+
+            logging.info(
+                fonts.colourize(
+                    f"\n[{self}] Starting round {self.current_round}/{Config().trainer.rounds}."
+                )
+            )
+
+        # Replace the reporting client with a new client that is not training
+        training_client_ids = {
+            client_data["id"] for client_data in self.training_clients.values()
+        }
+        selectable_clients = [
+            client_id
+            for client_id in self.clients_pool
+            if client_id not in training_client_ids
+        ]
+
+        if len(selectable_clients) > 0:
+            self.selected_clients = self.choose_clients(selectable_clients, 1)
+            self.selected_sids = []
+
+            for selected_client_id in self.selected_clients:
+                await self._dispatch_client(selected_client_id)
+
+            self.clients_selected(self.selected_clients)
+            self.callback_handler.call_event(
+                "on_clients_selected", self, self.selected_clients
+            )
+
     async def _client_disconnected(self, sid):
         """When a client process disconnected it should be removed from its internal states."""
         for client_process_id, client in dict(self.clients).items():
@@ -1282,7 +1434,11 @@ class Server:
 
     async def wrap_up(self) -> None:
         """Wraps up when each round of training is done."""
-        self.save_to_checkpoint()
+        if (
+            self.current_round % self.checkpoint_interval == 0
+            or self.current_round >= Config().trainer.rounds
+        ):
+            self.save_to_checkpoint()
 
         # Break the loop when the target accuracy is achieved
         target_accuracy = None
@@ -1293,11 +1449,14 @@ class Server:
         elif hasattr(Config().trainer, "target_perplexity"):
             target_perplexity = Config().trainer.target_perplexity
 
-        if target_accuracy and self.accuracy >= target_accuracy:
+        # The global model is not tested in every round with `evaluation_interval`
+        tested = not np.isnan(self.accuracy)
+
+        if tested and target_accuracy and self.accuracy >= target_accuracy:
             logging.info("[%s] Target accuracy reached.", self)
             await self._close()
 
-        if target_perplexity and self.accuracy <= target_perplexity:
+        if tested and target_perplexity and self.accuracy <= target_perplexity:
             logging.info("[%s] Target perplexity reached.", self)
             await self._close()
 
@@ -1332,6 +1491,11 @@ class Server:
     async def _process_reports(self) -> None:
         """Processes a client report."""
 
+    async def _buffer_update(self, update) -> bool:
+        """Folds a client update into the aggregation buffer in buffered asynchronous mode,
+        and returns whether the update has been buffered."""
+        return True
+
     async def periodic_task(self) -> None:
         """
         Async method called periodically in asynchronous mode.
@@ -3,6 +3,7 @@ A simple federated learning server using federated averaging.
 """
 
 import asyncio
+import copy
 import logging
 import os
 
@@ -40,6 +41,12 @@ class Server(base.Server):
         self.testset_sampler = None
         self.total_samples = 0
 
+        # The running sum of staleness-weighted deltas in buffered asynchronous mode,
+        # and copies of the global model versions that clients are still training on
+        self.buffered_deltas = None
+        self.buffered_samples = 0
+        self.model_versions = {}
+
         self.total_clients = Config().clients.total_clients
         self.clients_per_round = Config().clients.per_round
 
@@ -150,8 +157,100 @@ class Server(base.Server):
 
         return avg_update
 
+    def staleness_factor(self, staleness):
+        """Returns the factor that discounts a stale client update in buffered
+        asynchronous mode."""
+        return 1 / (1 + staleness) ** 0.5
+
+    async def _buffer_update(self, update) -> bool:
+        """Folds a client update into the running sum of staleness-weighted deltas,
+        and returns whether the update has been buffered."""
+        weights_received = self.weights_received([update.payload])
+        self.callback_handler.call_event("on_weights_received", self, weights_received)
+
+        # The current global model is kept as long as some clients are training on it,
+        # so that the deltas of stale clients are computed against their own baselines
+        if self.current_round not in self.model_versions:
+            self.model_versions[self.current_round] = copy.deepcopy(
+                self.algorithm.extract_weights()
+            )
+        starting_round = self.current_round - update.staleness
+
+        # Without the model the client started from, its delta cannot be computed,
+        # and computing it against another model would mis-weight the update
+        if starting_round not in self.model_versions:
+            logging.warning(
+                "[Server #%d] Dropping the update from client #%d, as the global "
+                "model of round %d that it was trained from is no longer kept.",
+                os.getpid(),
+                update.client_id,
+                starting_round,
+            )
+            return False
+
+        deltas_received = self.algorithm.compute_weight_deltas(
+            self.model_versions[starting_round], weights_received
+        )
+        self._accumulate_deltas(
+            deltas_received[0], update.report.num_samples, update.staleness
+        )
+        return True
+
+    def _accumulate_deltas(self, deltas, num_samples, staleness=0):
+        """Adds the deltas from a client, weighted by its number of samples and
+        discounted by its staleness, to the running sum of buffered deltas."""
+        weight = num_samples * self.staleness_factor(staleness)
+
+        if self.buffered_deltas is None:
+            self.buffered_deltas = {
+                name: self.trainer.zeros(delta.shape) for name, delta in deltas.items()
+            }
+
+        for name, delta in deltas.items():
+            self.buffered_deltas[name] += delta * weight
+
+        self.buffered_samples += num_samples
+
+    def _apply_buffered_deltas(self):
+        """Applies the buffered deltas to the global model and clears the buffer."""
+        logging.info(
+            "[Server #%d] Applying %d buffered model weight deltas.",
+            os.getpid(),
+            len(self.updates),
+        )
+        deltas = {
+            name: delta / self.buffered_samples
+            for name, delta in self.buffered_deltas.items()
+        }
+        self.total_samples = self.buffered_samples
+        self.buffered_deltas = None
+        self.buffered_samples = 0
+
+        updated_weights = self.algorithm.update_weights(deltas)
+        self.algorithm.load_weights(updated_weights)
+
+        # Only keep the model versions that clients are still training on
+        training_rounds = {
+            client_data["starting_round"]
+            for client_data in self.training_clients.values()
+        }
+        for version in list(self.model_versions):
+            if version not in training_rounds:
+                del self.model_versions[version]
+
     async def _process_reports(self):
         """Process the client reports by aggregating their weights."""
+        if self.buffered_aggregation:
+            self._apply_buffered_deltas()
+            self.weights_aggregated(self.updates)
+            self.callback_handler.call_event(
+                "on_weights_aggregated", self, self.updates
+            )
+            self._test_global_model()
+            self.clients_processed()
+            self.callback_handler.call_event("on_clients_processed", self)
+            return
+
         weights_received = [update.payload for update in self.updates]
 
         weights_received = self.weights_received(weights_received)
@@ -192,17 +291,33 @@ class Server(base.Server):
         self.weights_aggregated(self.updates)
         self.callback_handler.call_event("on_weights_aggregated", self, self.updates)
 
-        # Testing the global model accuracy
+        self._test_global_model()
+
+        self.clients_processed()
+        self.callback_handler.call_event("on_clients_processed", self)
+
+    def _test_global_model(self):
+        """Tests the global model accuracy, every `evaluation_interval` rounds."""
         if hasattr(Config().server, "do_test") and not Config().server.do_test:
             # Compute the average accuracy from client reports
             self.accuracy = self.accuracy_averaging(self.updates)
             logging.info(
                 "[%s] Average client accuracy: %.2f%%.", self, 100 * self.accuracy
             )
-        else:
+        elif (
+            self.current_round % self.evaluation_interval == 0
+            or self.current_round >= Config().trainer.rounds
+        ):
             # Testing the updated model directly at the server
             logging.info("[%s] Started model testing.", self)
             self.accuracy = self.trainer.test(self.testset, self.testset_sampler)
+        else:
+            logging.info(
+                "[%s] Skipped model testing in round %d.", self, self.current_round
+            )
+            # The accuracy of an earlier round is not logged as this round's
+            self.accuracy = float("nan")
+            return
 
         if hasattr(Config().trainer, "target_perplexity"):
             logging.info(
@@ -217,9 +332,6 @@ class Server(base.Server):
                 )
             )
 
-        self.clients_processed()
-        self.callback_handler.call_event("on_clients_processed", self)
-
     def clients_processed(self) -> None:
         """Additional work to be performed after client reports have been processed."""
 
@@ -3,6 +3,7 @@ A cross-silo federated learning server using federated averaging, as either edge
 """
 
 import asyncio
+import copy
 import logging
 import os
 import numpy as np
@@ -33,6 +34,19 @@ class Server(fedavg.Server):
         self.current_global_round = 0
         self.average_accuracy = 0
 
+        # Do edge servers send the deltas relative to the last global model, rather
+        # than their model weights, to the central server?
+        self.edge_deltas = (
+            hasattr(Config().algorithm, "edge_deltas") and Config().algorithm.edge_deltas
+        )
+
+        # Do edge servers start the next round of local aggregation speculatively,
+        # while the central server is still finalizing the current global round?
+        self.speculative_rounds = (
+            hasattr(Config().algorithm, "speculative_rounds")
+            and Config().algorithm.speculative_rounds
+        )
+
         if Config().is_edge_server():
             # An edge client waits for the event that a certain number of
             # aggregations are completed
@@ -83,6 +97,17 @@ class Server(fedavg.Server):
             # The training time of a edge server with its clients in one global round
             self.edge_comm_time = 0
 
+            # The last global model received from the central server, used as the
+            # baseline of the deltas sent to the central server
+            self.global_weights = None
+
+            # States of the local aggregation rounds started speculatively: the model
+            # weights the speculative rounds started from, and the new global model
+            # that arrived in the meantime
+            self.speculating = False
+            self.speculation_baseline = None
+            self.pending_global_weights = None
+
         # Compute the number of clients for the central server
         if Config().is_central_server():
             self.clients_per_round = Config().algorithm.total_silos
@@ -142,7 +167,16 @@ class Server(fedavg.Server):
 
     async def _select_clients(self, for_next_batch=False):
         if Config().is_edge_server() and not for_next_batch:
-            if self.current_round == 0:
+            if self.speculating and self.current_round == Config().algorithm.local_rounds:
+                # All local aggregation rounds were completed speculatively before the
+                # new global model arrived, so wait for it before reporting
+                await self.new_global_round_begins.wait()
+                self.new_global_round_begins.clear()
+
+                self.rebase_speculative_rounds()
+                self.local_rounds_completed()
+
+            if self.current_round == 0 and not self.speculating:
                 # Wait until this edge server is selected by the central server
                 # to avoid the edge server selects clients and clients begin training
                 # before the edge server is selected
@@ -151,6 +185,82 @@ class Server(fedavg.Server):
 
         await super()._select_clients(for_next_batch=for_next_batch)
 
+    def load_global_weights(self, weights) -> None:
+        """Loads the global model received from the central server onto this edge
+        server. If local aggregation rounds have been started speculatively, the
+        global model is loaded after the current round of local aggregation."""
+        if self.speculating:
+            self.pending_global_weights = weights
+        else:
+            self.algorithm.load_weights(weights)
+            self.global_weights = copy.deepcopy(weights)
+
+    def rebase_speculative_rounds(self) -> None:
+        """Applies the progress made in speculative local aggregation rounds onto the
+        new global model from the central server."""
+        current_weights = self.algorithm.extract_weights()
+        speculative_deltas = self.algorithm.compute_weight_deltas(
+            self.speculation_baseline, [current_weights]
+        )[0]
+
+        self.algorithm.load_weights(self.pending_global_weights)
+        self.global_weights = copy.deepcopy(self.pending_global_weights)
+
+        updated_weights = self.algorithm.update_weights(speculative_deltas)
+        self.algorithm.load_weights(updated_weights)
+
+        logging.info(
+            "[Server #%d] Applied the speculative local aggregation rounds onto "
+            "the new global model.",
+            os.getpid(),
+        )
+
+        self.speculating = False
+        self.speculation_baseline = None
+        self.pending_global_weights = None
+
+        # The new global round has begun with the speculative rounds already
+        self.new_global_round_begins.clear()
+
+    def local_rounds_completed(self) -> None:
+        """Signals the edge client to report to the central server after a certain
+        number of local aggregation rounds are completed."""
+        logging.info(
+            "[Server #%d] Completed %s rounds of local aggregation.",
+            os.getpid(),
+            Config().algorithm.local_rounds,
+        )
+        self.model_aggregated.set()
+
+        self.current_round = 0
+        self.current_global_round += 1
+
+        if self.speculative_rounds:
+            # Continue with the next round of local aggregation right away, using
+            # the model that is being reported to the central server
+            self.speculating = True
+            self.speculation_baseline = copy.deepcopy(self.algorithm.extract_weights())
+
+    async def _process_clients(self, client_info):
+        """Folds the deltas from an edge server into the running sum of deltas as soon
+        as they arrive, rather than keeping the payloads of all edge servers."""
+        # When the wall clock time is simulated in asynchronous mode, some of the
+        # reporting edge servers may only be aggregated in a later round
+        if (
+            Config().is_central_server()
+            and self.edge_deltas
+            and not (self.asynchronous_mode and self.simulate_wall_time)
+        ):
+            client = client_info[2]
+            self._accumulate_deltas(
+                client["payload"],
+                client["report"].num_samples,
+                self.current_round - client["starting_round"],
+            )
+            client["payload"] = None
+
+        await super()._process_clients(client_info)
+
     def customize_server_response(self, server_response: dict, client_id) -> dict:
         """Wrap up generating the server response with any additional information."""
         if Config().is_central_server():
@@ -162,6 +272,37 @@ class Server(fedavg.Server):
         # To pass the client_id == 0 assertion during aggregation
         self.trainer.set_client_id(0)
 
+        if Config().is_central_server() and self.edge_deltas:
+            # The deltas from most edge servers have been added up as they arrived
+            for update in self.updates:
+                if update.payload is not None:
+                    self._accumulate_deltas(
+                        update.payload, update.report.num_samples, update.staleness
+                    )
+                    update.payload = None
+
+            self._apply_buffered_deltas()
+        else:
+            await self._aggregate_reports()
+
+        # The model weights have already been aggregated, now calls the
+        # corresponding hook and callback
+        self.weights_aggregated(self.updates)
+        self.callback_handler.call_event("on_weights_aggregated", self, self.updates)
+
+        if Config().is_edge_server():
+            self.trainer.set_client_id(Config().args.id)
+
+            if self.pending_global_weights is not None:
+                self.rebase_speculative_rounds()
+
+        self._test_models()
+
+        self.clients_processed()
+        self.callback_handler.call_event("on_clients_processed", self)
+
+    async def _aggregate_reports(self):
+        """Aggregates the model weights received in the client reports."""
         weights_received = [update.payload for update in self.updates]
 
         weights_received = self.weights_received(weights_received)
@@ -197,14 +338,8 @@ class Server(fedavg.Server):
             # Loads the new model weights
             self.algorithm.load_weights(updated_weights)
 
-        # The model weights have already been aggregated, now calls the
-        # corresponding hook and callback
-        self.weights_aggregated(self.updates)
-        self.callback_handler.call_event("on_weights_aggregated", self, self.updates)
-
-        if Config().is_edge_server():
-            self.trainer.set_client_id(Config().args.id)
-
+    def _test_models(self):
+        """Tests the aggregated model or averages the accuracies from client reports."""
         # Testing the model accuracy
         if (Config().is_edge_server() and Config().clients.do_test) or (
             Config().is_central_server()
@@ -280,9 +415,6 @@ class Server(fedavg.Server):
         else:
             self.accuracy = self.average_accuracy
 
-        self.clients_processed()
-        self.callback_handler.call_event("on_clients_processed", self)
-
     def clients_processed(self):
         """Additional work to be performed after client reports have been processed."""
         # Record results into a .csv file
@@ -295,17 +427,13 @@ class Server(fedavg.Server):
             self.edge_comm_time += logged_items["comm_time"]
 
             # When a certain number of aggregations are completed, an edge client
-            # needs to be signaled to send a report to the central server
-            if self.current_round == Config().algorithm.local_rounds:
-                logging.info(
-                    "[Server #%d] Completed %s rounds of local aggregation.",
-                    os.getpid(),
-                    Config().algorithm.local_rounds,
-                )
-                self.model_aggregated.set()
-
-                self.current_round = 0
-                self.current_global_round += 1
+            # needs to be signaled to send a report to the central server. Speculative
+            # rounds are only reported after the new global model has arrived
+            if (
+                self.current_round == Config().algorithm.local_rounds
+                and not self.speculating
+            ):
+                self.local_rounds_completed()
 
     def get_logged_items(self) -> dict:
         """Get items to be logged by the LogProgressCallback class in a .csv file."""
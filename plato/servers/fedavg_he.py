@@ -2,6 +2,9 @@
 A federated learning server using federated averaging to aggregate updates after homomorphic encryption.
 """
 from functools import reduce
+
+import numpy as np
+
 from plato.servers import fedavg
 from plato.utils import homo_enc
 
@@ -77,7 +80,7 @@ class Server(fedavg.Server):
         # Assert the encrypted weights from all clients are aligned
         indices = [homo_enc.extract_encrypted_model(x)[2] for x in weights_received]
         for i in range(1, len(indices)):
-            assert indices[i] == indices[0]
+            assert np.array_equal(indices[i], indices[0])
         encrypt_indices = indices[0]
 
         # Extract the total number of samples
@@ -2,6 +2,7 @@
 The training and testing loops for PyTorch.
 """
 
+import contextlib
 import copy
 import logging
 import multiprocessing as mp
@@ -56,6 +57,12 @@ class Trainer(base.Trainer):
         self.lr_scheduler = None
         self.current_epoch = 0
 
+        # The gradient scaler used when training in the fp16-amp precision mode
+        self.grad_scaler = None
+
+        # Whether the model has been compiled in this process
+        self.model_compiled = False
+
     def zeros(self, shape):
         """Returns a PyTorch zero tensor with the given shape."""
         # This should only be called from a server
@@ -174,17 +181,26 @@ class Trainer(base.Trainer):
         """
         self.optimizer.zero_grad()
 
-        outputs = self.model(examples)
+        with self.autocast(config):
+            outputs = self.model(examples)
 
-        loss = self._loss_criterion(outputs, labels)
+            loss = self._loss_criterion(outputs, labels)
         self._loss_tracker.update(loss, labels.size(0))
 
+        # Losses are scaled before the backward pass in the fp16-amp precision mode,
+        # so that small fp16 gradients do not underflow
+        scaled_loss = loss if self.grad_scaler is None else self.grad_scaler.scale(loss)
+
         if "create_graph" in config:
-            loss.backward(create_graph=config["create_graph"])
+            scaled_loss.backward(create_graph=config["create_graph"])
         else:
-            loss.backward()
+            scaled_loss.backward()
 
-        self.optimizer.step()
+        if self.grad_scaler is None:
+            self.optimizer.step()
+        else:
+            self.grad_scaler.step(self.optimizer)
+            self.grad_scaler.update()
 
         return loss
 
@@ -209,8 +225,10 @@ class Trainer(base.Trainer):
         self.optimizer = self.get_optimizer(self.model)
         self.lr_scheduler = self.get_lr_scheduler(config, self.optimizer)
         self.optimizer = self._adjust_lr(config, self.lr_scheduler, self.optimizer)
+        self.grad_scaler = self.get_grad_scaler(config)
 
         self.model.to(self.device)
+        self.compile_model(config)
         self.model.train()
 
         total_epochs = config["epochs"]
@@ -333,6 +351,7 @@ class Trainer(base.Trainer):
         kwargs (optional): Additional keyword arguments.
         """
         self.model.to(self.device)
+        self.compile_model(config)
         self.model.eval()
 
         # Initialize accuracy to be returned to -1, so that the client can disconnect
@@ -490,7 +509,8 @@ class Trainer(base.Trainer):
             for examples, labels in test_loader:
                 examples, labels = examples.to(self.device), labels.to(self.device)
 
-                outputs = self.model(examples)
+                with self.autocast(config):
+                    outputs = self.model(examples)
 
                 outputs = self.process_outputs(outputs)
 
@@ -528,21 +548,152 @@ class Trainer(base.Trainer):
         schedulers can be effective throughout the communication rounds."""
 
         if "global_lr_scheduler" in config and config["global_lr_scheduler"]:
-            global_lr_scheduler = copy.deepcopy(lr_scheduler)
-
-            for __ in range(self.current_round - 1):
-                for __ in range(Config().trainer.epochs):
-                    global_lr_scheduler.step()
-
-            initial_lr = global_lr_scheduler.get_last_lr()
+            past_steps = (self.current_round - 1) * Config().trainer.epochs
+            initial_lr = self._global_lr(lr_scheduler, past_steps)
             optimizer.param_groups[0]["lr"] = initial_lr[0]
 
         return optimizer
 
+    def _global_lr(self, lr_scheduler, steps) -> list:
+        """Returns the learning rates of a learning rate scheduler after it has
+        been stepped for the given number of steps.
+
+        The learning rates are computed directly at the given step if the
+        scheduler has a closed form. Otherwise, the scheduler is stepped from
+        the state saved when this client was last trained, rather than from
+        its initial state.
+        """
+        if isinstance(lr_scheduler, torch.optim.lr_scheduler.LambdaLR):
+            return [
+                base_lr * lr_lambda(steps)
+                for lr_lambda, base_lr in zip(
+                    lr_scheduler.lr_lambdas, lr_scheduler.base_lrs
+                )
+            ]
+
+        global_lr_scheduler = copy.deepcopy(lr_scheduler)
+
+        if hasattr(global_lr_scheduler, "_get_closed_form_lr"):
+            global_lr_scheduler.last_epoch = steps
+            # pylint: disable=protected-access
+            return global_lr_scheduler._get_closed_form_lr()
+
+        model_name = Config().trainer.model_name
+        run_id = Config().params["run_id"]
+        filename = f"{model_name}_{self.client_id}_{run_id}.lr_scheduler"
+        state_path = os.path.join(Config().params["model_path"], filename)
+
+        past_steps = 0
+        if os.path.exists(state_path):
+            with open(state_path, "rb") as state_file:
+                saved_steps, saved_state = pickle.load(state_file)
+
+            if saved_steps <= steps:
+                global_lr_scheduler.load_state_dict(saved_state)
+                past_steps = saved_steps
+
+                # Chainable schedulers compute the next learning rates from those
+                # in the optimizer, which are restored to the saved learning rates
+                optimizer = getattr(global_lr_scheduler, "optimizer", None)
+                if optimizer is None:
+                    # pylint: disable=protected-access
+                    optimizer = global_lr_scheduler._schedulers[0].optimizer
+
+                for group, last_lr in zip(
+                    optimizer.param_groups, saved_state["_last_lr"]
+                ):
+                    group["lr"] = last_lr
+
+        for __ in range(steps - past_steps):
+            global_lr_scheduler.step()
+
+        with open(state_path, "wb") as state_file:
+            pickle.dump((steps, global_lr_scheduler.state_dict()), state_file)
+
+        return global_lr_scheduler.get_last_lr()
+
     def get_loss_criterion(self):
         """Returns the loss criterion."""
         return loss_criterion.get()
 
+    def compile_model(self, config):
+        """Compiles the model with `torch.compile` if `trainer.compile` is true.
+
+        The model is compiled in place only once per process, so that the
+        compiled graph is reused across rounds: new weights are always loaded
+        into the same parameters with `load_state_dict()`, and the keys in the
+        state dict of the model are not changed. Compilation artifacts are cached
+        on disk, so that the training processes spawned in every round when
+        `max_concurrency` is specified do not need to compile from scratch.
+        """
+        if self.model_compiled or not ("compile" in config and config["compile"]):
+            return
+
+        cache_dir = os.path.join(Config().params["base_path"], "compile_cache")
+        os.makedirs(cache_dir, exist_ok=True)
+        os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR", cache_dir)
+        os.environ.setdefault("TORCHINDUCTOR_FX_GRAPH_CACHE", "1")
+
+        compile_mode = config["compile_mode"] if "compile_mode" in config else None
+
+        logging.info(
+            "[Client #%d] Compiling the model with torch.compile.", self.client_id
+        )
+        self.model.compile(mode=compile_mode)
+        self.model_compiled = True
+
+    def _autocast_dtype(self, config):
+        """Returns the data type used by autocast in the configured precision mode,
+        or None if the model should run in full precision."""
+        precision = config["precision"] if "precision" in config else "fp32"
+        device_type = torch.device(self.device).type
+
+        if precision == "fp32":
+            return None
+
+        if device_type not in ("cuda", "cpu"):
+            logging.warning(
+                "[Client #%d] Precision mode %s is not supported on %s, using fp32.",
+                self.client_id,
+                precision,
+                self.device,
+            )
+            return None
+
+        if precision == "bf16":
+            return torch.bfloat16
+
+        if precision == "fp16-amp":
+            if device_type == "cpu":
+                # Float16 autocast and gradient scaling are only available on CUDA,
+                # bfloat16 is the reduced precision format supported on the CPU
+                return torch.bfloat16
+            return torch.float16
+
+        raise ValueError(f"Unknown precision mode: {precision}")
+
+    def autocast(self, config):
+        """Returns a context manager that runs the model in the configured
+        precision mode (`trainer.precision`), which can be `fp32` (the default),
+        `bf16`, or `fp16-amp`.
+
+        Model weights are kept in fp32, so that the weights exchanged with the
+        server are not affected by the precision mode.
+        """
+        dtype = self._autocast_dtype(config)
+
+        if dtype is None:
+            return contextlib.nullcontext()
+
+        return torch.autocast(device_type=torch.device(self.device).type, dtype=dtype)
+
+    def get_grad_scaler(self, config):
+        """Returns the gradient scaler if training in the fp16-amp precision mode."""
+        if self._autocast_dtype(config) == torch.float16:
+            return torch.cuda.amp.GradScaler()
+
+        return None
+
     def backward(self, config, loss):
         """Perform the backpropagation pass."""
 
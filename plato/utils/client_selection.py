@@ -0,0 +1,73 @@
+"""
+Selecting clients with per-client statistics kept in NumPy arrays indexed by client
+ID, for the servers that rank clients by their utilities, such as Oort and Pisces.
+
+Entry 0 of each array is unused, so that client IDs, which start from 1, index the
+arrays directly. The clients available in a round are given by a boolean mask, and
+only the candidates needed are sorted, so that choosing a few clients out of a very
+large number of registered clients does not sort all of them.
+"""
+import numpy as np
+
+
+def availability_mask(total_clients, clients_pool, excluded=None) -> np.ndarray:
+    """Returns a boolean mask indexed by client ID, which is true for the clients in
+    the pool, except for the excluded clients."""
+    mask = np.zeros(total_clients + 1, dtype=bool)
+    mask[np.asarray(clients_pool, dtype=int)] = True
+
+    if excluded is not None and len(excluded) > 0:
+        mask[np.asarray(excluded, dtype=int)] = False
+
+    return mask
+
+
+def sorted_by_value(values, mask, count=None) -> np.ndarray:
+    """Returns the IDs of the clients in the mask in decreasing order of their values,
+    with ties broken by increasing client IDs, as a stable sort would. If `count`
+    is given, only the first `count` clients are returned, and only those are
+    sorted."""
+    candidates = np.flatnonzero(mask)
+
+    if count is None or count >= len(candidates):
+        return candidates[np.argsort(-values[candidates], kind="stable")][:count]
+
+    if count <= 0:
+        return candidates[:0]
+
+    # The value of the last client to be returned
+    candidate_values = values[candidates]
+    threshold = np.partition(candidate_values, len(candidates) - count)[
+        len(candidates) - count
+    ]
+
+    above = candidates[candidate_values > threshold]
+    above = above[np.argsort(-values[above], kind="stable")]
+
+    # The candidates are in increasing order of client IDs
+    ties = candidates[candidate_values == threshold][: count - len(above)]
+
+    return np.concatenate((above, ties))
+
+
+def weighted_sample(client_ids, weights, count) -> np.ndarray:
+    """Samples `count` clients without replacement, each drawn with a probability
+    proportional to its weight among the clients not drawn yet, in the order that
+    they are drawn.
+
+    Each client is given an exponential key scaled by the inverse of its weight, and
+    the clients with the smallest keys are drawn, which is equivalent to drawing the
+    clients one after another.
+    """
+    client_ids = np.asarray(client_ids)
+    count = min(count, len(client_ids))
+    if count <= 0:
+        return client_ids[:0]
+
+    with np.errstate(divide="ignore"):
+        keys = np.random.exponential(size=len(client_ids)) / np.asarray(
+            weights, dtype=float
+        )
+
+    drawn = np.argpartition(keys, count - 1)[:count]
+    return client_ids[drawn[np.argsort(keys[drawn], kind="stable")]]
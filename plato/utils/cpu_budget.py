@@ -0,0 +1,131 @@
+"""
+Dividing the CPU cores of a host among co-located client processes.
+
+By default, PyTorch, NumPy and MKL in every client process start as many threads
+as there are cores on the host, so that many client processes on the same host
+oversubscribe its cores. With `clients:cpu_budget` enabled, the cores are
+divided evenly among the client processes launched by the server, and each
+process limits its thread pools to its share of cores. With `clients:cpu_affinity`
+also enabled, each process is pinned to its own cores.
+"""
+import logging
+import os
+from contextlib import contextmanager
+
+import numpy as np
+
+from plato.config import Config
+
+THREAD_ENVIRONMENT_VARIABLES = (
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+
+
+def enabled() -> bool:
+    """Returns whether the CPU cores should be divided among client processes."""
+    return hasattr(Config().clients, "cpu_budget") and Config().clients.cpu_budget
+
+
+def available_cores() -> list:
+    """Returns the CPU cores available to the current process."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+
+    return list(range(os.cpu_count()))
+
+
+def plan(total_processes, cores=None) -> list:
+    """Divides the CPU cores into one contiguous group of cores per process.
+
+    If there are fewer cores than processes, each process is assigned a single
+    core, and the cores are shared in a round-robin fashion.
+    """
+    if cores is None:
+        cores = available_cores()
+
+    if len(cores) >= total_processes:
+        return [group.tolist() for group in np.array_split(cores, total_processes)]
+
+    return [[cores[i % len(cores)]] for i in range(total_processes)]
+
+
+@contextmanager
+def thread_environment(cores):
+    """Sets the thread environment variables for a process that is about to be
+    spawned, so that its native libraries are loaded with the right number of
+    threads, and restores them afterwards."""
+    saved_environment = {
+        variable: os.environ.get(variable) for variable in THREAD_ENVIRONMENT_VARIABLES
+    }
+
+    for variable in THREAD_ENVIRONMENT_VARIABLES:
+        os.environ[variable] = str(max(1, len(cores)))
+
+    try:
+        yield
+    finally:
+        for variable, value in saved_environment.items():
+            if value is None:
+                del os.environ[variable]
+            else:
+                os.environ[variable] = value
+
+
+def apply(cores) -> None:
+    """Limits the thread pools of the current process to the given CPU cores,
+    and pins the current process to them if `clients:cpu_affinity` is enabled.
+
+    The environment variables are inherited by the training and testing
+    processes spawned when `trainer:max_concurrency` is specified.
+    """
+    threads = max(1, len(cores))
+
+    for variable in THREAD_ENVIRONMENT_VARIABLES:
+        os.environ[variable] = str(threads)
+
+    if (
+        hasattr(Config().clients, "cpu_affinity")
+        and Config().clients.cpu_affinity
+        and hasattr(os, "sched_setaffinity")
+    ):
+        os.sched_setaffinity(0, cores)
+
+    if not (
+        hasattr(Config().trainer, "use_mindspore")
+        or hasattr(Config().trainer, "use_tensorflow")
+    ):
+        import torch
+
+        torch.set_num_threads(threads)
+
+        # The number of inter-op threads can only be set before any inter-op
+        # parallel work has started in this process
+        try:
+            torch.set_num_interop_threads(threads)
+        except RuntimeError:
+            pass
+
+    logging.info(
+        "[Process #%d] Using %d thread(s) on CPU core(s) %s.",
+        os.getpid(),
+        threads,
+        cores,
+    )
+
+
+def cpu_time() -> float:
+    """Returns the CPU time used by the current process and its terminated
+    child processes, such as the training processes spawned in every round."""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def budgeted_threads() -> int:
+    """Returns the number of threads in the budget of the current process."""
+    if "OMP_NUM_THREADS" in os.environ:
+        return int(os.environ["OMP_NUM_THREADS"])
+
+    return len(available_cores())
@@ -51,13 +51,13 @@ def encrypt_weights(
     for weight in plain_weights.values():
         weights_vector = np.append(weights_vector, weight)
 
-    # Step 2: set up the indices for encrypted weights
-    encrypt_indices = None
+    # Step 2: set up the indices for encrypted weights, in ascending order
     if indices is None:
-        encrypt_indices = np.arange(len(weights_vector)).tolist()
+        encrypt_indices = np.arange(len(weights_vector))
     else:
-        encrypt_indices = indices
-    encrypt_indices.sort()
+        encrypt_indices = np.asarray(indices, dtype=np.int64)
+        if np.any(encrypt_indices[1:] < encrypt_indices[:-1]):
+            encrypt_indices = np.sort(encrypt_indices)
 
     # Step 3: separate weights into encrypted and unencrypted ones
     unencrypted_weights = np.delete(weights_vector, encrypt_indices)
@@ -156,12 +156,21 @@ def extract_encrypted_model(data):
     return unencrypted_weights, encrypted_weights, indices
 
 
-def indices_to_bitmap(indices):
-    """Turn a list of indices into a bitmap."""
-    if indices == []:
+def indices_to_bitmap(indices, size=None):
+    """Turn a list of indices into a bitmap.
+
+    If the size is given, the bitmap covers the indices from 0 to size - 1, so
+    that bitmaps of the same size can be combined with bitwise operations.
+    """
+    if len(indices) == 0:
         # In case of empty list
-        return indices
-    bit_array = np.zeros(np.max(indices) + 1, dtype=np.int8)
+        return []
+
+    indices = np.asarray(indices)
+    if size is None:
+        size = np.max(indices) + 1
+
+    bit_array = np.zeros(size, dtype=np.uint8)
     bit_array[indices] = 1
     bitmap = np.packbits(bit_array)
 
@@ -170,13 +179,30 @@ def indices_to_bitmap(indices):
     return compressed_bitmap
 
 
+def _unpack_bitmap(bitmap):
+    """Decompress a bitmap into an array of packed bits."""
+    return pickle.loads(zlib.decompress(bitmap))
+
+
 def bitmap_to_indices(bitmap):
-    """Translate a bitmap back to a list of indices."""
-    if bitmap == []:
+    """Translate a bitmap back to an ascending array of indices."""
+    if len(bitmap) == 0:
         # In case of empty list
-        return bitmap
+        return []
 
-    decompressed_bitmap = pickle.loads(zlib.decompress(bitmap))
-    bit_array = np.unpackbits(decompressed_bitmap)
-    indices = np.where(bit_array == 1)[0].tolist()
+    bit_array = np.unpackbits(_unpack_bitmap(bitmap))
+    indices = np.flatnonzero(bit_array)
     return indices
+
+
+def bitmaps_union(bitmaps):
+    """Merge bitmaps into the bitmap of the union of their indices."""
+    packed_bitmaps = [_unpack_bitmap(bitmap) for bitmap in bitmaps if len(bitmap)]
+    if len(packed_bitmaps) == 0:
+        return []
+
+    union = np.zeros(max(len(packed) for packed in packed_bitmaps), dtype=np.uint8)
+    for packed in packed_bitmaps:
+        union[: len(packed)] |= packed
+
+    return zlib.compress(pickle.dumps(union))
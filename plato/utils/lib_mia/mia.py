@@ -21,33 +21,69 @@ from torch.nn.functional import softmax
 from plato.config import Config
 
 
-def train_attack_model(shadow_model, in_dataloader, out_dataloader):
-    """Train attack model with shadow models."""
+def collect_posteriors(models, dataloader, max_samples=None):
+    """Computes the posteriors of one or more models on a dataset.
+
+    Each batch is loaded only once and passed through all the models, and the
+    posteriors are written into buffers preallocated for the whole dataset.
+
+    :param models: A model, or a list of models.
+    :param dataloader: The data loader of the dataset.
+    :param max_samples: If given, stops after the posteriors of the first
+        `max_samples` samples have been computed.
+    :return: A NumPy array of posteriors, or a list of them if a list of models
+        was given.
+    """
+    single_model = not isinstance(models, (list, tuple))
+    if single_model:
+        models = [models]
+
+    num_samples = len(dataloader.sampler)
+    if max_samples is not None:
+        num_samples = min(num_samples, max_samples)
+
+    posteriors = [
+        torch.empty([num_samples, Config().data.num_classes]) for __ in models
+    ]
+
+    filled = 0
+    with torch.no_grad():
+        for data, __ in dataloader:
+            if filled == num_samples:
+                break
+
+            batch_size = min(len(data), num_samples - filled)
+            data = data[:batch_size].to(Config().device())
+
+            for model, model_posteriors in zip(models, posteriors):
+                model_posteriors[filled : filled + batch_size] = softmax(
+                    model(data), dim=1
+                ).cpu()
+
+            filled += batch_size
+
+    posteriors = [model_posteriors[:filled].numpy() for model_posteriors in posteriors]
+
+    return posteriors[0] if single_model else posteriors
+
+
+def train_attack_model(
+    shadow_model, in_dataloader, out_dataloader, in_posteriors=None, out_posteriors=None
+):
+    """Train attack model with shadow models.
+
+    The posteriors of the shadow model on the member and non-member data are
+    computed unless they are provided.
+    """
     logging.info("Training attack model")
 
-    pred_4_mem = torch.zeros([1, Config().data.num_classes])
-    pred_4_mem = pred_4_mem.to(Config().device())
-    with torch.no_grad():
-        for _, (data, _) in enumerate(in_dataloader):
-            data = data.to(Config().device())
-            out = shadow_model(data)
-            pred_4_mem = torch.cat([pred_4_mem, out])
-    pred_4_mem = pred_4_mem[1:, :]
-    pred_4_mem = softmax(pred_4_mem, dim=1)
-    pred_4_mem = pred_4_mem.cpu()
-    pred_4_mem = pred_4_mem.detach().numpy()
-
-    pred_4_nonmem = torch.zeros([1, Config().data.num_classes])
-    pred_4_nonmem = pred_4_nonmem.to(Config().device())
-    with torch.no_grad():
-        for _, (data, _) in enumerate(out_dataloader):
-            data = data.to(Config().device())
-            out = shadow_model(data)
-            pred_4_nonmem = torch.cat([pred_4_nonmem, out])
-    pred_4_nonmem = pred_4_nonmem[1:, :]
-    pred_4_nonmem = softmax(pred_4_nonmem, dim=1)
-    pred_4_nonmem = pred_4_nonmem.cpu()
-    pred_4_nonmem = pred_4_nonmem.detach().numpy()
+    if in_posteriors is None:
+        in_posteriors = collect_posteriors(shadow_model, in_dataloader)
+    if out_posteriors is None:
+        out_posteriors = collect_posteriors(shadow_model, out_dataloader)
+
+    pred_4_mem = in_posteriors
+    pred_4_nonmem = out_posteriors
 
     attacker = CatBoostClassifier(
         iterations=200,
@@ -69,45 +105,39 @@ def train_attack_model(shadow_model, in_dataloader, out_dataloader):
     return attacker
 
 
-def launch_attack(target_model, attack_model, attack_dataloader, out_dataloader):
-    """Launch attack toward the target model."""
+def launch_attack(
+    target_model,
+    attack_model,
+    attack_dataloader,
+    out_dataloader,
+    unlearn_posteriors=None,
+    out_posteriors=None,
+):
+    """Launch attack toward the target model.
+
+    The posteriors of the target model on the unlearned data and the test data
+    are computed unless they are provided.
+    """
     logging.info("Launching attack")
 
     # The posteriors of unlearned/forgotten data through the target model
-    unlearn_X = torch.zeros([1, Config().data.num_classes])
-    unlearn_X = unlearn_X.to(Config().device())
-    with torch.no_grad():
-        for _, (data, _) in enumerate(attack_dataloader):
-            data = data.to(Config().device())
-            out = target_model(data)
-            unlearn_X = torch.cat([unlearn_X, out])
+    if unlearn_posteriors is None:
+        unlearn_posteriors = collect_posteriors(target_model, attack_dataloader)
+    unlearn_X = np.sort(unlearn_posteriors, axis=1)
 
-    unlearn_X = unlearn_X[1:, :]
-    unlearn_X = softmax(unlearn_X, dim=1)
-    unlearn_X = unlearn_X.cpu().detach().numpy()
-
-    unlearn_X.sort(axis=1)
     unlearn_y = np.ones(unlearn_X.shape[0])
     unlearn_y = unlearn_y.astype(np.int16)
 
     N_unlearn_sample = len(unlearn_y)
 
-    # The posteriors of testset data through the target model
-    test_X = torch.zeros([1, Config().data.num_classes])
-    test_X = test_X.to(Config().device())
-    with torch.no_grad():
-        for _, (data, _) in enumerate(out_dataloader):
-            data = data.to(Config().device())
-            out = target_model(data)
-            test_X = torch.cat([test_X, out])
-
-            if test_X.shape[0] > N_unlearn_sample:
-                break
-    test_X = test_X[1 : N_unlearn_sample + 1, :]
-    test_X = softmax(test_X, dim=1)
-    test_X = test_X.cpu().detach().numpy()
+    # The posteriors of testset data through the target model, with as many
+    # samples as the unlearned data
+    if out_posteriors is None:
+        out_posteriors = collect_posteriors(
+            target_model, out_dataloader, max_samples=N_unlearn_sample
+        )
+    test_X = np.sort(out_posteriors[:N_unlearn_sample], axis=1)
 
-    test_X.sort(axis=1)
     test_y = np.zeros(test_X.shape[0])
     test_y = test_y.astype(np.int16)
 
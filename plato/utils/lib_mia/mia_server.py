@@ -10,13 +10,18 @@ https://ieeexplore.ieee.org/document/9521274
 https://arxiv.org/pdf/1610.05820.pdf
 """
 import copy
+import hashlib
 
 import torch
 from torch.utils.data import SubsetRandomSampler
 
 from plato.config import Config
 from plato.servers import fedavg
-from plato.utils.lib_mia.mia import launch_attack, train_attack_model
+from plato.utils.lib_mia.mia import (
+    collect_posteriors,
+    launch_attack,
+    train_attack_model,
+)
 
 
 class Server(fedavg.Server):
@@ -36,6 +41,10 @@ class Server(fedavg.Server):
         # A dictionary that maps client IDs to their sample indices
         self.sample_indices = {}
 
+        # The posteriors computed in the last evaluation, keyed by the dataset
+        # and the weights of the model, reused as long as neither changes
+        self.posteriors = {}
+
     def weights_aggregated(self, updates):
         """Extract required information from client reports after aggregating weights."""
         for update in updates:
@@ -84,12 +93,74 @@ class Server(fedavg.Server):
 
         shadow_model = self.get_shadow_model()
         target_model = self.get_target_model()
+        models = [shadow_model, target_model]
+
+        learned_key = ("learned", tuple(sorted(learned_indices)))
+        unlearned_key = ("unlearned", tuple(sorted(unlearned_indices)))
+        fingerprints = [self._fingerprint(model) for model in models]
+
+        (in_posteriors,) = self._posteriors(
+            models[:1], fingerprints[:1], learned_dataloader, learned_key
+        )
+        (unlearn_posteriors,) = self._posteriors(
+            models[1:], fingerprints[1:], unlearned_dataloader, unlearned_key
+        )
+        # The shadow and target models are evaluated on the test set in one pass
+        shadow_out_posteriors, target_out_posteriors = self._posteriors(
+            models, fingerprints, out_dataloader, ("test",)
+        )
+
+        # Only the posteriors of the current models can be reused
+        self.posteriors = {
+            key: value
+            for key, value in self.posteriors.items()
+            if key[1] in fingerprints
+        }
 
         attack_model = train_attack_model(
-            shadow_model, learned_dataloader, out_dataloader
+            shadow_model,
+            learned_dataloader,
+            out_dataloader,
+            in_posteriors=in_posteriors,
+            out_posteriors=shadow_out_posteriors,
         )
 
-        launch_attack(target_model, attack_model, unlearned_dataloader, out_dataloader)
+        launch_attack(
+            target_model,
+            attack_model,
+            unlearned_dataloader,
+            out_dataloader,
+            unlearn_posteriors=unlearn_posteriors,
+            out_posteriors=target_out_posteriors,
+        )
+
+    def _posteriors(self, models, fingerprints, dataloader, dataset_key):
+        """Returns the posteriors of the models on a dataset, computing those not
+        cached in one pass over the dataset."""
+        missing = [
+            index
+            for index, fingerprint in enumerate(fingerprints)
+            if (dataset_key, fingerprint) not in self.posteriors
+        ]
+
+        if missing:
+            computed = collect_posteriors(
+                [models[index] for index in missing], dataloader
+            )
+            for index, posteriors in zip(missing, computed):
+                self.posteriors[(dataset_key, fingerprints[index])] = posteriors
+
+        return [
+            self.posteriors[(dataset_key, fingerprint)] for fingerprint in fingerprints
+        ]
+
+    @staticmethod
+    def _fingerprint(model):
+        """Returns a digest of the weights of a model."""
+        digest = hashlib.sha1()
+        for weights in model.state_dict().values():
+            digest.update(weights.detach().cpu().numpy().tobytes())
+        return digest.hexdigest()
 
     def get_shadow_model(self):
         """Load the shadow model, which is the current global model in this case."""
@@ -0,0 +1,81 @@
+"""
+Implements unary encoding and randomized response on PyTorch tensors, as the local
+differential privacy mechanism.
+
+The perturbation is applied on the device where the tensor resides, and draws only
+one uniform random tensor of the same shape: each bit is reported as one with
+probability p if it is one, and with probability q if it is zero.
+
+References:
+
+Wang, et al. "Optimizing Locally Differentially Private Protocols," ATC USENIX 2017.
+
+Erlingsson, et al. "RAPPOR: Randomized Aggregatable Privacy-Preserving Ordinal Response,"
+ACM CCS 2014.
+"""
+import hashlib
+import math
+
+import torch
+
+
+def encode(x: torch.Tensor) -> torch.Tensor:
+    """Encodes the positive values as ones, and the others as zeros."""
+    return (x > 0).to(torch.float32)
+
+
+def randomize(bit_tensor: torch.Tensor, epsilon, generator=None) -> torch.Tensor:
+    """
+    The default unary encoding method is symmetric.
+    """
+    return symmetric_unary_encoding(bit_tensor, epsilon, generator)
+
+
+def symmetric_unary_encoding(bit_tensor: torch.Tensor, epsilon, generator=None):
+    """Randomized response with p = e^(ε/2) / (e^(ε/2) + 1) and q = 1 - p."""
+    p = math.exp(epsilon / 2) / (math.exp(epsilon / 2) + 1)
+    q = 1 / (math.exp(epsilon / 2) + 1)
+    return produce_randomized_response(bit_tensor, p, q, generator)
+
+
+def optimized_unary_encoding(bit_tensor: torch.Tensor, epsilon, generator=None):
+    """Randomized response with p = 1/2 and q = 1 / (e^ε + 1)."""
+    p = 1 / 2
+    q = 1 / (math.exp(epsilon) + 1)
+    return produce_randomized_response(bit_tensor, p, q, generator)
+
+
+def produce_randomized_response(
+    bit_tensor: torch.Tensor, p, q=None, generator=None
+) -> torch.Tensor:
+    """Implements randomized response as the perturbation method."""
+    q = 1 - p if q is None else q
+
+    uniform = torch.rand(
+        bit_tensor.shape,
+        generator=generator,
+        device=bit_tensor.device,
+    )
+
+    # The probability of reporting a one is p for the ones and q for the zeros
+    threshold = (bit_tensor == 1).to(uniform.dtype).mul_(p - q).add_(q)
+
+    return uniform.lt_(threshold).to(bit_tensor.dtype)
+
+
+def get_generator(device, seed=None):
+    """Returns a random number generator on the given device, or None to use the
+    default generator if no seed is given."""
+    if seed is None:
+        return None
+
+    generator = torch.Generator(device=device)
+    generator.manual_seed(seed)
+    return generator
+
+
+def derive_seed(*components) -> int:
+    """Returns a seed derived from the given components, such as a configured seed,
+    a client ID and a round number, which is the same in every process and run."""
+    digest = hashlib.sha256(repr(components).encode()).digest()
+    return int.from_bytes(digest[:8], "little") % (2**63)
@@ -4,7 +4,6 @@ import os
 import random
 from abc import ABC, abstractmethod
 
-import numpy as np
 import torch
 import torch.nn.functional as F
 from plato.config import Config
@@ -12,7 +11,11 @@ from torch import nn
 
 
 class ReplayMemory:
-    """ A simple example of replay memory buffer. """
+    """ A simple example of replay memory buffer.
+
+    The transitions are stored in contiguous tensors on the device where the
+    policy is trained, so that a minibatch is sampled with a single gather.
+    """
     def __init__(self, state_dim, action_dim, capacity, seed):
         random.seed(seed)
         self.device = Config().device()
@@ -20,26 +23,50 @@ class ReplayMemory:
         self.ptr = 0
         self.size = 0
 
-        self.state = np.zeros((self.capacity, state_dim))
-        self.action = np.zeros((self.capacity, action_dim))
-        self.reward = np.zeros((self.capacity, 1))
-        self.next_state = np.zeros((self.capacity, state_dim))
-        self.done = np.zeros((self.capacity, 1))
+        self.generator = torch.Generator(device=self.device)
+        self.generator.manual_seed(seed)
+
+        self.state = self.zeros(state_dim)
+        self.action = self.zeros(action_dim)
+        self.reward = self.zeros(1)
+        self.next_state = self.zeros(state_dim)
+        self.done = self.zeros(1)
+
+    def zeros(self, *shape):
+        """ Allocates the buffer of one field of the transitions. """
+        return torch.zeros((self.capacity, ) + shape,
+                           dtype=torch.float,
+                           device=self.device)
+
+    def to_tensor(self, value):
+        """ Converts one field of a transition to a tensor on the device. """
+        if isinstance(value, torch.Tensor):
+            value = value.detach()
+        return torch.as_tensor(value, dtype=torch.float, device=self.device)
+
+    def store(self, buffer, value):
+        """ Stores one field of a transition at the current position. """
+        buffer[self.ptr] = self.to_tensor(value).reshape(buffer.shape[1:])
 
     def push(self, data):
-        self.state[self.ptr] = data[0]
-        self.action[self.ptr] = data[1]
-        self.reward[self.ptr] = data[2]
-        self.next_state[self.ptr] = data[3]
-        self.done[self.ptr] = data[4]
+        self.store(self.state, data[0])
+        self.store(self.action, data[1])
+        self.store(self.reward, data[2])
+        self.store(self.next_state, data[3])
+        self.store(self.done, data[4])
 
         self.ptr = (self.ptr + 1) % self.capacity
         self.size = min(self.size + 1, self.capacity)
 
+    def sample_indices(self):
+        """ Samples the indices of a minibatch of transitions. """
+        return torch.randint(0,
+                             self.size, (int(Config().algorithm.batch_size), ),
+                             generator=self.generator,
+                             device=self.device)
+
     def sample(self):
-        ind = np.random.randint(0,
-                                self.size,
-                                size=int(Config().algorithm.batch_size))
+        ind = self.sample_indices()
 
         state = self.state[ind]
         action = self.action[ind]
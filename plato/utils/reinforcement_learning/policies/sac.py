@@ -257,14 +257,9 @@ class Policy(base.Policy):
             state_batch, action_batch, reward_batch, next_state_batch, mask_batch = self.replay_buffer.sample(
             )
 
-            state_batch = torch.FloatTensor(state_batch).to(self.device)
-            next_state_batch = torch.FloatTensor(next_state_batch).to(
-                self.device)
-            action_batch = torch.FloatTensor(action_batch).to(self.device)
-            reward_batch = torch.FloatTensor(reward_batch).to(
-                self.device).unsqueeze(1)
-            mask_batch = torch.FloatTensor(mask_batch).to(
-                self.device).unsqueeze(1)
+            # The sampled transitions are already on the device
+            reward_batch = reward_batch.unsqueeze(1)
+            mask_batch = mask_batch.unsqueeze(1)
 
             with torch.no_grad():
                 next_state_action, next_state_log_pi, _ = self.actor.sample(
@@ -4,9 +4,7 @@ Reference:
 https://github.com/AntoineTheb/RNN-RL
 """
 import copy
-import random
 
-import numpy as np
 import torch
 import torch.nn.functional as F
 from plato.config import Config
@@ -16,97 +14,113 @@ from torch.nn.utils.rnn import (pack_padded_sequence, pad_packed_sequence,
                                 pad_sequence)
 
 
-class RNNReplayMemory:
+class RNNReplayMemory(base.ReplayMemory):
+    """ A replay memory buffer for the policies with recurrent actors.
+
+    In asynchronous mode, the states and actions are sequences whose lengths
+    vary with the number of clients, up to `action_dim`. They are stored
+    zero-padded in contiguous tensors together with their lengths, and each
+    sampled sequence is returned as a view of a single gathered minibatch.
+    """
     def __init__(self, state_dim, action_dim, hidden_size, capacity, seed):
-        random.seed(seed)
-        self.device = Config().device()
-        self.capacity = int(capacity)
-        self.ptr = 0
-        self.size = 0
-
-        self.h = np.zeros((self.capacity, hidden_size))
-        self.nh = np.zeros((self.capacity, hidden_size))
-        self.c = np.zeros((self.capacity, hidden_size))
-        self.nc = np.zeros((self.capacity, hidden_size))
-        if hasattr(Config().server,
-                   'synchronous') and not Config().server.synchronous:
-            self.state = [0] * self.capacity
-            self.action = [0] * self.capacity
-            self.reward = [0] * self.capacity
-            self.next_state = [0] * self.capacity
-            self.done = [0] * self.capacity
-        else:
-            self.state = np.zeros((self.capacity, state_dim))
-            self.action = np.zeros((self.capacity, action_dim))
-            self.reward = np.zeros((self.capacity, 1))
-            self.next_state = np.zeros((self.capacity, state_dim))
-            self.done = np.zeros((self.capacity, 1))
+        super().__init__(state_dim, action_dim, capacity, seed)
+        self.action_dim = action_dim
+
+        self.h = self.zeros(hidden_size)
+        self.nh = self.zeros(hidden_size)
+        self.c = self.zeros(hidden_size)
+        self.nc = self.zeros(hidden_size)
+
+        self.asynchronous = hasattr(
+            Config().server, 'synchronous') and not Config().server.synchronous
+        if self.asynchronous:
+            # The sequence buffers are allocated when the first transition is
+            # pushed, as the shape of their elements is then known
+            self.state = None
+            self.action = None
+            self.next_state = None
+            self.length = torch.zeros(self.capacity,
+                                      dtype=torch.long,
+                                      device=self.device)
+            self.action_length = torch.zeros(self.capacity,
+                                             dtype=torch.long,
+                                             device=self.device)
+            self.next_length = torch.zeros(self.capacity,
+                                           dtype=torch.long,
+                                           device=self.device)
+
+    def push_sequence(self, buffer, lengths, sequence):
+        """ Stores a sequence at the current position of a padded buffer. """
+        sequence = self.to_tensor(sequence)
+
+        if buffer is None:
+            buffer = self.zeros(self.action_dim, *sequence.shape[1:])
+
+        buffer[self.ptr].zero_()
+        buffer[self.ptr, :len(sequence)] = sequence
+        lengths[self.ptr] = len(sequence)
+
+        return buffer
 
     def push(self, data):
-        self.state[self.ptr] = data[0]
-        self.action[self.ptr] = data[1]
-        self.reward[self.ptr] = data[2]
-        self.next_state[self.ptr] = data[3]
-        self.done[self.ptr] = data[4]
+        if self.asynchronous:
+            self.state = self.push_sequence(self.state, self.length, data[0])
+            self.action = self.push_sequence(self.action,
+                                             self.action_length, data[1])
+            self.next_state = self.push_sequence(self.next_state,
+                                                 self.next_length, data[3])
+        else:
+            self.store(self.state, data[0])
+            self.store(self.action, data[1])
+            self.store(self.next_state, data[3])
 
-        self.h[self.ptr] = data[5].detach().cpu()
-        self.c[self.ptr] = data[6].detach().cpu()
-        self.nh[self.ptr] = data[7].detach().cpu()
-        self.nc[self.ptr] = data[8].detach().cpu()
+        self.store(self.reward, data[2])
+        self.store(self.done, data[4])
+
+        self.store(self.h, data[5])
+        self.store(self.c, data[6])
+        self.store(self.nh, data[7])
+        self.store(self.nc, data[8])
 
         self.ptr = (self.ptr + 1) % self.capacity
         self.size = min(self.size + 1, self.capacity)
 
     def sample(self):
-        ind = np.random.randint(0,
-                                self.size,
-                                size=int(Config().algorithm.batch_size))
-
-        h = torch.tensor(self.h[ind][None, ...],
-                         requires_grad=True,
-                         dtype=torch.float).to(self.device)
-        c = torch.tensor(self.c[ind][None, ...],
-                         requires_grad=True,
-                         dtype=torch.float).to(self.device)
-        nh = torch.tensor(self.nh[ind][None, ...],
-                          requires_grad=True,
-                          dtype=torch.float).to(self.device)
-        nc = torch.tensor(self.nc[ind][None, ...],
-                          requires_grad=True,
-                          dtype=torch.float).to(self.device)
-
-        if hasattr(Config().server,
-                   'synchronous') and not Config().server.synchronous:
-            state = [
-                torch.FloatTensor(self.state[i]).to(self.device) for i in ind
-            ]
+        ind = self.sample_indices()
+
+        h = self.h[ind][None, ...]
+        c = self.c[ind][None, ...]
+        nh = self.nh[ind][None, ...]
+        nc = self.nc[ind][None, ...]
+
+        # The rewards and dones are returned with the shape [batch_size]
+        reward = self.reward[ind][:, 0]
+        done = self.done[ind][:, 0]
+
+        if self.asynchronous:
+            # The policy packs variable-length sequences itself
+            lengths = self.length[ind].tolist()
+            action_lengths = self.action_length[ind].tolist()
+            next_lengths = self.next_length[ind].tolist()
+            states = self.state[ind]
+            actions = self.action[ind]
+            next_states = self.next_state[ind]
+
+            state = [states[i, :length] for i, length in enumerate(lengths)]
             action = [
-                torch.FloatTensor(self.action[i]).to(self.device) for i in ind
+                actions[i, :length] for i, length in enumerate(action_lengths)
             ]
-            reward = [self.reward[i] for i in ind]
             next_state = [
-                torch.FloatTensor(self.next_state[i]).to(self.device)
-                for i in ind
+                next_states[i, :length]
+                for i, length in enumerate(next_lengths)
             ]
-            done = [self.done[i] for i in ind]
         else:
-            state = torch.FloatTensor(self.state[ind][:,
-                                                      None, :]).to(self.device)
-
-            action = torch.FloatTensor(self.action[ind][:, None, :]).to(
-                self.device)
-            reward = torch.FloatTensor(self.reward[ind][:, None, :]).to(
-                self.device)
-            next_state = torch.FloatTensor(
-                self.next_state[ind][:, None, :]).to(self.device)
-            done = torch.FloatTensor(self.done[ind][:,
-                                                    None, :]).to(self.device)
+            state = self.state[ind][:, None, :]
+            action = self.action[ind][:, None, :]
+            next_state = self.next_state[ind][:, None, :]
 
         return state, action, reward, next_state, done, h, c, nh, nc
 
-    def __len__(self):
-        return self.size
-
 
 class TD3Actor(base.Actor):
     def __init__(self, state_dim, action_dim, max_action):
@@ -410,18 +424,13 @@ class Policy(base.Policy):
                 # Pad variable actions
                 padded = pad_sequence(action, batch_first=True)
                 action = padded
-            reward = torch.FloatTensor(reward).to(self.device).unsqueeze(1)
-            done = torch.FloatTensor(done).to(self.device).unsqueeze(1)
+            reward = reward.unsqueeze(1)
+            done = done.unsqueeze(1)
             hidden = (h, c)
             next_hidden = (nh, nc)
         else:
             state, action, reward, next_state, done = self.replay_buffer.sample(
             )
-            state = torch.FloatTensor(state).to(self.device)
-            action = torch.FloatTensor(action).to(self.device)
-            reward = torch.FloatTensor(reward).to(self.device)
-            next_state = torch.FloatTensor(next_state).to(self.device)
-            done = torch.FloatTensor(done).to(self.device)
             hidden, next_hidden = (None, None), (None, None)
 
         with torch.no_grad():
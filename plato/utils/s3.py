@@ -1,12 +1,24 @@
 """
 Utilities to transmit Python objects to and from an S3-compatible object storage service.
+
+A single S3 client, with a pool of connections, is shared by all the transfers. Objects
+are pickled into a spooled temporary file, which stays in memory while it is small and
+spills over to disk when it grows large, and are uploaded and downloaded in parts
+transferred concurrently. The asynchronous methods run the transfers in a pool of
+threads, so that the server is able to send payloads to many clients at once.
 """
+import asyncio
+import os
 import pickle
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from typing import Any
 
 import boto3
 import botocore
-import requests
+import botocore.config
+from boto3.s3.transfer import TransferConfig
 
 from plato.config import Config
 
@@ -55,15 +67,44 @@ class S3:
             if len(str_list) > 1:
                 self.key_prefix = bucket_part[len(self.bucket):]
 
+        # The number of concurrent transfers, and the size of each part (in MB)
+        # of a multipart transfer
+        self.max_concurrency = Config().server.s3_max_concurrency if hasattr(
+            Config().server, 's3_max_concurrency') else 10
+        part_size = (Config().server.s3_part_size if hasattr(
+            Config().server, 's3_part_size') else 8) * 1024**2
+
+        # Objects larger than this are spooled to disk rather than kept in memory
+        self.spool_size = part_size * self.max_concurrency
+
+        client_config = botocore.config.Config(
+            max_pool_connections=self.max_concurrency * 2)
+
         if self.access_key is not None and self.secret_key is not None:
             self.s3_client = boto3.client(
                 's3',
                 endpoint_url=self.endpoint,
                 aws_access_key_id=self.access_key,
-                aws_secret_access_key=self.secret_key)
+                aws_secret_access_key=self.secret_key,
+                config=client_config)
         else:
             # the access key and secret key are stored locally in ~/.aws/credentials
-            self.s3_client = boto3.client('s3', endpoint_url=self.endpoint)
+            self.s3_client = boto3.client('s3',
+                                          endpoint_url=self.endpoint,
+                                          config=client_config)
+
+        self.transfer_config = TransferConfig(
+            multipart_threshold=part_size,
+            multipart_chunksize=part_size,
+            max_concurrency=self.max_concurrency)
+
+        # The threads running the asynchronous transfers
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+
+        # The sizes of the objects sent, and the ongoing or completed asynchronous
+        # sends, by their keys
+        self.sent_sizes = {}
+        self.sends = {}
 
         # Does the bucket exist?
         try:
@@ -74,65 +115,110 @@ class S3:
             except botocore.exceptions.ClientError as s3_exception:
                 raise ValueError("Fail to create a bucket.") from s3_exception
 
-    def send_to_s3(self, object_key, object_to_send) -> str:
-        """ Sends an object to an S3-compatible object storage service.
+    def send_to_s3(self, object_key, object_to_send) -> int:
+        """ Sends an object to an S3-compatible object storage service, unless an
+            object with the same key has been sent already.
 
-            Returns: A presigned URL for use later to retrieve the data.
+            Returns: The size of the pickled object in bytes.
         """
         object_key = self.key_prefix + "/" + object_key
+
+        if object_key in self.sent_sizes:
+            return self.sent_sizes[object_key]
+
         try:
             # Does the object key exist already in S3?
-            self.s3_client.head_object(Bucket=self.bucket, Key=object_key)
+            response = self.s3_client.head_object(Bucket=self.bucket,
+                                                  Key=object_key)
+            self.sent_sizes[object_key] = response['ContentLength']
+            return self.sent_sizes[object_key]
         except botocore.exceptions.ClientError:
-            try:
-                # Only send the object if the key does not exist yet
-                data = pickle.dumps(object_to_send)
-                put_url = self.s3_client.generate_presigned_url(
-                    ClientMethod='put_object',
-                    Params={
-                        'Bucket': self.bucket,
-                        'Key': object_key
-                    },
-                    ExpiresIn=300)
-                response = requests.put(put_url, data=data)
-
-                if response.status_code != 200:
-                    raise ValueError(
-                        f'Error occurred sending data: status code = {response.status_code}'
-                    ) from None
-
-            except botocore.exceptions.ClientError as error:
-                raise ValueError(
-                    f'Error occurred sending data to S3: {error}') from error
-
-            except botocore.exceptions.ParamValidationError as error:
-                raise ValueError(f'Incorrect parameters: {error}') from error
-
-    def receive_from_s3(self, object_key) -> Any:
+            pass
+
+        try:
+            # Only send the object if the key does not exist yet
+            with tempfile.SpooledTemporaryFile(
+                    max_size=self.spool_size) as buffer:
+                pickle.dump(object_to_send, buffer)
+                data_size = buffer.tell()
+                buffer.seek(0)
+
+                self.s3_client.upload_fileobj(buffer,
+                                              self.bucket,
+                                              object_key,
+                                              Config=self.transfer_config)
+
+        except (botocore.exceptions.ClientError,
+                boto3.exceptions.S3UploadFailedError) as error:
+            raise ValueError(
+                f'Error occurred sending data to S3: {error}') from error
+
+        except botocore.exceptions.ParamValidationError as error:
+            raise ValueError(f'Incorrect parameters: {error}') from error
+
+        self.sent_sizes[object_key] = data_size
+        return data_size
+
+    def receive_from_s3(self, object_key, return_size=False) -> Any:
         """ Retrieves an object from an S3-compatible object storage service.
 
             All S3-related credentials, such as the access key and the secret key,
             are assumed to be stored in ~/.aws/credentials by using the 'aws configure'
             command.
 
-            Returns: The object to be retrieved.
+            Returns: The object to be retrieved, along with the size of the pickled
+            object in bytes if `return_size` is True.
         """
         object_key = self.key_prefix + "/" + object_key
-        get_url = self.s3_client.generate_presigned_url(
-            ClientMethod='get_object',
-            Params={
-                'Bucket': self.bucket,
-                'Key': object_key
-            },
-            ExpiresIn=300)
-        response = requests.get(get_url)
-
-        if response.status_code == 200:
-            return pickle.loads(response.content)
-
-        raise ValueError(
-            f'Error occurred sending data: request status code = {response.status_code}'
-        )
+
+        try:
+            with tempfile.SpooledTemporaryFile(
+                    max_size=self.spool_size) as buffer:
+                self.s3_client.download_fileobj(self.bucket,
+                                                object_key,
+                                                buffer,
+                                                Config=self.transfer_config)
+                # The parts of a multipart download are written in the order
+                # they complete, so the size is where the buffer ends
+                buffer.seek(0, os.SEEK_END)
+                data_size = buffer.tell()
+                buffer.seek(0)
+                received = pickle.load(buffer)
+
+        except botocore.exceptions.ClientError as error:
+            raise ValueError(
+                f'Error occurred receiving data from S3: {error}') from error
+
+        if return_size:
+            return received, data_size
+
+        return received
+
+    async def send_to_s3_async(self, object_key, object_to_send) -> int:
+        """ Sends an object to an S3-compatible object storage service without
+            blocking the event loop. Concurrent sends with the same key share a
+            single upload.
+
+            Returns: The size of the pickled object in bytes.
+        """
+        if object_key not in self.sends:
+            self.sends[object_key] = asyncio.get_running_loop().run_in_executor(
+                self.executor, self.send_to_s3, object_key, object_to_send)
+
+        try:
+            return await asyncio.shield(self.sends[object_key])
+        except ValueError:
+            # A failed send may be retried
+            self.sends.pop(object_key, None)
+            raise
+
+    async def receive_from_s3_async(self, object_key, return_size=False) -> Any:
+        """ Retrieves an object from an S3-compatible object storage service
+            without blocking the event loop.
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor,
+            partial(self.receive_from_s3, object_key, return_size=return_size))
 
     def delete_from_s3(self, object_key):
         """ Deletes an object using its key from S3. """
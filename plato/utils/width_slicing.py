@@ -0,0 +1,114 @@
+"""
+Extracting width-scaled submodels from a global model, and aggregating them back,
+for the federated learning algorithms that train submodels of different widths
+on heterogeneous clients, such as HeteroFL, FedRolex, AnyCostFL and SysHeteroFL.
+
+Each parameter of a submodel is the leading block of the corresponding parameter
+of the global model, along every dimension. The slices of a submodel are computed
+once from its shapes and cached under a plan key, such as its width rate, so that
+a submodel is extracted with one copy per parameter without building the submodel
+again.
+"""
+import torch
+
+
+def leading_slices(shape) -> tuple:
+    """Returns the slices of the leading block of the given shape."""
+    return tuple(slice(0, size) for size in shape)
+
+
+def is_weight_or_bias(key, __) -> bool:
+    """Returns whether an entry of a state dict is a weight or a bias."""
+    return "weight" in key or "bias" in key
+
+
+class WidthSlicer:
+    """Extracts submodels from a global model with cached slicing plans."""
+
+    def __init__(self, is_sliced=None):
+        """
+        :param is_sliced: A function that returns whether a parameter of the global
+            model, given its name and tensor, is sliced into the submodels. The other
+            entries of a submodel keep the values of a newly built submodel.
+        """
+        self.is_sliced = is_sliced
+        self.plans = {}
+
+    def plan(self, plan_key, global_state, build_submodel):
+        """Returns the slicing plan of a submodel, built with `build_submodel()` if
+        the plan is not cached yet.
+
+        A plan holds the names of the entries of the submodel in order, the slices
+        of the entries sliced from the global model, and the values of the others.
+        """
+        if plan_key not in self.plans:
+            submodel_state = build_submodel().state_dict()
+
+            slices = {}
+            unsliced = {}
+            for key, value in submodel_state.items():
+                if (
+                    key in global_state
+                    and global_state[key].dim() > 0
+                    and (
+                        self.is_sliced is None
+                        or self.is_sliced(key, global_state[key])
+                    )
+                ):
+                    slices[key] = leading_slices(value.shape)
+                else:
+                    unsliced[key] = value
+
+            self.plans[plan_key] = (list(submodel_state), slices, unsliced)
+
+        return self.plans[plan_key]
+
+    def extract(self, plan_key, global_state, build_submodel):
+        """Extracts the parameters of a submodel from the global model."""
+        keys, slices, unsliced = self.plan(plan_key, global_state, build_submodel)
+
+        return {
+            key: (
+                global_state[key][slices[key]].clone()
+                if key in slices
+                else unsliced[key].clone()
+            )
+            for key in keys
+        }
+
+
+def aggregate(global_state, weights_received, keys) -> dict:
+    """Averages each element of the given entries of the global model over the
+    submodels that hold it. Elements held by none of the submodels are zero, and
+    the other entries keep their values in the global model.
+
+    The submodels are grouped by the shape of each entry, so that each group is
+    added to the leading block of the entry in place, and its count is updated
+    once for the whole group.
+    """
+    aggregated = dict(global_state)
+
+    for key in keys:
+        value = global_state[key]
+
+        groups = {}
+        for local_weights in weights_received:
+            if key in local_weights:
+                groups.setdefault(tuple(local_weights[key].shape), []).append(
+                    local_weights[key]
+                )
+
+        dtype = value.dtype if value.is_floating_point() else torch.float32
+        total = torch.zeros(value.shape, dtype=dtype, device=value.device)
+        count = torch.zeros(value.shape, dtype=dtype, device=value.device)
+
+        for shape, local_values in groups.items():
+            block = leading_slices(shape)
+            region = total[block]
+            for local_value in local_values:
+                region.add_(local_value)
+            count[block] += len(local_values)
+
+        aggregated[key] = total.div_(count.clamp_(min=1))
+
+    return aggregated
@@ -0,0 +1,70 @@
+"""Unit tests for selecting clients with per-client statistics in arrays."""
+import unittest
+
+import numpy as np
+
+from plato.utils import client_selection
+
+
+class ClientSelectionTest(unittest.TestCase):
+    """Tests choosing clients by their utilities against sorting all clients."""
+
+    def setUp(self):
+        super().setUp()
+        np.random.seed(1)
+        self.total_clients = 1000
+        # Utilities with many ties, as unexplored clients have a utility of zero
+        self.utilities = np.zeros(self.total_clients + 1)
+        self.utilities[1:] = np.random.randint(0, 20, self.total_clients) / 4
+        self.clients_pool = np.random.choice(
+            np.arange(1, self.total_clients + 1), 600, replace=False
+        ).tolist()
+
+    def test_availability_mask(self):
+        """Includes the clients in the pool, except for the excluded ones."""
+        mask = client_selection.availability_mask(
+            self.total_clients, self.clients_pool, self.clients_pool[:10]
+        )
+
+        self.assertEqual(len(mask), self.total_clients + 1)
+        self.assertEqual(
+            np.flatnonzero(mask).tolist(), sorted(self.clients_pool[10:])
+        )
+
+    def test_sorted_by_value(self):
+        """Sorts the clients in the pool as a stable sort by decreasing utility."""
+        mask = client_selection.availability_mask(self.total_clients, self.clients_pool)
+        utilities = dict(enumerate(self.utilities.tolist()))
+        expected = [
+            client_id
+            for client_id in sorted(utilities, key=utilities.get, reverse=True)
+            if client_id in self.clients_pool
+        ]
+
+        for count in [None, 0, 1, 7, 100, 599, 600, 1000]:
+            sorted_clients = client_selection.sorted_by_value(
+                self.utilities, mask, count
+            )
+            self.assertEqual(sorted_clients.tolist(), expected[:count])
+
+    def test_weighted_sample(self):
+        """Samples distinct clients, favouring the clients with higher weights."""
+        client_ids = np.arange(1, 11)
+        weights = np.array([0.0] * 5 + [1.0] * 4 + [100.0])
+
+        counts = np.zeros(11, dtype=int)
+        for __ in range(200):
+            sampled = client_selection.weighted_sample(client_ids, weights, 3)
+            self.assertEqual(len(set(sampled.tolist())), 3)
+            counts[sampled] += 1
+
+        # Clients with a weight of zero are never drawn while others remain
+        self.assertEqual(counts[1:6].sum(), 0)
+        self.assertGreater(counts[10], 190)
+
+        sampled = client_selection.weighted_sample(client_ids, weights, 20)
+        self.assertEqual(sorted(sampled.tolist()), client_ids.tolist())
+
+
+if __name__ == "__main__":
+    unittest.main()
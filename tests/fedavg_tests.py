@@ -175,6 +175,53 @@ async def test_fedavg_aggregation(self):
     self.assertEqual(42.56, np.round(self.trainer.model(self.example).item(), 4))
 
 
+async def test_buffered_aggregation(self):
+    """Testing the staleness-weighted deltas buffered in asynchronous mode."""
+
+    print("\nTesting buffered asynchronous aggregation.")
+    model = InnerProductModel
+
+    trainer = basic.Trainer
+    algorithm = algorithms_registry.registered_algorithms[Config().algorithm.type]
+    server = fedavg_server.Server(model=model, algorithm=algorithm, trainer=trainer)
+    server.init_trainer()
+    server.current_round = 3
+
+    # The global model of the previous round, which a stale client trained from
+    current_weights = copy.deepcopy(server.algorithm.extract_weights())
+    server.model_versions[2] = {
+        name: weight - 1.0 for name, weight in current_weights.items()
+    }
+
+    def client_update(client_id, num_samples, staleness, payload):
+        return simple.SimpleNamespace(
+            client_id=client_id,
+            report=simple.SimpleNamespace(client_id=client_id, num_samples=num_samples),
+            payload=payload,
+            staleness=staleness,
+        )
+
+    # A client trained from the current global model
+    payload = {name: weight + 2.0 for name, weight in current_weights.items()}
+    self.assertTrue(await server._buffer_update(client_update(1, 100, 0, payload)))
+
+    # A client trained from the global model of the previous round
+    payload = copy.deepcopy(current_weights)
+    self.assertTrue(await server._buffer_update(client_update(2, 300, 1, payload)))
+
+    # A client trained from a global model that is no longer kept
+    payload = {name: weight + 10.0 for name, weight in current_weights.items()}
+    with self.assertLogs(level="WARNING"):
+        self.assertFalse(
+            await server._buffer_update(client_update(3, 100, 2, payload))
+        )
+
+    self.assertEqual(server.buffered_samples, 400)
+    for name, delta in server.buffered_deltas.items():
+        expected = 100 * 2.0 + 300 * 1.0 * server.staleness_factor(1)
+        np.testing.assert_allclose(delta, torch.full(delta.shape, expected))
+
+
 class FedAvgTest(unittest.TestCase):
     def setUp(self):
         super().setUp()
@@ -241,6 +288,9 @@ class FedAvgTest(unittest.TestCase):
     def test_fedavg_aggregation(self):
         asyncio.run(test_fedavg_aggregation(self))
 
+    def test_buffered_aggregation(self):
+        asyncio.run(test_buffered_aggregation(self))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,4 +1,6 @@
 """Unit tests for the learning rate scheduler."""
+import copy
+import os
 import unittest
 import warnings
 from collections import namedtuple
@@ -6,6 +8,7 @@ import numpy as np
 
 from plato.config import Config
 import plato.models.registry as models_registry
+from plato.trainers import basic
 from plato.trainers import optimizers
 from plato.trainers import lr_schedulers
 
@@ -199,6 +202,84 @@ class LrSchedulerTest(unittest.TestCase):
                 lrs.step()
                 self.assert_lr_equal(0.1)
 
+    def test_global_lr(self):
+        """The learning rates at a global step are the same as those obtained
+        by stepping the scheduler from its initial state."""
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", category=UserWarning)
+
+            fields = ["optimizer", "lr_scheduler", "model_name", "epochs"]
+            params = ["SGD", "LambdaLR", "resnet_18", 5]
+            Config().trainer = namedtuple("trainer", fields)(*params)
+
+            fields = ["gamma", "milestone_steps", "warmup_steps"]
+            params = [0.1, "2ep,4ep,7ep,8ep", "20it"]
+            Config().parameters.learning_rate = namedtuple("learning_rate", fields)(
+                *params
+            )
+
+            trainer = basic.Trainer(model=lambda: self.model)
+
+            for scheduler_name in ["LambdaLR", "MultiStepLR", "CosineAnnealingLR"]:
+                lrs = lr_schedulers.get(
+                    self.optimizer, 10, lr_scheduler=scheduler_name
+                )
+
+                for steps in [0, 1, 19, 20, 75, 120]:
+                    stepped_lrs = copy.deepcopy(lrs)
+                    for _ in range(steps):
+                        stepped_lrs.step()
+
+                    np.testing.assert_allclose(
+                        trainer._global_lr(lrs, steps), stepped_lrs.get_last_lr()
+                    )
+
+    def test_global_lr_resumed(self):
+        """The learning rates of chainable schedulers resumed from a saved state
+        are the same as those obtained by stepping the scheduler from its initial
+        state."""
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", category=UserWarning)
+
+            fields = ["optimizer", "lr_scheduler", "model_name", "epochs"]
+            fields.append("lr_sequential_milestones")
+            params = ["SGD", "SequentialLR", "resnet_18", 5, "25"]
+            Config().trainer = namedtuple("trainer", fields)(*params)
+
+            trainer = basic.Trainer(model=lambda: self.model)
+
+            for scheduler_name in [
+                "SequentialLR,ExponentialLR,ExponentialLR",
+                "ChainedScheduler,ExponentialLR,ExponentialLR",
+            ]:
+                state_path = os.path.join(
+                    Config().params["model_path"],
+                    f"resnet_18_{trainer.client_id}_{Config().params['run_id']}"
+                    ".lr_scheduler",
+                )
+                if os.path.exists(state_path):
+                    os.remove(state_path)
+
+                lrs = lr_schedulers.get(
+                    self.optimizer,
+                    10,
+                    lr_scheduler=scheduler_name,
+                    lr_params={"gamma": 0.9},
+                )
+
+                # Each call after the first resumes from the state saved by the
+                # previous call, including across the milestone of SequentialLR
+                for steps in [5, 12, 12, 30, 48]:
+                    stepped_lrs = copy.deepcopy(lrs)
+                    for _ in range(steps):
+                        stepped_lrs.step()
+
+                    np.testing.assert_allclose(
+                        trainer._global_lr(lrs, steps), stepped_lrs.get_last_lr()
+                    )
+
+                os.remove(state_path)
+
 
 if __name__ == "__main__":
     unittest.main()
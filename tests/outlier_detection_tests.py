@@ -0,0 +1,113 @@
+"""Unit tests for detecting outliers among the loss norms in Pisces, against the
+results of DBSCAN on the same loss norms."""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+try:
+    from sklearn.cluster import DBSCAN
+except ImportError:
+    DBSCAN = None
+
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "../examples/pisces")
+)
+
+# pylint: disable=wrong-import-position
+import outlier_detection
+
+
+def dbscan_noise(values, eps, min_samples):
+    """Returns whether each value is labelled as noise by DBSCAN."""
+    values = np.asarray(values, dtype=float).reshape(-1, 1)
+    return DBSCAN(eps=eps, min_samples=min_samples).fit(values).labels_ == -1
+
+
+@unittest.skipIf(DBSCAN is None, "scikit-learn is required for comparing with DBSCAN.")
+class OutlierDetectionTest(unittest.TestCase):
+    """Tests the outliers detected in one dimension against DBSCAN."""
+
+    def setUp(self):
+        super().setUp()
+        np.random.seed(1)
+
+    def test_noise_mask(self):
+        """Labels the same values as noise as DBSCAN, with continuous values."""
+        for __ in range(200):
+            total = np.random.randint(1, 60)
+            values = np.sort(np.random.exponential(1.0, total))
+            eps = np.random.uniform(0.01, 0.5)
+            min_samples = np.random.randint(1, 8)
+
+            np.testing.assert_array_equal(
+                outlier_detection.noise_mask(values, eps, min_samples),
+                dbscan_noise(values, eps, min_samples),
+            )
+
+    def test_noise_mask_ties(self):
+        """Labels the same values as noise as DBSCAN, with many ties and many
+        values exactly `eps` apart."""
+        for __ in range(200):
+            total = np.random.randint(1, 60)
+            # Multiples of 0.25 are exact, so that neighbouring values on the grid
+            # are exactly `eps` apart
+            values = np.sort(np.random.randint(0, 40, total) * 0.25)
+            eps = np.random.choice([0.25, 0.5, 0.75])
+            min_samples = np.random.randint(1, 8)
+
+            np.testing.assert_array_equal(
+                outlier_detection.noise_mask(values, eps, min_samples),
+                dbscan_noise(values, eps, min_samples),
+            )
+
+    def test_noise_mask_empty(self):
+        """Labels no values as noise if there are no values."""
+        self.assertEqual(len(outlier_detection.noise_mask([], 0.5, 3)), 0)
+
+    def test_outlier_detector(self):
+        """Detects the same outliers as DBSCAN on the newest loss norm of each
+        client in a window sliding across model versions."""
+        for window_size, eps, min_samples in [(1, 0.25, 2), (3, 0.5, 3), (5, 0.25, 4)]:
+            detector = outlier_detection.OutlierDetector(window_size, eps, min_samples)
+            # The first loss norm of each client in each model version
+            first_records = {}
+            version = 1
+
+            for __ in range(400):
+                # The window mostly stays or moves forward, and occasionally moves
+                # back to an update trained from an older model version
+                version = max(1, version + np.random.choice([-2, 0, 0, 0, 1, 1]))
+                client_id = int(np.random.randint(1, 30))
+                loss_norm = float(np.random.randint(0, 20) * 0.25)
+
+                detector.add(version, client_id, loss_norm)
+                first_records.setdefault((version, client_id), loss_norm)
+
+                # The newest loss norm of each client within the window
+                window = {}
+                for (record_version, record_client), record_loss_norm in sorted(
+                    first_records.items()
+                ):
+                    if version - window_size < record_version <= version:
+                        window[record_client] = (record_version, record_loss_norm)
+
+                client_ids = sorted(window)
+                is_noise = dbscan_noise(
+                    [window[client_id][1] for client_id in client_ids],
+                    eps,
+                    min_samples,
+                )
+                expected = [
+                    client_id
+                    for client_id, noise in zip(client_ids, is_noise)
+                    if noise
+                ]
+
+                self.assertEqual(len(detector), len(window))
+                self.assertEqual(detector.outliers(), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
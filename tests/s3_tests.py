@@ -0,0 +1,87 @@
+"""Unit tests for transmitting payloads through an S3-compatible storage service,
+run against a local stand-in for S3 provided by moto."""
+import asyncio
+import os
+import unittest
+
+os.environ["config_file"] = "tests/config.yml"
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+try:
+    import moto
+
+    mock_s3 = moto.mock_aws if hasattr(moto, "mock_aws") else moto.mock_s3
+except ImportError:
+    moto = None
+
+from plato.config import Config
+from plato.utils import s3
+
+
+@unittest.skipIf(moto is None, "moto is required for a local stand-in for S3.")
+class S3Test(unittest.TestCase):
+    """Tests sending and receiving payloads through S3."""
+
+    def setUp(self):
+        super().setUp()
+        __ = Config()
+
+        self.mock = mock_s3()
+        self.mock.start()
+        self.s3_client = s3.S3(bucket="s3://plato-tests/payloads")
+
+        # Large enough to be transferred in several parts
+        self.payload = {"weights": bytes(range(256)) * (80 * 1024), "round": 1}
+
+    def tearDown(self):
+        self.s3_client.executor.shutdown()
+        self.mock.stop()
+        super().tearDown()
+
+    def test_send_and_receive(self):
+        """Sends a multipart payload, and receives the same payload."""
+        data_size = self.s3_client.send_to_s3("server_payload_1", self.payload)
+        received, received_size = self.s3_client.receive_from_s3(
+            "server_payload_1", return_size=True
+        )
+
+        self.assertEqual(received, self.payload)
+        self.assertEqual(received_size, data_size)
+        self.assertGreater(data_size, 2 * 8 * 1024**2)
+
+        # A payload is sent only once for the same key
+        self.assertEqual(
+            self.s3_client.send_to_s3("server_payload_1", {"round": 2}), data_size
+        )
+        self.assertEqual(self.s3_client.receive_from_s3("server_payload_1"), received)
+
+    def test_concurrent_sends(self):
+        """Sends a payload to many clients at once with a single upload."""
+
+        async def send_to_clients():
+            data_sizes = await asyncio.gather(
+                *[
+                    self.s3_client.send_to_s3_async("server_payload_2", self.payload)
+                    for __ in range(5)
+                ]
+            )
+            received = await asyncio.gather(
+                *[
+                    self.s3_client.receive_from_s3_async("server_payload_2")
+                    for __ in range(5)
+                ]
+            )
+            return data_sizes, received
+
+        data_sizes, received = asyncio.run(send_to_clients())
+
+        self.assertEqual(len(set(data_sizes)), 1)
+        self.assertEqual(len(self.s3_client.sends), 1)
+        for payload in received:
+            self.assertEqual(payload, self.payload)
+
+
+if __name__ == "__main__":
+    unittest.main()
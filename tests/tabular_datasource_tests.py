@@ -0,0 +1,58 @@
+"""Unit tests for the tabular datasources."""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import torch
+
+from plato.datasources import purchase, texas
+
+
+class TabularDatasourceTest(unittest.TestCase):
+    """Tests loading the Purchase100 and Texas100 datasets from cached arrays."""
+
+    def setUp(self):
+        super().setUp()
+
+        # A synthetic dataset of the same shape as the Purchase100 splits
+        rng = np.random.default_rng(0)
+        self.features = rng.integers(0, 2, size=(20000, 600)).astype(np.float32)
+        self.labels = rng.integers(0, 100, size=20000).astype(np.int64)
+
+    def test_vector_dataset(self):
+        """Builds the same tensors as the former row-wise construction."""
+        expected_data = torch.stack([torch.FloatTensor(i) for i in self.features])
+        expected_targets = torch.stack([torch.LongTensor([i]) for i in self.labels])[
+            :, 0
+        ]
+
+        for vector_dataset in (purchase.VectorDataset, texas.VectorDataset):
+            dataset = vector_dataset(self.features, self.labels)
+            self.assertTrue(torch.equal(dataset.data, expected_data))
+            self.assertTrue(torch.equal(dataset.targets, expected_targets))
+            self.assertEqual(dataset.data.dtype, torch.float32)
+            self.assertEqual(dataset.targets.dtype, torch.int64)
+
+    def test_memory_mapped_arrays(self):
+        """Builds the same tensors from memory-mapped cached arrays as from the
+        arrays in memory."""
+        with tempfile.TemporaryDirectory() as cache_path:
+            features_path = os.path.join(cache_path, "features.npy")
+            labels_path = os.path.join(cache_path, "labels.npy")
+            np.save(features_path, self.features)
+            np.save(labels_path, self.labels)
+
+            dataset = purchase.VectorDataset(
+                np.load(features_path, mmap_mode="c"),
+                np.load(labels_path, mmap_mode="c"),
+            )
+
+            self.assertEqual(len(dataset), len(self.features))
+            self.assertTrue(torch.equal(dataset.data, torch.from_numpy(self.features)))
+            self.assertTrue(torch.equal(dataset.targets, torch.from_numpy(self.labels)))
+
+
+if __name__ == "__main__":
+    unittest.main()
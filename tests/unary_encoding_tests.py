@@ -3,9 +3,11 @@ Unit tests for unary encoding, a local differential privacy mechanism that adds
 noise to model weights or features before transmitting to the federated learning server.
 """
 import unittest
+
 import numpy as np
+import torch
 
-from plato.utils import unary_encoding
+from plato.utils import randomized_response, unary_encoding
 
 
 class UnaryEncodingTest(unittest.TestCase):
@@ -49,6 +51,57 @@ class UnaryEncodingTest(unittest.TestCase):
                                p,
                                delta=0.005)
 
+    def test_tensor_distribution_probability(self):
+        """Test the distribution probability of the results on tensors."""
+        p = 0.75
+        q = 0.1
+        runs = 100000
+        ones = randomized_response.produce_randomized_response(
+            torch.ones(runs), p, q)
+        zeros = randomized_response.produce_randomized_response(
+            torch.zeros(runs), p, q)
+
+        self.assertAlmostEqual(ones.mean().item(), p, delta=0.005)
+        self.assertAlmostEqual(zeros.mean().item(), q, delta=0.005)
+
+    def test_tensor_reproducibility(self):
+        """Test that seeded generators produce the same randomized responses."""
+        bits = randomized_response.encode(torch.randn(64, 1024))
+
+        responses = [
+            randomized_response.randomize(
+                bits, 1.0, randomized_response.get_generator("cpu", seed=1))
+            for _ in range(2)
+        ]
+        self.assertTrue(torch.equal(responses[0], responses[1]))
+
+    def test_tensor_matches_numpy(self):
+        """Test that the tensor and the NumPy implementations report ones and zeros
+        at the same rates on the same features."""
+        features = torch.randn(64, 64, 32, 32)
+        epsilon = 1.0
+
+        bit_array = unary_encoding.encode(features.numpy().copy())
+        bits = randomized_response.encode(features)
+        np.testing.assert_array_equal(bits.numpy(), bit_array)
+
+        numpy_responses = unary_encoding.randomize(bit_array, epsilon)
+        tensor_responses = randomized_response.randomize(bits, epsilon).numpy()
+
+        for bit in (0, 1):
+            self.assertAlmostEqual(
+                tensor_responses[bit_array == bit].mean(),
+                numpy_responses[bit_array == bit].mean(),
+                delta=0.005)
+
+    def test_derived_seed(self):
+        """Test that derived seeds are deterministic and differ across clients."""
+        seed = randomized_response.derive_seed("experiment", 1, 2)
+        self.assertEqual(seed, randomized_response.derive_seed("experiment", 1, 2))
+        self.assertNotEqual(seed,
+                            randomized_response.derive_seed("experiment", 2, 2))
+        self.assertLess(seed, 2**63)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,105 @@
+"""Unit tests for extracting and aggregating width-scaled submodels."""
+import copy
+import unittest
+
+import torch
+
+from plato.utils import width_slicing
+
+
+class ScaledModel(torch.nn.Module):
+    """A small model whose width is scaled by a rate."""
+
+    def __init__(self, model_rate=1.0):
+        super().__init__()
+        width = int(8 * model_rate)
+        self.conv = torch.nn.Conv2d(3, width, 3)
+        self.norm = torch.nn.BatchNorm2d(width)
+        self.linear = torch.nn.Linear(width, 10)
+
+
+class WidthSlicingTest(unittest.TestCase):
+    """Tests the width slicing engine against slicing and aggregating key by key."""
+
+    def setUp(self):
+        super().setUp()
+        torch.manual_seed(1)
+        self.global_state = ScaledModel().state_dict()
+        self.rates = [1.0, 0.5, 0.25, 0.5]
+
+    @staticmethod
+    def extract_key_by_key(global_state, rate):
+        """Extracts a submodel by copying a leading block of every weight and bias."""
+        local_parameters = ScaledModel(rate).state_dict()
+        for key, value in global_state.items():
+            if "weight" in key or "bias" in key:
+                local_shape = local_parameters[key].shape
+                local_parameters[key] = copy.deepcopy(
+                    value[tuple(slice(0, size) for size in local_shape)]
+                )
+        return local_parameters
+
+    @staticmethod
+    def aggregate_key_by_key(global_state, weights_received):
+        """Aggregates the submodels with one count tensor per key and submodel."""
+        global_parameters = copy.deepcopy(global_state)
+        for key, value in global_state.items():
+            if "weight" in key or "bias" in key:
+                count = torch.zeros(value.shape)
+                for local_weights in weights_received:
+                    block = tuple(slice(0, size) for size in local_weights[key].shape)
+                    global_parameters[key][block] += local_weights[key]
+                    count[block] += torch.ones(local_weights[key].shape)
+                count = torch.where(count == 0, torch.ones(count.shape), count)
+                global_parameters[key] = torch.div(
+                    global_parameters[key] - value, count
+                )
+        return global_parameters
+
+    def test_extract(self):
+        """Extracts the same submodels, and caches one plan per rate."""
+        slicer = width_slicing.WidthSlicer(width_slicing.is_weight_or_bias)
+
+        for rate in self.rates:
+            expected = self.extract_key_by_key(self.global_state, rate)
+            extracted = slicer.extract(
+                rate, self.global_state, lambda rate=rate: ScaledModel(rate)
+            )
+
+            self.assertEqual(list(extracted), list(expected))
+            for key, value in expected.items():
+                self.assertTrue(torch.equal(extracted[key], value))
+
+            # The extracted parameters do not share memory with the global model
+            extracted["conv.weight"].add_(1)
+            self.assertFalse(
+                torch.equal(
+                    extracted["conv.weight"],
+                    self.global_state["conv.weight"][: len(extracted["conv.weight"])],
+                )
+            )
+
+        self.assertEqual(len(slicer.plans), len(set(self.rates)))
+
+    def test_aggregate(self):
+        """Aggregates the submodels to the same global model."""
+        weights_received = []
+        for rate in self.rates:
+            local_weights = ScaledModel(rate).state_dict()
+            weights_received.append(local_weights)
+
+        keys = [
+            key
+            for key, value in self.global_state.items()
+            if width_slicing.is_weight_or_bias(key, value)
+        ]
+        aggregated = width_slicing.aggregate(self.global_state, weights_received, keys)
+        expected = self.aggregate_key_by_key(self.global_state, weights_received)
+
+        self.assertEqual(list(aggregated), list(expected))
+        for key, value in expected.items():
+            self.assertTrue(torch.allclose(aggregated[key], value, atol=1e-6))
+
+
+if __name__ == "__main__":
+    unittest.main()